@@ -0,0 +1,83 @@
+# Tables of target squares that are calculated once when the module is imported.
+# All tables are indexed by the start square and already respect the edges of the board.
+
+# directions as (x, y) vectors
+STRAIGHT_DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+KNIGHT_DIRECTIONS = ((2, 1), (2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2), (-2, 1), (-2, -1))
+KING_DIRECTIONS = STRAIGHT_DIRECTIONS + DIAGONAL_DIRECTIONS
+
+
+def step(square: int, x: int, y: int) -> int:
+    """
+    Adds the direction vector to a square.
+    :param square: The start square.
+    :param x: The x part of the direction vector.
+    :param y: The y part of the direction vector.
+    :return: The target square or -1 if the target is not on the board.
+    """
+    file = square % 8 + x
+    rank = square // 8 + y
+    if 0 <= file <= 7 and 0 <= rank <= 7:
+        return file + 8 * rank
+    return -1
+
+
+def create_step_table(directions: tuple) -> list:
+    """
+    Creates the list of squares that are reachable with one step in any of the directions, for every square.
+    :param directions: The direction vectors.
+    :return: The lists of target squares indexed by square.
+    """
+    table = []
+    for square in range(64):
+        targets = []
+        for x, y in directions:
+            target_square = step(square, x, y)
+            if target_square != -1:
+                targets.append(target_square)
+        table.append(tuple(targets))
+    return table
+
+
+def create_ray_table(x: int, y: int) -> list:
+    """
+    Creates the list of squares in the direction until the edge of the board (ordered by distance), for every square.
+    :param x: The x part of the direction vector.
+    :param y: The y part of the direction vector.
+    :return: The lists of target squares indexed by square.
+    """
+    table = []
+    for square in range(64):
+        targets = []
+        target_square = step(square, x, y)
+        while target_square != -1:
+            targets.append(target_square)
+            target_square = step(target_square, x, y)
+        table.append(tuple(targets))
+    return table
+
+
+def to_mask(squares: tuple) -> int:
+    """
+    Converts a list of squares into a bitboard.
+    :param squares: The squares.
+    :return: The bitboard with a bit set for every square.
+    """
+    mask = 0
+    for square in squares:
+        mask |= 1 << square
+    return mask
+
+
+KNIGHT_TARGETS = create_step_table(KNIGHT_DIRECTIONS)
+KING_TARGETS = create_step_table(KING_DIRECTIONS)
+# the squares attacked by a pawn of the colour standing on the square
+PAWN_ATTACKS = {
+    'white': create_step_table(((-1, 1), (1, 1))),
+    'black': create_step_table(((-1, -1), (1, -1))),
+}
+# the rays of the sliding pieces, indexed by the direction vector and the start square
+RAYS = {direction: create_ray_table(*direction) for direction in KING_DIRECTIONS}
+STRAIGHT_RAYS = [RAYS[direction] for direction in STRAIGHT_DIRECTIONS]
+DIAGONAL_RAYS = [RAYS[direction] for direction in DIAGONAL_DIRECTIONS]
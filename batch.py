@@ -0,0 +1,219 @@
+import numpy as np
+
+from board_constants import *
+from chessboard import Chessboard
+from position_encoding import BOARD_SIZE, POSITION_SIZE
+
+# A batch stores many positions in NumPy arrays, one row per position, so that they can be evaluated with a few
+# vectorized operations instead of one position (and one square) at a time:
+#   squares:              N x 64 int8, the piece constants of the squares (a1 = 0, h8 = 63)
+#   black_to_move:        N bool
+#   castle_rights:        N uint8, bitmasks of the CASTLE_RIGHT_* constants
+#   en_passant_squares:   N int8, the en passant square or -1
+#   half_move_counts:     N uint16, the counters of half moves for the 50 move rule
+#   move_numbers:         N uint16
+
+# the material values of the pieces (indexed by the piece constant), positive for white and negative for black
+PIECE_VALUES = np.zeros(13, dtype=np.int16)
+for _piece, _value in ((QUEEN_WHITE, 9), (ROOK_WHITE, 5), (BISHOP_WHITE, 3), (KNIGHT_WHITE, 3), (PAWN_WHITE, 1)):
+    PIECE_VALUES[_piece] = _value
+    PIECE_VALUES[_piece + 6] = -_value
+
+# the bonuses of the white pieces on every square in hundredths of a pawn, written from white's view (rank 8 first)
+SQUARE_BONUSES = {
+    PAWN_WHITE: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ),
+    KNIGHT_WHITE: (
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ),
+    BISHOP_WHITE: (
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ),
+    ROOK_WHITE: (
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ),
+    QUEEN_WHITE: (
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ),
+    KING_WHITE: (
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ),
+}
+
+
+def create_piece_square_table(piece_values=PIECE_VALUES, square_bonuses: dict = None) -> np.ndarray:
+    """
+    Creates the table of the values of every piece on every square (in pawns), combining material and position.
+    :param piece_values: The material values indexed by the piece constant.
+    :param square_bonuses: The bonuses of the white pieces in hundredths of a pawn (rank 8 first). The bonuses of the
+        black pieces are mirrored.
+    :return: The 13 x 64 table (float32), indexed by the piece constant and the square.
+    """
+    table = np.repeat(np.asarray(piece_values, dtype=np.float32)[:, np.newaxis], 64, axis=1)
+    for piece, bonuses in (square_bonuses or {}).items():
+        # reverse the ranks, so that the rows start with a1
+        bonuses = np.asarray(bonuses, dtype=np.float32).reshape(8, 8)[::-1].reshape(64) / 100
+        table[piece] += bonuses
+        # black pieces are mirrored vertically and count for black
+        table[piece + 6] -= bonuses.reshape(8, 8)[::-1].reshape(64)
+    return table
+
+
+PIECE_SQUARE_TABLE = create_piece_square_table(PIECE_VALUES, SQUARE_BONUSES)
+
+
+class PositionBatch:
+    """
+    Many positions stored in NumPy arrays (see above).
+    """
+
+    def __init__(self, squares: np.ndarray, black_to_move: np.ndarray = None, castle_rights: np.ndarray = None,
+                 en_passant_squares: np.ndarray = None, half_move_counts: np.ndarray = None,
+                 move_numbers: np.ndarray = None):
+        self.squares = np.asarray(squares, dtype=np.int8).reshape(-1, 64)
+        size = len(self.squares)
+        self.black_to_move = np.zeros(size, dtype=bool) if black_to_move is None \
+            else np.asarray(black_to_move, dtype=bool)
+        self.castle_rights = np.zeros(size, dtype=np.uint8) if castle_rights is None \
+            else np.asarray(castle_rights, dtype=np.uint8)
+        self.en_passant_squares = np.full(size, -1, dtype=np.int8) if en_passant_squares is None \
+            else np.asarray(en_passant_squares, dtype=np.int8)
+        self.half_move_counts = np.zeros(size, dtype=np.uint16) if half_move_counts is None \
+            else np.asarray(half_move_counts, dtype=np.uint16)
+        self.move_numbers = np.ones(size, dtype=np.uint16) if move_numbers is None \
+            else np.asarray(move_numbers, dtype=np.uint16)
+
+    def __len__(self) -> int:
+        return len(self.squares)
+
+    def to_board(self, index: int, board_class=Chessboard) -> Chessboard:
+        """
+        Creates a chessboard of one position of the batch.
+        :param index: The index of the position.
+        :param board_class: The class of the created chessboard (Chessboard or a subclass with the same constructor).
+        :return: The new chessboard.
+        """
+        castle_rights = int(self.castle_rights[index])
+        castle = {
+            'white': {
+                'short': bool(castle_rights & CASTLE_RIGHT_WHITE_SHORT),
+                'long': bool(castle_rights & CASTLE_RIGHT_WHITE_LONG),
+            },
+            'black': {
+                'short': bool(castle_rights & CASTLE_RIGHT_BLACK_SHORT),
+                'long': bool(castle_rights & CASTLE_RIGHT_BLACK_LONG),
+            }
+        }
+        en_passant_square = int(self.en_passant_squares[index])
+        return board_class(bytearray(self.squares[index].tobytes()), 'black' if self.black_to_move[index] else 'white',
+                           castle, en_passant_square != -1, en_passant_square, int(self.move_numbers[index]),
+                           int(self.half_move_counts[index]))
+
+    def to_boards(self, board_class=Chessboard):
+        """
+        Yields chessboards of all positions of the batch, one at a time.
+        :param board_class: The class of the created chessboards.
+        """
+        for index in range(len(self)):
+            yield self.to_board(index, board_class)
+
+
+def from_boards(boards) -> PositionBatch:
+    """
+    Creates a batch of the current positions of chessboards.
+    :param boards: The chessboards (any iterable).
+    :return: The new batch.
+    """
+    boards = list(boards)
+    squares = np.frombuffer(b''.join(bytes(board.board) for board in boards), dtype=np.int8).reshape(-1, 64)
+    return PositionBatch(squares,
+                         [board.turn == 'black' for board in boards],
+                         [board.castle_rights for board in boards],
+                         [board.en_passant_square for board in boards],
+                         [min(board.half_move_count_for_draw, 0xFFFF) for board in boards],
+                         [board.move_number for board in boards])
+
+
+def from_bytes(data) -> PositionBatch:
+    """
+    Creates a batch of consecutive positions in the binary encoding of position_encoding (e.g. a memory-mapped file).
+    All positions are decoded at once.
+    :param data: The bytes-like object.
+    :return: The new batch.
+    """
+    if len(data) % POSITION_SIZE != 0:
+        raise ValueError('the data is no sequence of encoded positions')
+    rows = np.frombuffer(data, dtype=np.uint8).reshape(-1, POSITION_SIZE)
+    packed_board = rows[:, :BOARD_SIZE]
+    squares = np.empty((len(rows), 64), dtype=np.int8)
+    squares[:, 0::2] = packed_board & 15
+    squares[:, 1::2] = packed_board >> 4
+    flags = rows[:, BOARD_SIZE]
+    return PositionBatch(squares,
+                         flags & 1 != 0,
+                         flags >> 1,
+                         rows[:, BOARD_SIZE + 1].astype(np.int8) - 1,
+                         rows[:, BOARD_SIZE + 2].astype(np.uint16) | rows[:, BOARD_SIZE + 3].astype(np.uint16) << 8,
+                         rows[:, BOARD_SIZE + 4].astype(np.uint16) | rows[:, BOARD_SIZE + 5].astype(np.uint16) << 8)
+
+
+def evaluate_material(batch: PositionBatch) -> np.ndarray:
+    """
+    Counts the material of all positions (the same as engine.evaluate without checkmate and draw detection).
+    :param batch: The positions.
+    :return: The material balances from white's view (int16), one per position.
+    """
+    return PIECE_VALUES[batch.squares].sum(axis=1, dtype=np.int16)
+
+
+def evaluate(batch: PositionBatch, table: np.ndarray = PIECE_SQUARE_TABLE) -> np.ndarray:
+    """
+    Evaluates the material and the piece placement of all positions in one operation.
+    :param batch: The positions.
+    :param table: The values of the pieces on the squares (see create_piece_square_table).
+    :return: The evaluations in pawns from white's view (float32), one per position.
+    """
+    return table[batch.squares, np.arange(64)].sum(axis=1)
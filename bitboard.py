@@ -0,0 +1,281 @@
+import chessboard
+from attack_tables import KNIGHT_TARGETS, KING_TARGETS, PAWN_ATTACKS, to_mask
+from board_constants import *
+from chessboard import GENERATE_ALL, GENERATE_CAPTURES, GENERATE_QUIETS, Chessboard, \
+    create_from_fen as create_mailbox_from_fen
+from magic import bishop_attacks, rook_attacks
+from move_encoding import CAPTURE_SHIFT, FLAG_DOUBLE_PAWN_MOVE, FLAG_EN_PASSANT, FLAG_PROMOTION, encode_move
+
+# masks for files and ranks
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_3 = RANK_1 << 16
+RANK_6 = RANK_1 << 40
+RANK_8 = RANK_1 << 56
+ALL_SQUARES = 0xFFFFFFFFFFFFFFFF
+
+# the player of every piece constant (the keys of BitboardChessboard.colours)
+COLOUR_NAMES = (None,) + ('white',) * 6 + ('black',) * 6
+
+PROMOTIONS = (PROMOTION_QUEEN, PROMOTION_ROOK, PROMOTION_BISHOP, PROMOTION_KNIGHT)
+
+KNIGHT_ATTACKS = [to_mask(targets) for targets in KNIGHT_TARGETS]
+KING_ATTACKS = [to_mask(targets) for targets in KING_TARGETS]
+# the squares attacked by a pawn of the colour standing on the square
+PAWN_ATTACK_MASKS = {player: [to_mask(targets) for targets in table] for player, table in PAWN_ATTACKS.items()}
+
+
+def squares_of(bitboard: int):
+    """
+    Yields the indices of all set bits of a bitboard, starting with the lowest.
+    :param bitboard: The bitboard.
+    """
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        yield lowest_bit.bit_length() - 1
+        bitboard ^= lowest_bit
+
+
+class BitboardChessboard(Chessboard):
+    """
+    A chessboard that additionally stores the position as bitboards (one 64-bit integer per piece and colour).
+    Move generation and attack detection run on the bitboards, the list of squares is kept in sync so that
+    the public interface of Chessboard is unchanged.
+    The backend is experimental: the move generation is faster than with the list of squares, but making and undoing
+    moves is slower, so perft and the search are only slightly faster.
+    """
+
+    def __init__(self, board: list, turn: str, castle: dict, en_passant: bool, en_passant_field: int, move_number: int,
+                 draw_counter: int) -> None:
+        """
+        Creates a new chessboard with all basic data.
+        :param board: The list of squares.
+        :param turn: Which player has to make a move next.
+        :param castle: The castle rights of both players.
+        :param en_passant: If there is an en passant in the position.
+        :param en_passant_field: The field of the en passant.
+        :param move_number: The current move number.
+        :param draw_counter: The counter of moves for the 50 move rule.
+        """
+        super().__init__(board, turn, castle, en_passant, en_passant_field, move_number, draw_counter)
+        self.pieces = [0] * 13  # one bitboard per piece, indexed by the piece constant
+        self.colours = {'white': 0, 'black': 0}
+        self.occupied = 0
+        for square in range(64):
+            self.update_square(square, EMPTY, self.board[square])
+
+    def copy(self):
+        """
+        Creates an independent copy of the chessboard including the bitboards and the made moves.
+        :return: The copy.
+        """
+        board = super().copy()
+        board.pieces = self.pieces[:]
+        board.colours = self.colours.copy()
+        return board
+
+    def update_square(self, square: int, old_piece: int, new_piece: int):
+        """
+        Updates the bitboards after the content of a square changed.
+        :param square: The square.
+        :param old_piece: The previous content of the square.
+        :param new_piece: The new content of the square.
+        """
+        bit = 1 << square
+        if old_piece != EMPTY:
+            self.pieces[old_piece] ^= bit
+            self.colours['white' if old_piece <= 6 else 'black'] ^= bit
+            self.occupied ^= bit
+        if new_piece != EMPTY:
+            self.pieces[new_piece] ^= bit
+            self.colours['white' if new_piece <= 6 else 'black'] ^= bit
+            self.occupied ^= bit
+
+    def set_piece(self, square: int, piece: int):
+        """
+        Puts a piece on a square (or empties it) and updates the bitboards. This is called several times for every
+        move, so the update of the bitboards is not delegated to update_square.
+        :param square: The square.
+        :param piece: The new content of the square.
+        """
+        old_piece = self.board[square]
+        bit = 1 << square
+        if old_piece != EMPTY:
+            self.pieces[old_piece] ^= bit
+            self.colours[COLOUR_NAMES[old_piece]] ^= bit
+            self.occupied ^= bit
+        if piece != EMPTY:
+            self.pieces[piece] ^= bit
+            self.colours[COLOUR_NAMES[piece]] ^= bit
+            self.occupied ^= bit
+        Chessboard.set_piece(self, square, piece)
+
+    def is_attacked_by_white(self, square: int) -> bool:
+        """
+        Checks if the specified square is attacked by white.
+        :param square: The square that is checked.
+        :return: If the square is attacked by white.
+        """
+        return self.is_attacked_by(square, 'white')
+
+    def is_attacked_by_black(self, square: int) -> bool:
+        """
+        Checks if the specified square is attacked by black.
+        :param square: The square that is checked.
+        :return: If the square is attacked by black.
+        """
+        return self.is_attacked_by(square, 'black')
+
+    def is_attacked_by(self, square: int, player: str) -> bool:
+        """
+        Checks if the specified square is attacked by a player.
+        :param square: The square that is checked.
+        :param player: The attacking player.
+        :return: If the square is attacked by the player.
+        """
+        pieces = self.pieces
+        if player == 'white':
+            king, queen, bishop, knight, rook, pawn = pieces[KING_WHITE:PAWN_WHITE + 1]
+            # a white pawn attacks the square if a black pawn on the square would attack the pawn
+            pawn_attacks = PAWN_ATTACK_MASKS['black'][square]
+        else:
+            king, queen, bishop, knight, rook, pawn = pieces[KING_BLACK:PAWN_BLACK + 1]
+            pawn_attacks = PAWN_ATTACK_MASKS['white'][square]
+        if KNIGHT_ATTACKS[square] & knight or KING_ATTACKS[square] & king or pawn_attacks & pawn:
+            return True
+        if (rook | queen) and rook_attacks(square, self.occupied) & (rook | queen):
+            return True
+        if (bishop | queen) and bishop_attacks(square, self.occupied) & (bishop | queen):
+            return True
+        return False
+
+    def generate_pseudo_legal_moves(self, mode: int = GENERATE_ALL) -> list:
+        """
+        Generates all moves of the current player without checking if the own king is left in check.
+        :param mode: The kinds of moves that are generated (GENERATE_* constants).
+        :return: The list of pseudo legal moves (encoded).
+        """
+        board = self.board
+        pieces = self.pieces
+        occupied = self.occupied
+        if self.turn == 'white':
+            own = self.colours['white']
+            enemy = self.colours['black']
+            king, queen, rook, bishop, knight, pawn = KING_WHITE, QUEEN_WHITE, ROOK_WHITE, BISHOP_WHITE, \
+                KNIGHT_WHITE, PAWN_WHITE
+        else:
+            own = self.colours['black']
+            enemy = self.colours['white']
+            king, queen, rook, bishop, knight, pawn = KING_BLACK, QUEEN_BLACK, ROOK_BLACK, BISHOP_BLACK, \
+                KNIGHT_BLACK, PAWN_BLACK
+        # the squares the pieces may move to
+        targets = 0
+        if mode & GENERATE_CAPTURES:
+            targets |= enemy
+        if mode & GENERATE_QUIETS:
+            targets |= ~occupied & ALL_SQUARES
+        moves = []
+
+        def add_moves(start_square: int, targets: int):
+            for target_square in squares_of(targets):
+                moves.append(start_square | target_square << 6 | board[target_square] << CAPTURE_SHIFT)
+
+        for square in squares_of(pieces[king]):
+            add_moves(square, KING_ATTACKS[square] & targets)
+            if mode & GENERATE_QUIETS:
+                moves.extend(self.get_castle_moves(square))
+        for square in squares_of(pieces[knight]):
+            add_moves(square, KNIGHT_ATTACKS[square] & targets)
+        for square in squares_of(pieces[bishop] | pieces[queen]):
+            add_moves(square, bishop_attacks(square, occupied) & targets)
+        for square in squares_of(pieces[rook] | pieces[queen]):
+            add_moves(square, rook_attacks(square, occupied) & targets)
+        moves.extend(self.get_pawn_moves_bitboard(pieces[pawn], enemy, mode))
+        return moves
+
+    def get_pawn_moves_bitboard(self, pawns: int, enemy: int, mode: int = GENERATE_ALL) -> list:
+        """
+        Generates the moves of all pawns of the current player at once. Promotions (also without taking) count as
+        captures.
+        :param pawns: The bitboard of the pawns.
+        :param enemy: The bitboard of all enemy pieces.
+        :param mode: The kinds of moves that are generated (GENERATE_* constants).
+        :return: The list of pawn moves (encoded).
+        """
+        board = self.board
+        empty = ~self.occupied & ALL_SQUARES
+        moves = []
+        if self.turn == 'white':
+            forward = 8
+            single_pushes = (pawns << 8) & empty
+            double_pushes = ((single_pushes & RANK_3) << 8) & empty
+            # captures to the left/right (seen from white)
+            captures = (((pawns & ~FILE_A) << 7) & enemy, 7), (((pawns & ~FILE_H) << 9) & enemy, 9)
+            promotion_rank = RANK_8
+        else:
+            forward = -8
+            single_pushes = (pawns >> 8) & empty
+            double_pushes = ((single_pushes & RANK_6) >> 8) & empty
+            captures = (((pawns & ~FILE_H) >> 7) & enemy, -7), (((pawns & ~FILE_A) >> 9) & enemy, -9)
+            promotion_rank = RANK_1
+
+        if mode & GENERATE_QUIETS:
+            for target_square in squares_of(single_pushes & ~promotion_rank):
+                moves.append(target_square - forward | target_square << 6)
+            for target_square in squares_of(double_pushes):
+                moves.append(encode_move(target_square - 2 * forward, target_square, FLAG_DOUBLE_PAWN_MOVE))
+        if not mode & GENERATE_CAPTURES:
+            return moves
+        for target_square in squares_of(single_pushes & promotion_rank):
+            for promotion in PROMOTIONS:
+                moves.append(encode_move(target_square - forward, target_square, FLAG_PROMOTION, promotion))
+        for targets, offset in captures:
+            for target_square in squares_of(targets):
+                start_square = target_square - offset
+                if (1 << target_square) & promotion_rank:
+                    for promotion in PROMOTIONS:
+                        moves.append(encode_move(start_square, target_square, FLAG_PROMOTION, promotion,
+                                                 board[target_square]))
+                else:
+                    moves.append(encode_move(start_square, target_square, captured_piece=board[target_square]))
+        if self.en_passant:
+            en_passant_square = self.en_passant_square
+            # the pawns that could take on the en passant square, seen from the opponent's pawn
+            if self.turn == 'white':
+                opponent, captured_pawn = 'black', PAWN_BLACK
+            else:
+                opponent, captured_pawn = 'white', PAWN_WHITE
+            for start_square in squares_of(PAWN_ATTACK_MASKS[opponent][en_passant_square] & pawns):
+                moves.append(encode_move(start_square, en_passant_square, FLAG_EN_PASSANT, 0, captured_pawn))
+        return moves
+
+
+def create_from_fen(fen: str) -> BitboardChessboard:
+    """
+    Creates a new bitboard chessboard out of the FEN notation of a position.
+    :param fen: The position in FEN-Format. If fen is empty, an empty board is returned.
+    :return: The BitboardChessboard corresponding to the FEN.
+    """
+    return from_chessboard(create_mailbox_from_fen(fen))
+
+
+def create_starting_position() -> BitboardChessboard:
+    """
+    Creates a bitboard chessboard with the starting position.
+    :return: A new bitboard chessboard with the starting position.
+    """
+    return from_chessboard(chessboard.create_starting_position())
+
+
+def from_chessboard(position: Chessboard) -> BitboardChessboard:
+    """
+    Creates a bitboard chessboard with the same position and game state as the given chessboard.
+    Moves that were already made on the given chessboard can not be undone on the new board.
+    :param position: The chessboard.
+    :return: The new bitboard chessboard.
+    """
+    castle = {player: dict(rights) for player, rights in position.castle.items()}
+    return BitboardChessboard(list(position.board), position.turn, castle, position.en_passant,
+                              position.get_en_passant_square(), position.move_number,
+                              position.half_move_count_for_draw)
@@ -114,3 +114,9 @@ PROMOTION_BISHOP = -4
 PROMOTION_KNIGHT = -3
 DOUBLE_PAWN_MOVE = -10
 EN_PASSANT = -11
+# castle rights as bits of a bitmask
+CASTLE_RIGHT_WHITE_SHORT = 1
+CASTLE_RIGHT_WHITE_LONG = 2
+CASTLE_RIGHT_BLACK_SHORT = 4
+CASTLE_RIGHT_BLACK_LONG = 8
+CASTLE_RIGHTS_ALL = 15
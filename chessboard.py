@@ -1,4 +1,27 @@
+from array import array
+
+from attack_tables import DIAGONAL_RAYS, KING_TARGETS, KNIGHT_TARGETS, PAWN_ATTACKS, RAYS, STRAIGHT_RAYS
 from board_constants import *
+from move_encoding import CAPTURE_SHIFT, FLAG_CASTLE_LONG, FLAG_CASTLE_SHORT, FLAG_DOUBLE_PAWN_MOVE, FLAG_EN_PASSANT, \
+    FLAG_NONE, FLAG_PROMOTION, FLAG_SHIFT, PROMOTION_SHIFT, encode_move, from_tuple, to_tuple
+from zobrist import BLACK_TO_MOVE_KEY, CASTLE_KEYS, EN_PASSANT_KEYS, PIECE_KEYS, calculate_hash
+
+# the kinds of moves that are generated (combined as bitmask): captures include promotions and en passant, quiet
+# moves are all other moves
+GENERATE_CAPTURES = 1
+GENERATE_QUIETS = 2
+GENERATE_ALL = GENERATE_CAPTURES | GENERATE_QUIETS
+
+# the number of undo records that are allocated at once
+UNDO_STACK_SIZE = 256
+# the castle rights that remain after a move from or to the square (only the king and rook squares remove rights)
+CASTLE_RIGHTS_KEPT = [CASTLE_RIGHTS_ALL] * 64
+CASTLE_RIGHTS_KEPT[SQUARES['a1']] = CASTLE_RIGHTS_ALL & ~CASTLE_RIGHT_WHITE_LONG
+CASTLE_RIGHTS_KEPT[SQUARES['e1']] = CASTLE_RIGHTS_ALL & ~(CASTLE_RIGHT_WHITE_SHORT | CASTLE_RIGHT_WHITE_LONG)
+CASTLE_RIGHTS_KEPT[SQUARES['h1']] = CASTLE_RIGHTS_ALL & ~CASTLE_RIGHT_WHITE_SHORT
+CASTLE_RIGHTS_KEPT[SQUARES['a8']] = CASTLE_RIGHTS_ALL & ~CASTLE_RIGHT_BLACK_LONG
+CASTLE_RIGHTS_KEPT[SQUARES['e8']] = CASTLE_RIGHTS_ALL & ~(CASTLE_RIGHT_BLACK_SHORT | CASTLE_RIGHT_BLACK_LONG)
+CASTLE_RIGHTS_KEPT[SQUARES['h8']] = CASTLE_RIGHTS_ALL & ~CASTLE_RIGHT_BLACK_SHORT
 
 
 class Chessboard:
@@ -19,25 +42,82 @@ class Chessboard:
         :param move_number: The current move number.
         :param draw_counter: The counter of moves for the 50 move rule.
         """
-        # initialize board
-        self.board = board
+        # initialize board: one byte per square, so copying the board is a single buffer copy
+        self.board = bytearray(board)
         self.turn = turn
-        self.castle = castle
-        self.move_number_castle_loss_short_white = 0
-        self.move_number_castle_loss_long_white = 0
-        self.move_number_castle_loss_short_black = 0
-        self.move_number_castle_loss_long_black = 0
+        self.castle_rights = 0  # bitmask of the CASTLE_RIGHT_* constants
+        for player, short_right, long_right in (('white', CASTLE_RIGHT_WHITE_SHORT, CASTLE_RIGHT_WHITE_LONG),
+                                                ('black', CASTLE_RIGHT_BLACK_SHORT, CASTLE_RIGHT_BLACK_LONG)):
+            if castle[player]['short']:
+                self.castle_rights |= short_right
+            if castle[player]['long']:
+                self.castle_rights |= long_right
         self.en_passant = en_passant
-        self.en_passant_squares = []  # the list of squares where en passant is possible for every position
-        if self.en_passant:
-            self.en_passant_squares.append(en_passant_field)
-        else:
-            self.en_passant_squares.append(-1)
+        self.en_passant_square = en_passant_field if en_passant else -1
         self.half_move_count_for_draw = draw_counter
         self.move_number = move_number
+        # the Zobrist hash of the position, updated with every change of the position (see zobrist)
+        self.hash = calculate_hash(self.board, self.turn, self.castle_rights, self.en_passant_square)
+        # if set, the hash is compared to a full recalculation after every move and undo
+        self.debug = False
+        # the number of legal moves and if the current player is in check, cached for the position with the key
+        self.status = (0, False)
+        self.status_key = None
         self.moves = []  # the list of moves that were made
-        # this list needs to keep track of all previous half move counters for undoing moves
-        self.half_move_counters = []
+        # one undo record per made move: the state that can not be restored from the move itself
+        self.ply = 0
+        self.undo_states = array('Q', bytes(8 * UNDO_STACK_SIZE))
+        self.undo_hashes = array('Q', bytes(8 * UNDO_STACK_SIZE))
+        # the squares of the kings and of all pieces of each player (-1 if there is no king)
+        self.king_squares = {'white': -1, 'black': -1}
+        self.piece_squares = {'white': set(), 'black': set()}
+        for square in range(64):
+            if self.board[square] != EMPTY:
+                self.add_piece_square(square, self.board[square])
+
+    def copy(self):
+        """
+        Creates an independent copy of the chessboard including the made moves, so they can be undone on the copy.
+        The board and the undo records are flat buffers, so no nested structure has to be deep-copied.
+        :return: The copy.
+        """
+        board = self.__class__.__new__(self.__class__)
+        board.__dict__.update(self.__dict__)
+        board.board = bytearray(self.board)
+        board.moves = self.moves[:]
+        board.undo_states = self.undo_states[:]
+        board.undo_hashes = self.undo_hashes[:]
+        board.king_squares = self.king_squares.copy()
+        board.piece_squares = {'white': self.piece_squares['white'].copy(),
+                               'black': self.piece_squares['black'].copy()}
+        return board
+
+    def copy_make(self, move):
+        """
+        Makes a move on a copy of the chessboard (copy-make), the chessboard itself is not changed.
+        :param move: The tuple describing the move or the move encoded as an int (see move_encoding).
+        :return: The copy with the move made.
+        """
+        board = self.copy()
+        board.move(move)
+        return board
+
+    @property
+    def castle(self) -> dict:
+        """
+        The castle rights of both players in the form {'white': {'short': bool, 'long': bool}, 'black': {...}}.
+        Changing the returned dictionary does not change the castle rights.
+        """
+        return {
+            'white': {
+                'short': bool(self.castle_rights & CASTLE_RIGHT_WHITE_SHORT),
+                'long': bool(self.castle_rights & CASTLE_RIGHT_WHITE_LONG),
+            },
+            'black': {
+                'short': bool(self.castle_rights & CASTLE_RIGHT_BLACK_SHORT),
+                'long': bool(self.castle_rights & CASTLE_RIGHT_BLACK_LONG),
+            }
+        }
 
     def is_empty(self, field: int) -> bool:
         """
@@ -76,109 +156,116 @@ class Chessboard:
             return True
         return False
 
-    def move(self, move: tuple):
+    def set_piece(self, square: int, piece: int):
+        """
+        Puts a piece on a square (or empties it) and updates the piece squares.
+        :param square: The square.
+        :param piece: The new content of the square.
+        """
+        old_piece = self.board[square]
+        self.hash ^= PIECE_KEYS[old_piece][square] ^ PIECE_KEYS[piece][square]
+        if old_piece != EMPTY:
+            self.piece_squares['white' if old_piece <= 6 else 'black'].discard(square)
+        if piece != EMPTY:
+            self.add_piece_square(square, piece)
+        self.board[square] = piece
+
+    def add_piece_square(self, square: int, piece: int):
+        """
+        Adds the square of a piece to the piece squares and king squares.
+        :param square: The square of the piece.
+        :param piece: The piece.
+        """
+        if piece <= 6:
+            self.piece_squares['white'].add(square)
+            if piece == KING_WHITE:
+                self.king_squares['white'] = square
+        else:
+            self.piece_squares['black'].add(square)
+            if piece == KING_BLACK:
+                self.king_squares['black'] = square
+
+    def move(self, move):
         """
         Moves a piece according to the specified move.
-        :param move: The tuple describing the move.
+        :param move: The tuple describing the move or the move encoded as an int (see move_encoding).
         """
-        if len(move) < 2:
-            return
+        if move.__class__ is int:
+            encoded_move = move
+        else:
+            if len(move) < 2:
+                return
+            encoded_move = from_tuple(move)
 
-        start_square = move[0]
-        target_square = move[1]
+        start_square = encoded_move & 63
+        target_square = encoded_move >> 6 & 63
+        flag = encoded_move >> FLAG_SHIFT & 7
+        board = self.board
 
-        if self.is_empty(start_square):
+        if board[start_square] == EMPTY:
             return
         if self.is_white_piece(start_square) and self.turn == 'black':
             return
         if self.is_black_piece(start_square) and self.turn == 'white':
             return
 
+        # save the undo record
+        if flag == FLAG_EN_PASSANT:
+            captured_piece = PAWN_BLACK if self.turn == 'white' else PAWN_WHITE
+        else:
+            captured_piece = board[target_square]
+        if self.ply == len(self.undo_states):
+            self.undo_states.extend(array('Q', bytes(8 * UNDO_STACK_SIZE)))
+            self.undo_hashes.extend(array('Q', bytes(8 * UNDO_STACK_SIZE)))
+        self.undo_states[self.ply] = captured_piece | self.castle_rights << 4 | (self.en_passant_square + 1) << 8 \
+            | min(self.half_move_count_for_draw, 0xFFFF) << 15 | encoded_move << 31
+        self.undo_hashes[self.ply] = self.hash
+        self.ply += 1
+
         # execute move
-        self.board[target_square] = self.board[start_square]
-        self.board[start_square] = EMPTY
+        moving_piece = board[start_square]
+        self.set_piece(target_square, moving_piece)
+        self.set_piece(start_square, EMPTY)
         # set en passant as not possible
+        if self.en_passant_square != -1:
+            self.hash ^= EN_PASSANT_KEYS[self.en_passant_square % 8]
         self.en_passant = False
-        self.en_passant_squares.append(-1)  # no en passant field
-        # if it was a special move, additional steps must be taken (promotion, en passant, castle)
-        if len(move) >= 3:  # castle, en passant, takes, promotion and takes+promotion
-            additional_move_info = move[2]
-            if additional_move_info == CASTLE_SHORT or additional_move_info == CASTLE_LONG:
-                self.half_move_count_for_draw += 1  # increase draw counter
-                if additional_move_info == CASTLE_SHORT:
-                    # move the rook
-                    if self.turn == 'white':
-                        self.board[SQUARES['h1']] = EMPTY
-                        self.board[SQUARES['f1']] = ROOK_WHITE
-                    else:
-                        self.board[SQUARES['h8']] = EMPTY
-                        self.board[SQUARES['f8']] = ROOK_BLACK
-                elif additional_move_info == CASTLE_LONG:
-                    # move the rook
-                    if self.turn == 'white':
-                        self.board[SQUARES['a1']] = EMPTY
-                        self.board[SQUARES['d1']] = ROOK_WHITE
-                    else:
-                        self.board[SQUARES['a8']] = EMPTY
-                        self.board[SQUARES['d8']] = ROOK_BLACK
-            else:
-                # reset draw counter (all special moves except castle)
-                self.half_move_counters.append(self.half_move_count_for_draw)
-                self.half_move_count_for_draw = 0
-
-                if additional_move_info == EN_PASSANT:
-                    # remove en passant pawn
-                    if self.turn == 'white':
-                        self.board[target_square - 8] = EMPTY
-                    else:
-                        self.board[target_square + 8] = EMPTY
-                elif additional_move_info == DOUBLE_PAWN_MOVE:
-                    # set en passant square
-                    self.en_passant = True
-                    # replace the previously set -1
-                    self.en_passant_squares[-1] = int((start_square + target_square) / 2)
-                elif additional_move_info == PROMOTION_QUEEN or additional_move_info == PROMOTION_ROOK or \
-                        additional_move_info == PROMOTION_KNIGHT or additional_move_info == PROMOTION_BISHOP:
-                    # promote the pawn
-                    self.promote(target_square, additional_move_info)
+        self.en_passant_square = -1
+        # update the draw counter: captures and pawn moves reset it
+        if captured_piece != EMPTY or moving_piece == PAWN_WHITE or moving_piece == PAWN_BLACK:
+            self.half_move_count_for_draw = 0
         else:
-            # pawn moves
-            if self.board[target_square] == PAWN_WHITE or self.board[target_square] == PAWN_BLACK:
-                # reset draw counter
-                self.half_move_counters.append(self.half_move_count_for_draw)
-                self.half_move_count_for_draw = 0
-            # all other moves
+            self.half_move_count_for_draw += 1
+        # if it was a special move, additional steps must be taken (promotion, en passant, castle)
+        if flag == FLAG_NONE:
+            pass
+        elif flag == FLAG_CASTLE_SHORT:
+            # move the rook
+            self.set_piece(start_square + 1, board[start_square + 3])
+            self.set_piece(start_square + 3, EMPTY)
+        elif flag == FLAG_CASTLE_LONG:
+            # move the rook
+            self.set_piece(start_square - 1, board[start_square - 4])
+            self.set_piece(start_square - 4, EMPTY)
+        elif flag == FLAG_EN_PASSANT:
+            # remove en passant pawn
+            if self.turn == 'white':
+                self.set_piece(target_square - 8, EMPTY)
             else:
-                self.half_move_count_for_draw += 1
-        # update castle rights
-        if self.board[target_square] == KING_WHITE or self.board[target_square] == KING_BLACK:
-            if self.castle[self.turn]['short']:
-                self.castle[self.turn]['short'] = False  # remove castle right
-                if self.turn == 'white':
-                    self.move_number_castle_loss_short_white = self.move_number
-                else:
-                    self.move_number_castle_loss_short_black = self.move_number
-            if self.castle[self.turn]['long']:
-                self.castle[self.turn]['long'] = False  # remove castle right
-                if self.turn == 'white':
-                    self.move_number_castle_loss_long_white = self.move_number
-                else:
-                    self.move_number_castle_loss_long_black = self.move_number
-        if self.board[target_square] == ROOK_WHITE or self.board[target_square] == ROOK_BLACK:
-            if self.castle[self.turn]['short']:
-                if self.turn == 'white' and start_square == SQUARES['h1']:
-                    self.castle[self.turn]['short'] = False  # remove castle right
-                    self.move_number_castle_loss_short_white = self.move_number
-                elif self.turn == 'black' and start_square == SQUARES['h8']:
-                    self.castle[self.turn]['short'] = False  # remove castle right
-                    self.move_number_castle_loss_short_black = self.move_number
-            if self.castle[self.turn]['long']:
-                if self.turn == 'white' and start_square == SQUARES['a1']:
-                    self.castle[self.turn]['long'] = False  # remove castle right
-                    self.move_number_castle_loss_long_white = self.move_number
-                elif self.turn == 'black' and start_square == SQUARES['a8']:
-                    self.castle[self.turn]['long'] = False  # remove castle right
-                    self.move_number_castle_loss_long_black = self.move_number
+                self.set_piece(target_square + 8, EMPTY)
+        elif flag == FLAG_DOUBLE_PAWN_MOVE:
+            # set en passant square
+            self.en_passant = True
+            self.en_passant_square = (start_square + target_square) // 2
+            self.hash ^= EN_PASSANT_KEYS[self.en_passant_square % 8]
+        elif flag == FLAG_PROMOTION:
+            # promote the pawn
+            self.promote(target_square, -(encoded_move >> PROMOTION_SHIFT & 15))
+        # update castle rights: moving the king or a rook, or taking a rook removes them
+        castle_rights = self.castle_rights & CASTLE_RIGHTS_KEPT[start_square] & CASTLE_RIGHTS_KEPT[target_square]
+        if castle_rights != self.castle_rights:
+            self.hash ^= CASTLE_KEYS[self.castle_rights] ^ CASTLE_KEYS[castle_rights]
+            self.castle_rights = castle_rights
 
         # add the move to the list of executed moves
         self.moves.append(move)
@@ -187,108 +274,78 @@ class Chessboard:
             self.move_number += 1
         # switch turn
         self.switch_turn()
+        if self.debug:
+            self.check_hash()
 
     def undo_last_move(self):
         """
         Reverses the last move that has been made.
         """
-        # get and remove the last move from the list
-        move = self.moves.pop()
-        # decrease move counter
-        if self.turn == 'white':
-            self.move_number -= 1
-        # decrease half move counter for draw (50 move rule)
-        if self.half_move_count_for_draw > 0:
-            self.half_move_count_for_draw -= 1
-        else:
-            # if it is at 0, the last one is loaded
-            self.half_move_count_for_draw = self.half_move_counters.pop()
+        # get and remove the last move and its undo record
+        self.moves.pop()
+        self.ply -= 1
+        undo_state = self.undo_states[self.ply]
+        captured_piece = undo_state & 15
+        self.castle_rights = undo_state >> 4 & 15
+        self.en_passant_square = (undo_state >> 8 & 127) - 1
+        self.en_passant = self.en_passant_square != -1
+        self.half_move_count_for_draw = undo_state >> 15 & 0xFFFF
+        encoded_move = undo_state >> 31
+        start_square = encoded_move & 63
+        target_square = encoded_move >> 6 & 63
+        flag = encoded_move >> FLAG_SHIFT & 7
+
         # switch turn
         self.switch_turn()
-        # update castle rights
-        if self.turn == 'white':
-            if self.move_number <= self.move_number_castle_loss_short_white:
-                self.move_number_castle_loss_short_white = 0
-                self.castle[self.turn]['short'] = True
-            if self.move_number <= self.move_number_castle_loss_long_white:
-                self.move_number_castle_loss_long_white = 0
-                self.castle[self.turn]['long'] = True
+        # decrease move counter
         if self.turn == 'black':
-            if self.move_number <= self.move_number_castle_loss_short_black:
-                self.move_number_castle_loss_short_black = 0
-                self.castle[self.turn]['short'] = True
-            if self.move_number <= self.move_number_castle_loss_long_black:
-                self.move_number_castle_loss_long_black = 0
-                self.castle[self.turn]['long'] = True
-
-        if len(move) < 2:
-            return
-        start_square = move[0]
-        target_square = move[1]
-
-        if self.is_empty(target_square):
-            return
-        if self.is_white_piece(target_square) and self.turn == 'black':
-            return
-        if self.is_black_piece(target_square) and self.turn == 'white':
-            return
+            self.move_number -= 1
 
         # undo the move
-        self.board[start_square] = self.board[target_square]
-        self.board[target_square] = EMPTY
-        # if it was a special move, additional steps must be taken (promotion, en passant, castle)
-        if len(move) == 3:  # castle, en passant, takes, promotion and takes+promotion
-            additional_move_info = move[2]
-            if additional_move_info == DOUBLE_PAWN_MOVE:
-                pass  # do nothing, is excluded for capture check at the end
-            elif additional_move_info == EN_PASSANT:
-                # restore en passant pawn
-                if self.turn == 'white':
-                    self.board[target_square - 8] = PAWN_BLACK
-                else:
-                    self.board[target_square + 8] = PAWN_WHITE
-            elif additional_move_info == CASTLE_SHORT:
-                # undo the rook move
-                if self.turn == 'white':
-                    self.board[SQUARES['h1']] = ROOK_WHITE
-                    self.board[SQUARES['f1']] = EMPTY
-                else:
-                    self.board[SQUARES['h8']] = ROOK_BLACK
-                    self.board[SQUARES['f8']] = EMPTY
-            elif additional_move_info == CASTLE_LONG:
-                # undo the rook move
-                if self.turn == 'white':
-                    self.board[SQUARES['a1']] = ROOK_WHITE
-                    self.board[SQUARES['d1']] = EMPTY
-                else:
-                    self.board[SQUARES['a8']] = ROOK_BLACK
-                    self.board[SQUARES['d8']] = EMPTY
-            elif additional_move_info == PROMOTION_QUEEN or additional_move_info == PROMOTION_ROOK or \
-                    additional_move_info == PROMOTION_KNIGHT or additional_move_info == PROMOTION_BISHOP:
-                # undo promotion
-                if self.turn == 'white':
-                    self.board[start_square] = PAWN_WHITE
-                else:
-                    self.board[start_square] = PAWN_BLACK
-            else:  # takes
-                # undo takes
-                self.board[target_square] = additional_move_info
-        elif len(move) == 4:  # takes+promotion
-            # undo promotion
+        if flag == FLAG_PROMOTION:
+            self.set_piece(start_square, PAWN_WHITE if self.turn == 'white' else PAWN_BLACK)
+        else:
+            self.set_piece(start_square, self.board[target_square])
+        self.set_piece(target_square, EMPTY)
+        # if it was a special move, additional steps must be taken (en passant, castle)
+        if flag == FLAG_EN_PASSANT:
+            # restore en passant pawn
             if self.turn == 'white':
-                self.board[start_square] = PAWN_WHITE
+                self.set_piece(target_square - 8, captured_piece)
             else:
-                self.board[start_square] = PAWN_BLACK
+                self.set_piece(target_square + 8, captured_piece)
+        elif captured_piece != EMPTY:
             # undo takes
-            self.board[target_square] = move[3]
+            self.set_piece(target_square, captured_piece)
+        elif flag == FLAG_CASTLE_SHORT:
+            # undo the rook move
+            self.set_piece(start_square + 3, self.board[start_square + 1])
+            self.set_piece(start_square + 1, EMPTY)
+        elif flag == FLAG_CASTLE_LONG:
+            # undo the rook move
+            self.set_piece(start_square - 4, self.board[start_square - 1])
+            self.set_piece(start_square - 1, EMPTY)
+        # the hash is restored as a whole instead of reversing every change
+        self.hash = self.undo_hashes[self.ply]
+        if self.debug:
+            self.check_hash()
+
+    def calculate_hash(self) -> int:
+        """
+        Calculates the hash of the current position from scratch.
+        :return: The 64-bit Zobrist hash.
+        """
+        return calculate_hash(self.board, self.turn, self.castle_rights, self.en_passant_square)
 
-        # set en passant information
-        self.en_passant_squares.pop()  # remove last en passant info
-        en_passant_square = self.en_passant_squares[-1]
-        if en_passant_square != -1:
-            self.en_passant = True
-        else:
-            self.en_passant = False
+    def check_hash(self):
+        """
+        Compares the incrementally updated hash to a full recalculation.
+        :raise RuntimeError: If the hashes differ.
+        """
+        expected_hash = self.calculate_hash()
+        if self.hash != expected_hash:
+            raise RuntimeError('hash mismatch after ' + str(self.moves[-5:]) + ': ' + hex(self.hash) + ' != '
+                               + hex(expected_hash))
 
     def promote(self, target_square: int, piece: int):
         """
@@ -302,27 +359,27 @@ class Chessboard:
                 return
 
             if piece == PROMOTION_QUEEN:
-                self.board[target_square] = QUEEN_WHITE
+                self.set_piece(target_square, QUEEN_WHITE)
             elif piece == PROMOTION_KNIGHT:
-                self.board[target_square] = KNIGHT_WHITE
+                self.set_piece(target_square, KNIGHT_WHITE)
             elif piece == PROMOTION_ROOK:
-                self.board[target_square] = ROOK_WHITE
+                self.set_piece(target_square, ROOK_WHITE)
             elif piece == PROMOTION_BISHOP:
-                self.board[target_square] = BISHOP_WHITE
+                self.set_piece(target_square, BISHOP_WHITE)
         else:
             if target_square > SQUARES['h1'] or not self.has_piece(target_square, PAWN_BLACK):
                 return
 
             if piece == PROMOTION_QUEEN:
-                self.board[target_square] = QUEEN_BLACK
+                self.set_piece(target_square, QUEEN_BLACK)
             elif piece == PROMOTION_KNIGHT:
-                self.board[target_square] = KNIGHT_BLACK
+                self.set_piece(target_square, KNIGHT_BLACK)
             elif piece == PROMOTION_ROOK:
-                self.board[target_square] = ROOK_BLACK
+                self.set_piece(target_square, ROOK_BLACK)
             elif piece == PROMOTION_BISHOP:
-                self.board[target_square] = BISHOP_BLACK
+                self.set_piece(target_square, BISHOP_BLACK)
 
-    def generate_moves(self) -> list:
+    def generate_moves(self, encoded: bool = False):
         """
         Generates a list of all legal moves in this position.
         The moves are stored as tuples in the following form:
@@ -334,80 +391,350 @@ class Chessboard:
             - Castle: (start_square_of_king, target_square_of_king, castle_indicator)
             - Double pawn move: (start_square, target_square, double_move_indicator)
             - En passant: (start_square, target_square, en_passant_indicator)
+        If encoded is set, the moves are returned as ints in an array('I') instead (see move_encoding).
+        :param encoded: If the moves should be returned encoded.
         :return: The list of legal moves.
         """
-        moves = []  # list of tuples with from-square and to-square. Special moves have the move type in third place.
+        checks_and_pins = self.get_checks_and_pins() if self.king_squares[self.turn] != -1 else None
+        if checks_and_pins is not None and checks_and_pins[0] > 0:
+            moves = self.generate_evasions(checks_and_pins)
+        else:
+            moves = self.filter_legal_moves(self.generate_pseudo_legal_moves(), checks_and_pins)
+        if encoded:
+            return array('I', moves)
+        return [to_tuple(move) for move in moves]
 
-        for square in range(64):
-            if self.is_empty(square):
-                continue
-            if self.turn == 'white' and self.is_white_piece(square):
-                if self.has_piece(square, KING_WHITE):
-                    moves.extend(self.get_king_moves(square))
-                elif self.has_piece(square, QUEEN_WHITE):
-                    moves.extend(self.get_queen_moves(square))
-                elif self.has_piece(square, ROOK_WHITE):
-                    moves.extend(self.get_rook_moves(square))
-                elif self.has_piece(square, BISHOP_WHITE):
-                    moves.extend(self.get_bishop_moves(square))
-                elif self.has_piece(square, KNIGHT_WHITE):
-                    moves.extend(self.get_knight_moves(square))
-                else:
-                    moves.extend(self.get_pawn_moves(square))
-            elif self.turn == 'black' and self.is_black_piece(square):
-                if self.has_piece(square, KING_BLACK):
-                    moves.extend(self.get_king_moves(square))
-                elif self.has_piece(square, QUEEN_BLACK):
-                    moves.extend(self.get_queen_moves(square))
-                elif self.has_piece(square, ROOK_BLACK):
-                    moves.extend(self.get_rook_moves(square))
-                elif self.has_piece(square, BISHOP_BLACK):
-                    moves.extend(self.get_bishop_moves(square))
-                elif self.has_piece(square, KNIGHT_BLACK):
-                    moves.extend(self.get_knight_moves(square))
-                else:
-                    moves.extend(self.get_pawn_moves(square))
+    def generate_captures(self) -> array:
+        """
+        Generates the legal captures, promotions and en passant moves without generating any quiet move.
+        :return: The encoded moves as array('I').
+        """
+        return array('I', self.filter_legal_moves(self.generate_pseudo_legal_moves(GENERATE_CAPTURES)))
 
-        # exclude moves where the king would be in check (or moved through check)
-        legal_moves = []
+    def generate_evasions(self, checks_and_pins: tuple = None) -> array:
+        """
+        Generates the legal moves of a player in check: king moves, captures of the checking piece and moves onto
+        the squares between it and the king. Only moves to these squares are generated. In double check only
+        the king can move.
+        :param checks_and_pins: The result of get_checks_and_pins if it is already known.
+        :return: The encoded moves as array('I').
+        """
+        king_square = self.king_squares[self.turn]
+        if checks_and_pins is None:
+            checks_and_pins = self.get_checks_and_pins()
+        # castling out of check is not allowed, so only the steps of the king are needed
+        moves = self.get_step_moves(king_square, KING_TARGETS[king_square])
+        if checks_and_pins[0] == 1:
+            for square in checks_and_pins[1]:
+                moves.extend(self.get_moves_to_square(square))
+            if self.en_passant:
+                # the checking piece can be the pawn that just moved two squares
+                pawn = PAWN_WHITE if self.turn == 'white' else PAWN_BLACK
+                for square in PAWN_ATTACKS['black' if self.turn == 'white' else 'white'][self.en_passant_square]:
+                    if self.board[square] == pawn:
+                        moves.append(encode_move(square, self.en_passant_square, FLAG_EN_PASSANT,
+                                                 captured_piece=PAWN_BLACK if pawn == PAWN_WHITE else PAWN_WHITE))
+        return array('I', self.filter_legal_moves(moves, checks_and_pins))
+
+    def get_moves_to_square(self, target_square: int) -> list:
+        """
+        Generates the pseudo legal moves of all pieces of the current player except the king that end on the target
+        square. The pieces are found by looking from the target square in all directions. En passant is not included.
+        :param target_square: The square.
+        :return: The list of moves (encoded).
+        """
+        board = self.board
+        is_white = self.turn == 'white'
+        captured_piece = board[target_square]
+        if captured_piece != EMPTY and (captured_piece <= 6) == is_white:
+            return []
+        if is_white:
+            queen, rook, bishop, knight, pawn, forward = QUEEN_WHITE, ROOK_WHITE, BISHOP_WHITE, KNIGHT_WHITE, \
+                PAWN_WHITE, 8
+        else:
+            queen, rook, bishop, knight, pawn, forward = QUEEN_BLACK, ROOK_BLACK, BISHOP_BLACK, KNIGHT_BLACK, \
+                PAWN_BLACK, -8
+        move_to_target = target_square << 6 | captured_piece << CAPTURE_SHIFT
+        moves = []
+
+        # sliding pieces: the first piece on each line
+        for all_rays, slider in ((STRAIGHT_RAYS, rook), (DIAGONAL_RAYS, bishop)):
+            for rays in all_rays:
+                for square in rays[target_square]:
+                    piece = board[square]
+                    if piece != EMPTY:
+                        if piece == queen or piece == slider:
+                            moves.append(square | move_to_target)
+                        break
+        for square in KNIGHT_TARGETS[target_square]:
+            if board[square] == knight:
+                moves.append(square | move_to_target)
+
+        # pawns take diagonally and move forward onto empty squares
+        start_squares = []
+        if captured_piece != EMPTY:
+            # an enemy pawn on the target square would attack the squares from which own pawns take
+            for square in PAWN_ATTACKS['black' if is_white else 'white'][target_square]:
+                if board[square] == pawn:
+                    start_squares.append(square)
+        elif 0 <= target_square - forward <= 63:
+            if board[target_square - forward] == pawn:
+                start_squares.append(target_square - forward)
+            elif board[target_square - forward] == EMPTY and target_square // 8 == (3 if is_white else 4) \
+                    and board[target_square - 2 * forward] == pawn:
+                moves.append(encode_move(target_square - 2 * forward, target_square, FLAG_DOUBLE_PAWN_MOVE))
+        for square in start_squares:
+            if target_square // 8 == (7 if is_white else 0):
+                for promotion in (PROMOTION_QUEEN, PROMOTION_ROOK, PROMOTION_BISHOP, PROMOTION_KNIGHT):
+                    moves.append(encode_move(square, target_square, FLAG_PROMOTION, promotion, captured_piece))
+            else:
+                moves.append(square | move_to_target)
+        return moves
+
+    def perft(self, depth: int) -> int:
+        """
+        Counts the leaf nodes of the tree of legal moves with the given depth (performance test). The counts of many
+        positions are known, so this verifies the move generation and measures its speed.
+        :param depth: The number of half moves.
+        :return: The number of positions reached after exactly depth half moves.
+        """
+        if depth == 0:
+            return 1
+        moves = self.generate_moves(True)
+        if depth == 1:
+            # bulk counting: the leaf positions do not have to be made
+            return len(moves)
+        nodes = 0
         for move in moves:
             self.move(move)
-            # check for legality
-            # since a move was made it is the other player's turn
-            if self.turn == 'black' and self.is_white_king_in_check():
-                self.undo_last_move()
+            nodes += self.perft(depth - 1)
+            self.undo_last_move()
+        return nodes
+
+    def divide(self, depth: int) -> dict:
+        """
+        Counts the leaf nodes of the perft tree separately for every legal move of the current position. Comparing
+        the counts with another move generator shows which move leads to a wrong count.
+        :param depth: The number of half moves (including the move itself).
+        :return: A dictionary from the encoded move to its number of leaf nodes.
+        """
+        nodes = {}
+        for move in self.generate_moves(True):
+            self.move(move)
+            nodes[move] = self.perft(depth - 1)
+            self.undo_last_move()
+        return nodes
+
+    def iterate_moves(self, hash_move: int = 0):
+        """
+        Yields the legal moves (encoded) in stages: first the hash move (if it is legal), then all captures
+        (including promotions and en passant) and then all quiet moves. In check, the evasions (captures first) follow
+        the hash move. A stage is only generated when the moves of the previous stages are used up, so a search that
+        stops early does not generate the remaining moves.
+        The position must be the same whenever the next move is requested (i.e. made moves have to be undone).
+        :param hash_move: The encoded move that is yielded first (e.g. the best move from an earlier search) or 0.
+        """
+        checks_and_pins = self.get_checks_and_pins() if self.king_squares[self.turn] != -1 else None
+        if hash_move:
+            if self.is_pseudo_legal(hash_move) and self.filter_legal_moves([hash_move], checks_and_pins):
+                yield hash_move
+            else:
+                hash_move = 0
+        if checks_and_pins is not None and checks_and_pins[0] > 0:
+            # in check there are only few moves, they are generated at once and yielded captures first
+            evasions = self.generate_evasions(checks_and_pins)
+            for is_capture in (True, False):
+                for move in evasions:
+                    if (move >> CAPTURE_SHIFT & 15 != EMPTY or move >> FLAG_SHIFT & 7 == FLAG_PROMOTION) == is_capture \
+                            and move != hash_move:
+                        yield move
+            return
+        for mode in (GENERATE_CAPTURES, GENERATE_QUIETS):
+            for move in self.filter_legal_moves(self.generate_pseudo_legal_moves(mode), checks_and_pins):
+                if move != hash_move:
+                    yield move
+
+    def is_pseudo_legal(self, move: int) -> bool:
+        """
+        Checks if an encoded move can be made by the current player, ignoring if the own king is left in check.
+        This is used for moves that do not come from the move generation of the position, e.g. hash moves.
+        :param move: The encoded move.
+        :return: If the move is pseudo legal.
+        """
+        start_square = move & 63
+        piece = self.board[start_square]
+        if piece == EMPTY or (piece <= 6) != (self.turn == 'white'):
+            return False
+        return move in self.get_piece_moves(start_square)
+
+    def generate_pseudo_legal_moves(self, mode: int = GENERATE_ALL) -> list:
+        """
+        Generates all moves of the current player without checking if the own king is left in check.
+        :param mode: The kinds of moves that are generated (GENERATE_* constants).
+        :return: The list of pseudo legal moves (encoded).
+        """
+        moves = []
+
+        # only the squares with pieces of the current player are visited
+        for square in sorted(self.piece_squares[self.turn]):
+            moves.extend(self.get_piece_moves(square, mode))
+        return moves
+
+    def get_piece_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
+        """
+        Generates the pseudo legal moves of the piece on the square.
+        :param square: The square of the piece.
+        :param mode: The kinds of moves that are generated (GENERATE_* constants).
+        :return: The list of pseudo legal moves (encoded).
+        """
+        piece = self.board[square]
+        if piece == KING_WHITE or piece == KING_BLACK:
+            return self.get_king_moves(square, mode)
+        elif piece == QUEEN_WHITE or piece == QUEEN_BLACK:
+            return self.get_queen_moves(square, mode)
+        elif piece == ROOK_WHITE or piece == ROOK_BLACK:
+            return self.get_rook_moves(square, mode)
+        elif piece == BISHOP_WHITE or piece == BISHOP_BLACK:
+            return self.get_bishop_moves(square, mode)
+        elif piece == KNIGHT_WHITE or piece == KNIGHT_BLACK:
+            return self.get_knight_moves(square, mode)
+        elif piece == PAWN_WHITE or piece == PAWN_BLACK:
+            return self.get_pawn_moves(square, mode)
+        return []
+
+    def filter_legal_moves(self, moves: list, checks_and_pins: tuple = None) -> list:
+        """
+        Removes all moves that leave the king of the current player in check.
+        Checking pieces and pinned pieces are calculated once, so that (except for en passant) no move has to be made.
+        :param moves: The pseudo legal moves (encoded).
+        :param checks_and_pins: The result of get_checks_and_pins if it is already known.
+        :return: The list of legal moves (encoded).
+        """
+        king_square = self.king_squares[self.turn]
+        if king_square == -1:
+            return moves
+        if checks_and_pins is None:
+            checks_and_pins = self.get_checks_and_pins()
+        checkers, check_squares, pins = checks_and_pins
+
+        # the king may not move to an attacked square. The king is removed, so it does not block attacks on squares
+        # behind it.
+        is_attacked = self.is_attacked_by_black if self.turn == 'white' else self.is_attacked_by_white
+        king = self.board[king_square]
+        self.set_piece(king_square, EMPTY)
+        safe_king_squares = [move >> 6 & 63 for move in moves
+                             if move & 63 == king_square and not is_attacked(move >> 6 & 63)]
+        self.set_piece(king_square, king)
+
+        legal_moves = []
+        for move in moves:
+            start_square = move & 63
+            target_square = move >> 6 & 63
+            if start_square == king_square:
+                if target_square in safe_king_squares:
+                    legal_moves.append(move)
+            elif checkers >= 2:
+                # double check: only the king can move
+                continue
+            elif move >> FLAG_SHIFT & 7 == FLAG_EN_PASSANT:
+                # en passant removes two pieces from a line. These rare cases are checked by making the move.
+                if not self.leaves_king_in_check(move):
+                    legal_moves.append(move)
+            elif checkers == 1 and target_square not in check_squares:
+                # the move neither takes the checking piece nor blocks the check
                 continue
-            elif self.turn == 'white' and self.is_black_king_in_check():
-                self.undo_last_move()
+            elif start_square in pins and target_square not in pins[start_square]:
+                # a pinned piece may only move along the pin
                 continue
             else:
                 legal_moves.append(move)
-                self.undo_last_move()
         return legal_moves
 
+    def get_checks_and_pins(self) -> tuple:
+        """
+        Finds the pieces that give check to the king of the current player and the pieces that are pinned to it.
+        :return: The number of checking pieces, the squares that stop the check (the squares of the checking pieces
+            and the squares between them and the king) and a dictionary from the square of each pinned piece to the
+            squares it can move to without leaving the pin.
+        """
+        board = self.board
+        king_square = self.king_squares[self.turn]
+        is_white = self.turn == 'white'
+        if is_white:
+            queen, rook, bishop, knight, pawn = QUEEN_BLACK, ROOK_BLACK, BISHOP_BLACK, KNIGHT_BLACK, PAWN_BLACK
+        else:
+            queen, rook, bishop, knight, pawn = QUEEN_WHITE, ROOK_WHITE, BISHOP_WHITE, KNIGHT_WHITE, PAWN_WHITE
+        checkers = 0
+        check_squares = set()
+        pins = {}
+
+        for all_rays, slider in ((STRAIGHT_RAYS, rook), (DIAGONAL_RAYS, bishop)):
+            for rays in all_rays:
+                ray = rays[king_square]
+                own_square = -1
+                for distance, square in enumerate(ray):
+                    piece = board[square]
+                    if piece == EMPTY:
+                        continue
+                    if (piece <= 6) == is_white:
+                        if own_square != -1:
+                            # two own pieces on the line
+                            break
+                        own_square = square
+                        continue
+                    if piece == queen or piece == slider:
+                        if own_square == -1:
+                            checkers += 1
+                            check_squares.update(ray[:distance + 1])
+                        else:
+                            pins[own_square] = ray[:distance + 1]
+                    break
+        for square in KNIGHT_TARGETS[king_square]:
+            if board[square] == knight:
+                checkers += 1
+                check_squares.add(square)
+        # enemy pawns attack the king from the squares a pawn of the current player on the king square would attack
+        for square in PAWN_ATTACKS[self.turn][king_square]:
+            if board[square] == pawn:
+                checkers += 1
+                check_squares.add(square)
+        return checkers, check_squares, pins
+
+    def leaves_king_in_check(self, move) -> bool:
+        """
+        Checks if a move leaves the king of the current player in check by making and undoing it.
+        :param move: The move (tuple or encoded).
+        :return: If the king is attacked after the move.
+        """
+        self.move(move)
+        # since a move was made it is the other player's turn
+        if self.turn == 'black':
+            in_check = self.is_white_king_in_check()
+        else:
+            in_check = self.is_black_king_in_check()
+        self.undo_last_move()
+        return in_check
+
     def is_white_king_in_check(self) -> bool:
         """
         Checks if the white king is attacked.
         :return: If the white king is in check.
         """
-        # search for king
-        for square in range(64):
-            if self.has_piece(square, KING_WHITE):
-                # check if king is attacked
-                return self.is_attacked_by_black(square)
+        square = self.king_squares['white']
+        if square != -1:
+            return self.is_attacked_by_black(square)
 
     def is_black_king_in_check(self) -> bool:
         """
         Checks if the black king is attacked.
         :return: If the black king is in check.
         """
-        # search for king
-        for square in range(64):
-            if self.has_piece(square, KING_BLACK):
-                # check if king is attacked
-                return self.is_attacked_by_white(square)
+        square = self.king_squares['black']
+        if square != -1:
+            return self.is_attacked_by_white(square)
 
-    def get_directional_moves(self, start_square: int, direction_x: int, direction_y: int, distance: int = 7) -> list:
+    def get_directional_moves(self, start_square: int, direction_x: int, direction_y: int, distance: int = 7,
+                              mode: int = GENERATE_ALL) -> list:
         """
         Returns a list of moves that are in the specified direction vector.
         The moves are either basic moves or taking moves. The distance is the maximum number of times
@@ -417,32 +744,27 @@ class Chessboard:
         :param direction_x: The x part of the direction vector.
         :param direction_y: The y part of the direction vector.
         :param distance: The maximum distance.
+        :param mode: The kinds of moves that are generated (GENERATE_* constants).
         :return: The list of moves.
         """
         is_white_piece = self.is_white_piece(start_square)
-        moves = []  # list of tuples with from-square and to-square (and possibly taken piece).
-
-        for i in range(1, distance + 1):
-            target_square = start_square + i * direction_x + 8 * i * direction_y
-            # check if the target field is still on the board
-            if not is_field(target_square):
-                return moves
-            # check if the target field has not crossed the left/right border
-            if direction_x < 0 and target_square % 8 > start_square % 8:
-                return moves
-            if direction_x > 0 and target_square % 8 < start_square % 8:
-                return moves
+        quiets = mode & GENERATE_QUIETS
+        moves = []  # list of encoded moves (basic moves and possibly one taking move).
+
+        ray = RAYS[(direction_x, direction_y)][start_square]
+        if distance < len(ray):
+            ray = ray[:distance]
+        for target_square in ray:
+            piece = self.board[target_square]
             # check if a piece was reached. (capture or same colour)
-            if not self.is_empty(target_square):
-                if not self.is_same_colour(start_square, target_square):
+            if piece != EMPTY:
+                if (piece > 6) == is_white_piece and mode & GENERATE_CAPTURES:
                     # takes move
-                    move = (start_square, target_square, self.board[target_square])
-                    moves.append(move)
+                    moves.append(start_square | target_square << 6 | piece << CAPTURE_SHIFT)
                 # a piece was reached: stop searching
                 return moves
-
-            move = (start_square, target_square)
-            moves.append(move)
+            if quiets:
+                moves.append(start_square | target_square << 6)
         return moves
 
     def is_attacked_by_white(self, square: int) -> bool:
@@ -451,316 +773,306 @@ class Chessboard:
         :param square: The square that is checked.
         :return: If the square is attacked by white.
         """
-        directions = [(1, -1), (1, 0), (1, 1), (0, -1), (0, 1), (-1, -1), (-1, 0), (-1, 1)]
-        knight_directions = [(2, 1), (2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2), (-2, 1), (-2, -1)]
-        # check all directions
-        for x, y in directions:
-            for distance in range(1, 8):
-                target_square = square + distance * x + 8 * distance * y
-                # check if the target square is still on the board or a black piece blocks a potential attack
-                if not is_field(target_square) or self.is_black_piece(target_square):
-                    break
-                # check if the target square has crossed the left/right border
-                if x < 0 and target_square % 8 > square % 8:
-                    break
-                if x > 0 and target_square % 8 < square % 8:
-                    break
-
-                # check if a piece was reached and the piece can take on the origin square
-                # if not, the piece blocks other pieces from attacking (-> exit the distance loop)
-                if self.has_piece(target_square, KING_WHITE):
-                    if distance == 1:
-                        return True
-                    else:
-                        break
-                elif self.has_piece(target_square, QUEEN_WHITE):
-                    return True
-                elif self.has_piece(target_square, ROOK_WHITE):
-                    if (x + y) % 2 == 1:  # only straight moves
-                        return True
-                    else:
-                        break
-                elif self.has_piece(target_square, BISHOP_WHITE):
-                    if (x + y) % 2 == 0:  # only diagonal moves
-                        return True
-                    else:
-                        break
-                elif self.has_piece(target_square, PAWN_WHITE):
-                    if distance == 1 and x != 0 and y == -1:  # viewpoint of the attacked field
-                        return True
-                    else:
-                        break
-
-        # check knight positions
-        for x, y in knight_directions:
-            target_square = square + x + 8 * y
-            # check if the target field is still on the board
-            if not is_field(target_square):
-                continue
-            # check if the target field has crossed the left/right border
-            if x < 0 and target_square % 8 > square % 8:
-                continue
-            if x > 0 and target_square % 8 < square % 8:
-                continue
-
-            # check if a white knight was reached
-            if self.has_piece(target_square, KNIGHT_WHITE):
-                return True
-
-        return False
+        return self.is_attacked_by_pieces(square, KING_WHITE, QUEEN_WHITE, ROOK_WHITE, BISHOP_WHITE, KNIGHT_WHITE,
+                                          PAWN_WHITE, PAWN_ATTACKS['black'])
 
     def is_attacked_by_black(self, square: int) -> bool:
         """
-        Checks if the specified square is attacked by white.
+        Checks if the specified square is attacked by black.
         :param square: The square that is checked.
-        :return: If the square is attacked by white.
+        :return: If the square is attacked by black.
         """
-        directions = [(1, -1), (1, 0), (1, 1), (0, -1), (0, 1), (-1, -1), (-1, 0), (-1, 1)]
-        knight_directions = [(2, 1), (2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2), (-2, 1), (-2, -1)]
-        # check all directions
-        for x, y in directions:
-            for distance in range(1, 8):
-                target_square = square + distance * x + 8 * distance * y
-                # check if the target field is still on the board or a white piece blocks a potential attack
-                if not is_field(target_square) or self.is_white_piece(target_square):
-                    break
-                # check if the target field has crossed the left/right border
-                if x < 0 and target_square % 8 > square % 8:
-                    break
-                if x > 0 and target_square % 8 < square % 8:
-                    break
+        return self.is_attacked_by_pieces(square, KING_BLACK, QUEEN_BLACK, ROOK_BLACK, BISHOP_BLACK, KNIGHT_BLACK,
+                                          PAWN_BLACK, PAWN_ATTACKS['white'])
 
-                # check if a piece was reached and the piece can take on the origin square
-                # if not, the piece blocks other pieces from attacking (-> exit the distance loop)
-                if self.has_piece(target_square, KING_BLACK):
-                    if distance == 1:
-                        return True
-                    else:
-                        break
-                elif self.has_piece(target_square, QUEEN_BLACK):
-                    return True
-                elif self.has_piece(target_square, ROOK_BLACK):
-                    if (x + y) % 2 == 1:  # only straight moves
-                        return True
-                    else:
-                        break
-                elif self.has_piece(target_square, BISHOP_BLACK):
-                    if (x + y) % 2 == 0:  # only diagonal moves
+    def is_attacked_by_pieces(self, square: int, king: int, queen: int, rook: int, bishop: int, knight: int, pawn: int,
+                              pawn_attacks: list) -> bool:
+        """
+        Checks if the specified square is attacked by the given pieces.
+        :param square: The square that is checked.
+        :param king: The king of the attacking player.
+        :param queen: The queen of the attacking player.
+        :param rook: The rook of the attacking player.
+        :param bishop: The bishop of the attacking player.
+        :param knight: The knight of the attacking player.
+        :param pawn: The pawn of the attacking player.
+        :param pawn_attacks: The pawn attack table of the defending player (the squares from which pawns attack).
+        :return: If the square is attacked.
+        """
+        board = self.board
+        # check the lines of the sliding pieces
+        for rays in STRAIGHT_RAYS:
+            for target_square in rays[square]:
+                piece = board[target_square]
+                if piece != EMPTY:
+                    if piece == queen or piece == rook:
                         return True
-                    else:
-                        break
-                elif self.has_piece(target_square, PAWN_BLACK):
-                    if distance == 1 and x != 0 and y == 1:  # viewpoint of the attacked square
+                    # the piece blocks other pieces from attacking
+                    break
+        for rays in DIAGONAL_RAYS:
+            for target_square in rays[square]:
+                piece = board[target_square]
+                if piece != EMPTY:
+                    if piece == queen or piece == bishop:
                         return True
-                    else:
-                        break
-
-        # check knight positions
-        for x, y in knight_directions:
-            target_square = square + x + 8 * y
-            # check if the target square is still on the board
-            if not is_field(target_square):
-                continue
-            # check if the target square has crossed the left/right border
-            if x < 0 and target_square % 8 > square % 8:
-                continue
-            if x > 0 and target_square % 8 < square % 8:
-                continue
-
-            # check if a black knight was reached
-            if self.has_piece(target_square, KNIGHT_BLACK):
+                    break
+        # check the pieces that attack by jumping to the square
+        for target_square in KNIGHT_TARGETS[square]:
+            if board[target_square] == knight:
                 return True
+        for target_square in KING_TARGETS[square]:
+            if board[target_square] == king:
+                return True
+        for target_square in pawn_attacks[square]:
+            if board[target_square] == pawn:
+                return True
+        return False
+
+    def get_status(self) -> tuple:
+        """
+        Returns the number of legal moves and if the current player is in check. Both are calculated once per
+        position and cached with the ply and the hash as key, so making or undoing a move invalidates the cache.
+        :return: The number of legal moves and if the king of the current player is in check.
+        """
+        key = (self.ply, self.hash)
+        if self.status_key != key:
+            if self.turn == 'white':
+                in_check = bool(self.is_white_king_in_check())
+            else:
+                in_check = bool(self.is_black_king_in_check())
+            self.status = (len(self.generate_moves(True)), in_check)
+            self.status_key = key
+        return self.status
 
+    def has_legal_move(self) -> bool:
+        """
+        Checks if the current player has a legal move. This stops at the first legal move (see iterate_moves), so it
+        is cheaper than get_status if the number of moves is not needed.
+        :return: If there is a legal move.
+        """
+        for move in self.iterate_moves():
+            return True
         return False
 
     def is_checkmate(self) -> bool:
-        if self.turn == 'white':
-            if self.is_white_king_in_check():
-                return len(self.generate_moves()) == 0
-        else:
-            if self.is_black_king_in_check():
-                return len(self.generate_moves()) == 0
+        number_of_moves, in_check = self.get_status()
+        return in_check and number_of_moves == 0
 
     def is_stalemate(self):
-        if self.turn == 'white':
-            if not self.is_white_king_in_check():
-                return len(self.generate_moves()) == 0
-        else:
-            if not self.is_black_king_in_check():
-                return len(self.generate_moves()) == 0
+        number_of_moves, in_check = self.get_status()
+        return not in_check and number_of_moves == 0
 
     def is_draw_move_count(self):
         return self.half_move_count_for_draw >= 100
 
+    def count_repetitions(self) -> int:
+        """
+        Counts how often the current position occurred before. Only the positions since the last capture or pawn move
+        (see the draw counter) with the same player to move are compared, using the hashes of the undo records.
+        :return: The number of earlier occurrences of the current position.
+        """
+        current_hash = self.hash
+        undo_hashes = self.undo_hashes
+        repetitions = 0
+        # the position before the k-th last move is undo_hashes[ply - k]. Castle and en passant changes also change
+        # the hash, so the first possible repetition is four half moves ago.
+        for ply in range(self.ply - 4, self.ply - 1 - min(self.half_move_count_for_draw, self.ply), -2):
+            if undo_hashes[ply] == current_hash:
+                repetitions += 1
+        return repetitions
+
     def is_draw_repetition(self):
-        return False
+        """
+        Checks if the current position occurred for the third time.
+        :return: If the game is drawn by threefold repetition.
+        """
+        return self.count_repetitions() >= 2
+
+    def is_draw_insufficient_material(self) -> bool:
+        """
+        Checks if neither player can checkmate: only kings, a king and one minor piece against a king or
+        kings with one bishop each on squares of the same colour.
+        :return: If the game is drawn by insufficient material.
+        """
+        white_squares = self.piece_squares['white']
+        black_squares = self.piece_squares['black']
+        if len(white_squares) > 2 or len(black_squares) > 2:
+            return False
+        board = self.board
+        minor_pieces = [square for square in white_squares | black_squares
+                        if board[square] != KING_WHITE and board[square] != KING_BLACK]
+        if len(minor_pieces) == 0:
+            return True
+        for square in minor_pieces:
+            if board[square] not in (BISHOP_WHITE, BISHOP_BLACK, KNIGHT_WHITE, KNIGHT_BLACK):
+                return False
+        if len(minor_pieces) == 1:
+            return True
+        # two bishops of different players on squares of the same colour
+        first, second = minor_pieces
+        return board[first] in (BISHOP_WHITE, BISHOP_BLACK) and board[second] in (BISHOP_WHITE, BISHOP_BLACK) \
+            and board[first] != board[second] and (first // 8 + first) % 2 == (second // 8 + second) % 2
 
     def is_draw(self):
-        return self.is_draw_repetition() or self.is_stalemate() or self.is_draw_move_count()
+        return self.is_draw_move_count() or self.is_draw_insufficient_material() or self.is_draw_repetition() \
+            or self.is_stalemate()
 
-    def get_diagonal_moves(self, field: int, distance: int = 7) -> list:
+    def get_diagonal_moves(self, field: int, distance: int = 7, mode: int = GENERATE_ALL) -> list:
         moves = []
-        moves.extend(self.get_directional_moves(field, -1, -1, distance))
-        moves.extend(self.get_directional_moves(field, -1, 1, distance))
-        moves.extend(self.get_directional_moves(field, 1, -1, distance))
-        moves.extend(self.get_directional_moves(field, 1, 1, distance))
+        moves.extend(self.get_directional_moves(field, -1, -1, distance, mode))
+        moves.extend(self.get_directional_moves(field, -1, 1, distance, mode))
+        moves.extend(self.get_directional_moves(field, 1, -1, distance, mode))
+        moves.extend(self.get_directional_moves(field, 1, 1, distance, mode))
         return moves
 
-    def get_straight_moves(self, field: int, distance: int = 7) -> list:
+    def get_straight_moves(self, field: int, distance: int = 7, mode: int = GENERATE_ALL) -> list:
         moves = []
-        moves.extend(self.get_directional_moves(field, 0, -1, distance))
-        moves.extend(self.get_directional_moves(field, 0, 1, distance))
-        moves.extend(self.get_directional_moves(field, -1, 0, distance))
-        moves.extend(self.get_directional_moves(field, 1, 0, distance))
+        moves.extend(self.get_directional_moves(field, 0, -1, distance, mode))
+        moves.extend(self.get_directional_moves(field, 0, 1, distance, mode))
+        moves.extend(self.get_directional_moves(field, -1, 0, distance, mode))
+        moves.extend(self.get_directional_moves(field, 1, 0, distance, mode))
         return moves
 
-    def get_king_moves(self, square: int) -> list:
+    def get_king_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
+        moves = self.get_step_moves(square, KING_TARGETS[square], mode)
+        if mode & GENERATE_QUIETS:
+            moves.extend(self.get_castle_moves(square))
+        return moves
+
+    def get_castle_moves(self, square: int) -> list:
+        """
+        Returns the castle moves of the king on the specified square.
+        Castling out of check and through an attacked square is excluded.
+        :param square: The square of the king.
+        :return: The list of castle moves.
+        """
         moves = []
-        moves.extend(self.get_diagonal_moves(square, 1))
-        moves.extend(self.get_straight_moves(square, 1))
         # check castle
         if self.has_piece(square, KING_WHITE) and square == SQUARES['e1']:
-            if self.castle['white']['short'] and self.is_empty(SQUARES['f1']) and self.is_empty(SQUARES['g1']):
+            if self.castle_rights & CASTLE_RIGHT_WHITE_SHORT and self.is_empty(SQUARES['f1']) \
+                    and self.is_empty(SQUARES['g1']):
                 # exclude check and move through check
                 if not self.is_white_king_in_check() and not self.is_attacked_by_black(SQUARES['f1']):
-                    moves.append((square, SQUARES['g1'], CASTLE_SHORT))
-            if self.castle['white']['long'] and self.is_empty(SQUARES['b1']) and self.is_empty(SQUARES['c1']) \
-                    and self.is_empty(SQUARES['d1']):
+                    moves.append(encode_move(square, SQUARES['g1'], FLAG_CASTLE_SHORT))
+            if self.castle_rights & CASTLE_RIGHT_WHITE_LONG and self.is_empty(SQUARES['b1']) \
+                    and self.is_empty(SQUARES['c1']) and self.is_empty(SQUARES['d1']):
                 # exclude check and move through check
                 if not self.is_white_king_in_check() and not self.is_attacked_by_black(SQUARES['d1']):
-                    moves.append((square, SQUARES['c1'], CASTLE_LONG))
+                    moves.append(encode_move(square, SQUARES['c1'], FLAG_CASTLE_LONG))
         elif self.has_piece(square, KING_BLACK) and square == SQUARES['e8']:
-            if self.castle['black']['short'] and self.is_empty(SQUARES['f8']) and self.is_empty(SQUARES['g8']):
+            if self.castle_rights & CASTLE_RIGHT_BLACK_SHORT and self.is_empty(SQUARES['f8']) \
+                    and self.is_empty(SQUARES['g8']):
                 # exclude check and move through check
                 if not self.is_black_king_in_check() and not self.is_attacked_by_white(SQUARES['f8']):
-                    moves.append((square, SQUARES['g8'], CASTLE_SHORT))
-            if self.castle['black']['long'] and self.is_empty(SQUARES['b8']) and self.is_empty(SQUARES['c8']) \
-                    and self.is_empty(SQUARES['d8']):
+                    moves.append(encode_move(square, SQUARES['g8'], FLAG_CASTLE_SHORT))
+            if self.castle_rights & CASTLE_RIGHT_BLACK_LONG and self.is_empty(SQUARES['b8']) \
+                    and self.is_empty(SQUARES['c8']) and self.is_empty(SQUARES['d8']):
                 # exclude check and move through check
                 if not self.is_black_king_in_check() and not self.is_attacked_by_white(SQUARES['d8']):
-                    moves.append((square, SQUARES['c8'], CASTLE_LONG))
+                    moves.append(encode_move(square, SQUARES['c8'], FLAG_CASTLE_LONG))
         return moves
 
-    def get_queen_moves(self, square: int) -> list:
+    def get_queen_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
         moves = []
-        moves.extend(self.get_diagonal_moves(square))
-        moves.extend(self.get_straight_moves(square))
+        moves.extend(self.get_diagonal_moves(square, 7, mode))
+        moves.extend(self.get_straight_moves(square, 7, mode))
         return moves
 
-    def get_rook_moves(self, square: int) -> list:
-        return self.get_straight_moves(square)
+    def get_rook_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
+        return self.get_straight_moves(square, 7, mode)
+
+    def get_bishop_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
+        return self.get_diagonal_moves(square, 7, mode)
 
-    def get_bishop_moves(self, square: int) -> list:
-        return self.get_diagonal_moves(square)
+    def get_knight_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
+        return self.get_step_moves(square, KNIGHT_TARGETS[square], mode)
 
-    def get_knight_moves(self, square: int) -> list:
+    def get_step_moves(self, square: int, target_squares: tuple, mode: int = GENERATE_ALL) -> list:
+        """
+        Returns the moves of a piece that jumps directly to one of the target squares (knight or king).
+        :param square: The square of the piece.
+        :param target_squares: The squares the piece can reach.
+        :param mode: The kinds of moves that are generated (GENERATE_* constants).
+        :return: The list of basic and taking moves.
+        """
+        is_white_piece = self.is_white_piece(square)
+        quiets = mode & GENERATE_QUIETS
+        captures = mode & GENERATE_CAPTURES
         moves = []
-        moves.extend(self.get_directional_moves(square, -2, -1, 1))
-        moves.extend(self.get_directional_moves(square, -2, 1, 1))
-        moves.extend(self.get_directional_moves(square, -1, 2, 1))
-        moves.extend(self.get_directional_moves(square, -1, -2, 1))
-        moves.extend(self.get_directional_moves(square, 1, -2, 1))
-        moves.extend(self.get_directional_moves(square, 1, 2, 1))
-        moves.extend(self.get_directional_moves(square, 2, -1, 1))
-        moves.extend(self.get_directional_moves(square, 2, 1, 1))
+        for target_square in target_squares:
+            piece = self.board[target_square]
+            if piece == EMPTY:
+                if quiets:
+                    moves.append(square | target_square << 6)
+            elif (piece > 6) == is_white_piece and captures:
+                moves.append(square | target_square << 6 | piece << CAPTURE_SHIFT)
         return moves
 
-    def get_white_pawn_moves(self, square: int) -> list:
+    def get_white_pawn_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
         if not self.has_piece(square, PAWN_WHITE):
             return []
+        return self.get_pawn_moves_of_player(square, 8, 7, PAWN_BLACK, mode)
 
-        moves = []
-
-        # forward
-        if self.is_empty(square + 8):
-            # promotion
-            if square + 8 >= 8 * 7:
-                moves.append((square, square + 8, PROMOTION_QUEEN))
-                moves.append((square, square + 8, PROMOTION_ROOK))
-                moves.append((square, square + 8, PROMOTION_BISHOP))
-                moves.append((square, square + 8, PROMOTION_KNIGHT))
-            else:
-                moves.append((square, square + 8))
-            # two squares forward
-            if square < 16 and self.is_empty(square + 16):
-                moves.append((square, square + 16, DOUBLE_PAWN_MOVE))
-        # takes
-        if self.is_black_piece(square + 7) and (square + 7) % 8 < square % 8:
-            # promotion
-            if square + 7 >= 8 * 7:
-                moves.append((square, square + 7, PROMOTION_QUEEN, self.board[square + 7]))
-                moves.append((square, square + 7, PROMOTION_ROOK, self.board[square + 7]))
-                moves.append((square, square + 7, PROMOTION_BISHOP, self.board[square + 7]))
-                moves.append((square, square + 7, PROMOTION_KNIGHT, self.board[square + 7]))
-            else:
-                moves.append((square, square + 7, self.board[square + 7]))
-        if self.is_black_piece(square + 9) and (square + 9) % 8 > square % 8:
-            # promotion
-            if square + 9 >= 8 * 7:
-                moves.append((square, square + 9, PROMOTION_QUEEN, self.board[square + 9]))
-                moves.append((square, square + 9, PROMOTION_ROOK, self.board[square + 9]))
-                moves.append((square, square + 9, PROMOTION_BISHOP, self.board[square + 9]))
-                moves.append((square, square + 9, PROMOTION_KNIGHT, self.board[square + 9]))
-            else:
-                moves.append((square, square + 9, self.board[square + 9]))
-        # en passant
-        if self.en_passant:
-            if self.en_passant_squares[-1] == square + 7 and self.en_passant_squares[-1] % 8 < square % 8:
-                moves.append((square, self.en_passant_squares[-1], EN_PASSANT))
-            elif self.en_passant_squares[-1] == square + 9 and self.en_passant_squares[-1] % 8 > square % 8:
-                moves.append((square, self.en_passant_squares[-1], EN_PASSANT))
-        return moves
-
-    def get_black_pawn_moves(self, square: int) -> list:
+    def get_black_pawn_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
         if not self.has_piece(square, PAWN_BLACK):
             return []
+        return self.get_pawn_moves_of_player(square, -8, 0, PAWN_WHITE, mode)
 
+    def get_pawn_moves_of_player(self, square: int, forward: int, promotion_rank: int, enemy_pawn: int,
+                                 mode: int) -> list:
+        """
+        Returns the moves of a pawn. Promotions (also without taking) count as captures.
+        :param square: The square of the pawn.
+        :param forward: The step of the pawn to the next rank (8 for white, -8 for black).
+        :param promotion_rank: The rank on which the pawn promotes (7 for white, 0 for black).
+        :param enemy_pawn: The pawn of the opponent (taken by en passant).
+        :param mode: The kinds of moves that are generated (GENERATE_* constants).
+        :return: The list of pawn moves (encoded).
+        """
+        board = self.board
+        is_white = forward > 0
+        file = square % 8
+        target_square = square + forward
+        promotes = target_square // 8 == promotion_rank
         moves = []
 
-        # forward
-        if self.is_empty(square - 8):
-            # promotion
-            if square - 8 < 8:
-                moves.append((square, square - 8, PROMOTION_QUEEN))
-                moves.append((square, square - 8, PROMOTION_ROOK))
-                moves.append((square, square - 8, PROMOTION_BISHOP))
-                moves.append((square, square - 8, PROMOTION_KNIGHT))
-            else:
-                moves.append((square, square - 8))
-            # two squares forward
-            if square >= 8 * 6 and self.is_empty(square - 16):
-                moves.append((square, square - 16, DOUBLE_PAWN_MOVE))
-        # takes
-        if self.is_white_piece(square - 7) and (square - 7) % 8 > square % 8:
-            # promotion
-            if square - 7 < 8:
-                moves.append((square, square - 7, PROMOTION_QUEEN, self.board[square - 7]))
-                moves.append((square, square - 7, PROMOTION_ROOK, self.board[square - 7]))
-                moves.append((square, square - 7, PROMOTION_BISHOP, self.board[square - 7]))
-                moves.append((square, square - 7, PROMOTION_KNIGHT, self.board[square - 7]))
-            else:
-                moves.append((square, square - 7, self.board[square - 7]))
-        if self.is_white_piece(square - 9) and (square - 9) % 8 < square % 8:
-            # promotion
-            if square - 9 >= 8 * 7:
-                moves.append((square, square - 9, PROMOTION_QUEEN, self.board[square - 9]))
-                moves.append((square, square - 9, PROMOTION_ROOK, self.board[square - 9]))
-                moves.append((square, square - 9, PROMOTION_BISHOP, self.board[square - 9]))
-                moves.append((square, square - 9, PROMOTION_KNIGHT, self.board[square - 9]))
-            else:
-                moves.append((square, square - 9, self.board[square - 9]))
-        # en passant
-        if self.en_passant:
-            if self.en_passant_squares[-1] == square - 7 and self.en_passant_squares[-1] % 8 > square % 8:
-                moves.append((square, self.en_passant_squares[-1], EN_PASSANT))
-            elif self.en_passant_squares[-1] == square - 9 and self.en_passant_squares[-1] % 8 < square % 8:
-                moves.append((square, self.en_passant_squares[-1], EN_PASSANT))
+        if mode & GENERATE_CAPTURES:
+            # takes (to the left and to the right)
+            for target_file, target_square in ((file - 1, square + forward - 1), (file + 1, square + forward + 1)):
+                if not 0 <= target_file <= 7:
+                    continue
+                piece = board[target_square]
+                if piece == EMPTY or (piece > 6) != is_white:
+                    continue
+                if promotes:
+                    for promotion in (PROMOTION_QUEEN, PROMOTION_ROOK, PROMOTION_BISHOP, PROMOTION_KNIGHT):
+                        moves.append(encode_move(square, target_square, FLAG_PROMOTION, promotion, piece))
+                else:
+                    moves.append(encode_move(square, target_square, captured_piece=piece))
+            # promotion without taking
+            target_square = square + forward
+            if promotes and board[target_square] == EMPTY:
+                for promotion in (PROMOTION_QUEEN, PROMOTION_ROOK, PROMOTION_BISHOP, PROMOTION_KNIGHT):
+                    moves.append(encode_move(square, target_square, FLAG_PROMOTION, promotion))
+            # en passant
+            if self.en_passant and abs(self.en_passant_square % 8 - file) == 1 \
+                    and self.en_passant_square - square - forward in (-1, 1):
+                moves.append(encode_move(square, self.en_passant_square, FLAG_EN_PASSANT, captured_piece=enemy_pawn))
+
+        if mode & GENERATE_QUIETS:
+            # forward
+            target_square = square + forward
+            if board[target_square] == EMPTY and not promotes:
+                moves.append(encode_move(square, target_square))
+                # two squares forward from the initial rank
+                if (square // 8 == 1 if is_white else square // 8 == 6) and board[target_square + forward] == EMPTY:
+                    moves.append(encode_move(square, target_square + forward, FLAG_DOUBLE_PAWN_MOVE))
         return moves
 
-    def get_pawn_moves(self, square: int) -> list:
+    def get_pawn_moves(self, square: int, mode: int = GENERATE_ALL) -> list:
         moves = []
-        moves.extend(self.get_white_pawn_moves(square))
-        moves.extend(self.get_black_pawn_moves(square))
+        moves.extend(self.get_white_pawn_moves(square, mode))
+        moves.extend(self.get_black_pawn_moves(square, mode))
         return moves
 
     def has_piece(self, square: int, piece: int):
@@ -810,7 +1122,7 @@ class Chessboard:
         row += ', draw rule: ' + str(self.half_move_count_for_draw)
         row += ', en passant: '
         if self.en_passant:
-            row += translate_index_into_field(self.en_passant_squares[-1])
+            row += translate_index_into_field(self.en_passant_square)
         else:
             row += '-'
         print(row)
@@ -825,6 +1137,36 @@ class Chessboard:
         elif self.is_draw():
             print('Draw!')
 
+    def to_fen(self) -> str:
+        """
+        Creates the FEN notation of the position.
+        :return: The position in FEN-Format.
+        """
+        rows = []
+        for y in range(7, -1, -1):
+            row = ''
+            empty_squares = 0
+            for x in range(8):
+                piece = self.board[8 * y + x]
+                if piece == EMPTY:
+                    empty_squares += 1
+                    continue
+                if empty_squares > 0:
+                    row += str(empty_squares)
+                    empty_squares = 0
+                row += translation_to_fen[piece]
+            if empty_squares > 0:
+                row += str(empty_squares)
+            rows.append(row)
+        castle = ''
+        for right, letter in ((CASTLE_RIGHT_WHITE_SHORT, 'K'), (CASTLE_RIGHT_WHITE_LONG, 'Q'),
+                              (CASTLE_RIGHT_BLACK_SHORT, 'k'), (CASTLE_RIGHT_BLACK_LONG, 'q')):
+            if self.castle_rights & right:
+                castle += letter
+        en_passant = translate_index_into_field(self.en_passant_square) if self.en_passant else '-'
+        return ' '.join(('/'.join(rows), 'w' if self.turn == 'white' else 'b', castle or '-', en_passant,
+                         str(self.half_move_count_for_draw), str(self.move_number)))
+
     def switch_turn(self):
         """
         Switches the player that can make a move.
@@ -834,6 +1176,7 @@ class Chessboard:
             self.turn = 'black'
         else:
             self.turn = 'white'
+        self.hash ^= BLACK_TO_MOVE_KEY
 
     def get_by_index(self, square_number: int) -> int:
         """
@@ -890,7 +1233,7 @@ class Chessboard:
         If en passant is possible, returns the en passant square. Otherwise, an empty string is returned.
         :return: The index of the en passant square.
         """
-        return self.en_passant_squares[-1]
+        return self.en_passant_square
 
 
 def is_field(index: int) -> bool:
@@ -3,18 +3,71 @@ import random
 import time
 
 import chessboard
-from chessboard import Chessboard
+from chessboard import GENERATE_CAPTURES, GENERATE_QUIETS, Chessboard
+from move_encoding import CAPTURE_SHIFT, FLAG_PROMOTION, FLAG_SHIFT, PROMOTION_SHIFT, to_tuple
+from transposition import BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, TranspositionTable
+
+# the number of positions between two checks of the time limit (a few milliseconds of search)
+CHECK_INTERVAL = 16
+# the number of plies for which killer moves are kept
+MAX_PLY = 128
+# the values of the pieces for move ordering, indexed by the piece constant (the king is the most valuable attacker)
+ORDER_VALUES = (0, 10, 9, 3, 3, 5, 1, 10, 9, 3, 3, 5, 1)
+# quiescence search: captures are skipped if they can not raise the evaluation above alpha even if they win this much
+# more than the captured piece (in pawns)
+DELTA_MARGIN = 2
+
+
+class SearchAborted(Exception):
+    """
+    Raised inside the search when the time or node limit is reached.
+    """
+    pass
 
 
 class Engine:
 
-    def __init__(self, initial_position: Chessboard):
+    def __init__(self, initial_position: Chessboard, random_tie_break: bool = False, hash_size: float = 16,
+                 quiescence: bool = True):
+        """
+        :param initial_position: The position the engine plays on.
+        :param random_tie_break: If set, the best move is chosen randomly among all moves with the best evaluation.
+            Otherwise, the first of them (in the order of the search) is chosen.
+        :param hash_size: The size of the transposition table in MB (0 to search without it). The table is kept
+            between searches.
+        :param quiescence: If set, captures and promotions are searched beyond the depth until the position is quiet.
+            Otherwise, the positions at the depth are evaluated directly.
+        """
         self.position = initial_position
+        self.random_tie_break = random_tie_break
+        self.table = TranspositionTable(hash_size) if hash_size > 0 else None
+        self.quiescence = quiescence
+        # the number of positions visited by the last search
+        self.nodes = 0
+        # the depth of the last finished iteration of the last iterative search
+        self.completed_depth = 0
+        # the limits of the running search: the time (of time.monotonic) and the number of nodes at which it stops
+        self.stop_time = math.inf
+        self.node_limit = math.inf
+        # the number of nodes at which the limits are checked next
+        self.next_check = math.inf
+        # move ordering: two quiet moves per ply that caused a cutoff in a sibling position (the killer moves), and
+        # for every start and target square how often quiet moves between them caused a cutoff, weighted by depth
+        self.killers = [[0, 0] for ply in range(MAX_PLY)]
+        self.history = [0] * 4096
+        # the ply of the position at the start of the search
+        self.root_ply = 0
+        # the number of cutoffs of the last search and how many of them were caused by the first searched move
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
 
-    def make_move(self, depth: int):
+    def make_move(self, depth: int = 10, time_limit: float = None, node_limit: int = None, deadline: float = None):
         """
-        Calculates the best move and executes it.
-        :param depth: The depth of the search tree.
+        Calculates the best move with iterative deepening and executes it.
+        :param depth: The maximal depth of the search tree.
+        :param time_limit: The maximal duration of the search in seconds (or None).
+        :param node_limit: The maximal number of positions to search (or None).
+        :param deadline: The time (of time.monotonic) at which the search has to stop (or None).
         """
         start_time = time.time()
 
@@ -25,82 +78,398 @@ class Engine:
             depth = 10
 
         # calculate move
-        move, evaluation = self.search(depth)
+        move, evaluation = self.search_iterative(depth, time_limit, node_limit, deadline)
         # print move, eval and needed time
         duration = time.time() - start_time
-        print('Computer moves: ', move, ', eval =', evaluation, ', duration = ', duration)  # TODO remove print?
+        # TODO remove print?
+        print('Computer moves: ', to_tuple(move) if move != () else move, ', eval =', evaluation, ', duration = ',
+              duration, ', depth =', self.completed_depth, ', nodes =', self.nodes, ', first move cutoffs =',
+              self.get_first_move_cutoff_rate())
 
-        # make move
-        self.position.move(move)
+        # make move (there is none if the game is over or the depth is 0)
+        if move != ():
+            self.position.move(move)
 
     def search(self, depth: int) -> tuple:
-        if self.position.turn == 'white':
-            return self.max(depth)
-        else:
-            return self.min(depth)
+        """
+        Searches the best move with an alpha-beta search.
+        :param depth: The depth of the search tree.
+        :return: The best move (encoded, or () if there is no legal move or the depth is 0) and its evaluation from
+            white's view.
+        """
+        self.start_search()
+        self.next_check = math.inf
+        move, evaluation = self.search_root(depth)
+        if self.position.turn == 'black':
+            evaluation = -evaluation
+        return move, evaluation
 
-    def max(self, depth: int) -> tuple:
-        if depth == 0:
-            return (), self.evaluate()
+    def search_iterative(self, max_depth: int = 10, time_limit: float = None, node_limit: int = None,
+                         deadline: float = None) -> tuple:
+        """
+        Searches the best move with iterative deepening: the depth is increased by one until a limit is reached. The
+        result of the last finished iteration is used, its best move is searched first in the next iteration.
+        The first iteration is always finished, so there is a move even if the limits are very small. Another iteration
+        is only started if it is expected to finish within the limits (see below), otherwise it is aborted at the
+        limit.
+        :param max_depth: The maximal depth of the search tree.
+        :param time_limit: The maximal duration of the search in seconds (or None).
+        :param node_limit: The maximal number of positions to search (or None).
+        :param deadline: The time (of time.monotonic) at which the search has to stop (or None).
+        :return: The best move (encoded, or () if there is no legal move or the depth is 0) and its evaluation from
+            white's view.
+        """
+        start_time = time.monotonic()
+        stop_time = math.inf if time_limit is None else start_time + time_limit
+        if deadline is not None:
+            stop_time = min(stop_time, deadline)
+        node_limit = math.inf if node_limit is None else node_limit
+        self.start_search()
+        self.completed_depth = 0
+        best_move, evaluation = (), self.evaluate_relative()
+
+        for depth in range(1, max_depth + 1):
+            if depth > 1:
+                self.stop_time = stop_time
+                self.node_limit = node_limit
+                self.next_check = min(self.nodes + CHECK_INTERVAL, node_limit)
+            ply = self.position.ply
+            try:
+                move, value = self.search_root(depth, best_move)
+            except SearchAborted:
+                # undo the moves of the aborted search
+                while self.position.ply > ply:
+                    self.position.undo_last_move()
+                break
+            best_move, evaluation = move, value
+            self.completed_depth = depth
+            if best_move == ():
+                # no legal moves (or depth 0)
+                break
+
+            # predict the next iteration: every iteration takes at least about twice as long as the one before (the
+            # growth per depth varies a lot between odd and even depths and with the hits of the transposition table),
+            # so the next one is expected to take as long as all finished iterations together
+            if 2 * time.monotonic() - start_time > stop_time or 2 * self.nodes > node_limit:
+                break
+
+        self.stop_time = math.inf
+        self.node_limit = math.inf
+        self.next_check = math.inf
+        if self.position.turn == 'black':
+            evaluation = -evaluation
+        return best_move, evaluation
 
-        moves = self.position.generate_moves()
-        if len(moves) == 0:
-            return (), self.evaluate()
+    def start_search(self):
+        """
+        Resets the statistics and the move ordering for a new search. The history is kept, but halved, so that the
+        cutoffs of the new search count more.
+        """
+        self.nodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.root_ply = self.position.ply
+        self.killers = [[0, 0] for ply in range(MAX_PLY)]
+        self.history = [value >> 1 for value in self.history]
+        if self.table is not None:
+            self.table.new_search()
+
+    def get_first_move_cutoff_rate(self) -> float:
+        """
+        Returns the share of the cutoffs of the last search that were caused by the first searched move. The better
+        the move ordering, the closer it is to 1.
+        :return: The rate between 0 and 1.
+        """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs > 0 else 0.0
+
+    def order_moves(self, hash_move: int, ply: int):
+        """
+        Yields the legal moves of the current position (encoded) in the order in which they are searched: the hash
+        move, the captures and promotions (by the values of the captured piece and the attacker), the killer moves of
+        the ply and the remaining quiet moves by their history. Like Chessboard.iterate_moves, a stage is only
+        generated when the moves of the previous stages are used up.
+        :param hash_move: The encoded move that is searched first (e.g. from the transposition table) or 0.
+        :param ply: The distance of the position from the root of the search.
+        """
+        position = self.position
+        checks_and_pins = position.get_checks_and_pins() if position.king_squares[position.turn] != -1 else None
+        if hash_move:
+            if position.is_pseudo_legal(hash_move) and position.filter_legal_moves([hash_move], checks_and_pins):
+                yield hash_move
+            else:
+                hash_move = 0
+        history = self.history
+
+        if checks_and_pins is not None and checks_and_pins[0] > 0:
+            # in check there are only few moves, they are sorted at once: captures first, then quiet moves
+            evasions = position.generate_evasions(checks_and_pins)
+            scores = {move: (1, self.get_capture_score(move)) if not is_quiet(move) else (0, history[move & 4095])
+                      for move in evasions}
+            for move in sorted(evasions, key=scores.__getitem__, reverse=True):
+                if move != hash_move:
+                    yield move
+            return
+
+        captures = position.filter_legal_moves(position.generate_pseudo_legal_moves(GENERATE_CAPTURES),
+                                               checks_and_pins)
+        captures.sort(key=self.get_capture_score, reverse=True)
+        for move in captures:
+            if move != hash_move:
+                yield move
+
+        killers = self.killers[ply] if ply < MAX_PLY else (0, 0)
+        for killer in killers:
+            if killer and killer != hash_move and is_quiet(killer) and position.is_pseudo_legal(killer) \
+                    and position.filter_legal_moves([killer], checks_and_pins):
+                yield killer
+
+        quiets = position.filter_legal_moves(position.generate_pseudo_legal_moves(GENERATE_QUIETS), checks_and_pins)
+        quiets.sort(key=lambda move: history[move & 4095], reverse=True)
+        for move in quiets:
+            if move != hash_move and move != killers[0] and move != killers[1]:
+                yield move
+
+    def get_capture_score(self, move: int) -> int:
+        """
+        Scores a capture or promotion for move ordering: the most valuable captured piece first and, among captures
+        of the same piece, the least valuable attacker first. Promotions count like captures of the new piece.
+        :param move: The encoded move.
+        :return: The score (higher is searched earlier).
+        """
+        # the promotion is stored as the negated PROMOTION_* constant, which is about the value of the new piece
+        return 16 * (ORDER_VALUES[move >> CAPTURE_SHIFT & 15] + (move >> PROMOTION_SHIFT & 15)) \
+            - ORDER_VALUES[self.position.board[move & 63]]
+
+    def store_cutoff(self, move: int, depth: int, ply: int):
+        """
+        Remembers a quiet move that caused a cutoff as killer move of the ply and in the history.
+        :param move: The encoded move.
+        :param depth: The remaining depth of the position.
+        :param ply: The distance of the position from the root of the search.
+        """
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[move & 4095] += depth * depth
+
+    def check_limits(self):
+        """
+        Stops the search if the time or node limit is reached. This is called every CHECK_INTERVAL nodes.
+        :raise SearchAborted: If a limit is reached.
+        """
+        if self.nodes >= self.node_limit or time.monotonic() >= self.stop_time:
+            raise SearchAborted()
+        self.next_check = min(self.nodes + CHECK_INTERVAL, self.node_limit)
+
+    def search_root(self, depth: int, best_move=()) -> tuple:
+        """
+        Searches all moves of the current position.
+        :param depth: The depth of the search tree.
+        :param best_move: The best move of an earlier search, which is searched first (or ()).
+        :return: The best move and its evaluation from the view of the player to move.
+        """
+        self.nodes += 1
+        if depth == 0:
+            return (), self.evaluate_relative()
 
         best_evaluation = -math.inf
-        best_move = moves[0]
-        for move in moves:
+        hash_move = best_move or 0
+        if hash_move == 0 and self.table is not None:
+            entry = self.table.get(self.position.hash)
+            if entry is not None:
+                hash_move = entry[0]
+        best_move = ()
+        number_of_best_moves = 0
+        # the moves are generated lazily, stage by stage
+        for move in self.order_moves(hash_move, 0):
             self.position.move(move)
-            current_evaluation = self.min(depth - 1)[1]
-            if current_evaluation == best_evaluation:
-                # random choice between moves (50/50)
-                if bool(random.getrandbits(1)):
-                    best_evaluation = current_evaluation
-                    best_move = move
-            elif current_evaluation > best_evaluation:
+            if self.random_tie_break and best_move != ():
+                # moves that are as good as the best move must get their exact evaluation, so the window starts
+                # just below it (the evaluations are integers)
+                current_evaluation = -self.negamax(depth - 1, -math.inf, -(best_evaluation - 1))
+            else:
+                current_evaluation = -self.negamax(depth - 1, -math.inf, -best_evaluation)
+            self.position.undo_last_move()
+            if current_evaluation > best_evaluation:
                 best_evaluation = current_evaluation
                 best_move = move
-            self.position.undo_last_move()
+                number_of_best_moves = 1
+            elif current_evaluation == best_evaluation and self.random_tie_break:
+                # every move with the best evaluation is chosen with the same probability
+                number_of_best_moves += 1
+                if random.randrange(number_of_best_moves) == 0:
+                    best_move = move
+        if best_move == ():
+            # no legal moves: checkmate or stalemate
+            return (), self.evaluate_relative()
+        if self.table is not None:
+            self.table.put(self.position.hash, best_move, depth, BOUND_EXACT, best_evaluation)
         return best_move, best_evaluation
 
-    def min(self, depth: int) -> tuple:
+    def negamax(self, depth: int, alpha, beta):
+        """
+        Evaluates the current position with a fail-soft alpha-beta search.
+        :param depth: The remaining depth.
+        :param alpha: The evaluation the player to move can already reach elsewhere.
+        :param beta: The evaluation the opponent can already reach elsewhere.
+        :return: The evaluation from the view of the player to move. If it is not between alpha and beta, it is only
+            a bound: the exact evaluation is at most (or at least) as good.
+        """
         if depth == 0:
-            return (), self.evaluate()
+            if self.quiescence:
+                return self.quiescence_search(alpha, beta)
+            self.nodes += 1
+            return self.evaluate_relative()
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.check_limits()
 
-        moves = self.position.generate_moves()
-        if len(moves) == 0:
-            return (), self.evaluate()
+        table = self.table
+        hash_move = 0
+        if table is not None:
+            entry = table.get(self.position.hash)
+            if entry is not None:
+                hash_move, entry_depth, bound, evaluation = entry
+                # a result of a search that was at least as deep can be used if it is exact or a bound that is
+                # outside the window
+                if entry_depth >= depth and (bound == BOUND_EXACT or bound == BOUND_LOWER and evaluation >= beta
+                                             or bound == BOUND_UPPER and evaluation <= alpha):
+                    return evaluation
 
-        best_evaluation = math.inf
-        best_move = moves[0]
-        for move in moves:
+        original_alpha = alpha
+        best_evaluation = -math.inf
+        best_move = 0
+        ply = self.position.ply - self.root_ply
+        for index, move in enumerate(self.order_moves(hash_move, ply)):
             self.position.move(move)
-            current_evaluation = self.max(depth - 1)[1]
-            if current_evaluation == best_evaluation:
-                # random choice between moves (50/50)
-                if bool(random.getrandbits(1)):
-                    best_evaluation = current_evaluation
-                    best_move = move
-            elif current_evaluation < best_evaluation:
+            current_evaluation = -self.negamax(depth - 1, -beta, -alpha)
+            self.position.undo_last_move()
+            if current_evaluation > best_evaluation:
                 best_evaluation = current_evaluation
                 best_move = move
-            self.position.undo_last_move()
-        return best_move, best_evaluation
+                if current_evaluation > alpha:
+                    alpha = current_evaluation
+                    if alpha >= beta:
+                        # the opponent will avoid this position
+                        self.cutoffs += 1
+                        if index == 0:
+                            self.first_move_cutoffs += 1
+                        if is_quiet(move):
+                            self.store_cutoff(move, depth, ply)
+                        break
+        if best_evaluation == -math.inf:
+            # no legal moves: checkmate or stalemate
+            best_evaluation = self.evaluate_relative()
+            bound = BOUND_EXACT
+        elif best_evaluation <= original_alpha:
+            bound = BOUND_UPPER
+            # all moves failed low, so none of them is known to be better than the others
+            best_move = 0
+        elif best_evaluation >= beta:
+            bound = BOUND_LOWER
+        else:
+            bound = BOUND_EXACT
+        if table is not None:
+            table.put(self.position.hash, best_move, depth, bound, best_evaluation)
+        return best_evaluation
+
+    def quiescence_search(self, alpha, beta):
+        """
+        Evaluates the current position by searching only captures and promotions (and all evasions in check) until
+        the position is quiet, so that the evaluation is not taken in the middle of an exchange. The player to move
+        may also stand pat, i.e. keep the static evaluation instead of capturing.
+        :param alpha: The evaluation the player to move can already reach elsewhere.
+        :param beta: The evaluation the opponent can already reach elsewhere.
+        :return: The evaluation from the view of the player to move (fail-soft, see negamax).
+        """
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            self.check_limits()
+        position = self.position
+        is_white = position.turn == 'white'
+        in_check = position.is_white_king_in_check() if is_white else position.is_black_king_in_check()
+        if in_check:
+            if position.get_status()[0] == 0:
+                # checkmate
+                return self.evaluate_relative()
+            # there is no standing pat in check: all evasions are searched
+            best_evaluation = -math.inf
+            moves = self.order_moves(0, MAX_PLY)
+        else:
+            if position.is_draw_move_count() or position.is_draw_insufficient_material() \
+                    or position.is_draw_repetition():
+                return 0
+            stand_pat = count_material(position) if is_white else -count_material(position)
+            # a stalemated player can not stand pat, so the static evaluation is only kept if there is a legal move
+            if stand_pat >= beta:
+                return stand_pat if position.has_legal_move() else 0
+            if stand_pat > alpha:
+                alpha = stand_pat
+            best_evaluation = stand_pat
+            moves = sorted(position.generate_captures(), key=self.get_capture_score, reverse=True)
+            if not moves and not position.has_legal_move():
+                return 0
+
+        for index, move in enumerate(moves):
+            if not in_check and stand_pat + ORDER_VALUES[move >> CAPTURE_SHIFT & 15] + (move >> PROMOTION_SHIFT & 15) \
+                    + DELTA_MARGIN <= alpha:
+                # delta pruning: even winning the captured piece (and the promotion) does not reach alpha
+                continue
+            position.move(move)
+            current_evaluation = -self.quiescence_search(-beta, -alpha)
+            position.undo_last_move()
+            if current_evaluation > best_evaluation:
+                best_evaluation = current_evaluation
+                if current_evaluation > alpha:
+                    alpha = current_evaluation
+                    if alpha >= beta:
+                        self.cutoffs += 1
+                        if index == 0:
+                            self.first_move_cutoffs += 1
+                        break
+        return best_evaluation
+
+    def evaluate_relative(self):
+        """
+        Evaluates the current position from the view of the player to move.
+        """
+        evaluation = evaluate(self.position)
+        return evaluation if self.position.turn == 'white' else -evaluation
 
     def evaluate(self):
         return evaluate(self.position)
 
 
+def is_quiet(move: int) -> bool:
+    """
+    Checks if a move is neither a capture (including en passant) nor a promotion.
+    :param move: The encoded move.
+    :return: If the move is quiet.
+    """
+    return move >> CAPTURE_SHIFT & 15 == 0 and move >> FLAG_SHIFT & 7 != FLAG_PROMOTION
+
+
 def evaluate(position: Chessboard) -> int:
-    # check for win and draw
-    if position.is_checkmate():
+    # check for win and draw (the legal moves are only generated once per position)
+    number_of_moves, in_check = position.get_status()
+    if number_of_moves == 0 and in_check:
         if position.turn == 'white':
             return -100
         else:
             return 100
     elif position.is_draw():
         return 0
+    return count_material(position)
+
 
+def count_material(position: Chessboard) -> int:
+    """
+    Counts the material of both players.
+    :param position: The position.
+    :return: The material balance from white's view (in pawns).
+    """
     evaluation = 0
     # count pieces
     for field in range(64):
@@ -0,0 +1,132 @@
+import mmap
+import os
+
+import chessboard
+from position_encoding import encode_fen
+
+# EPD (extended position description) lines have the first four fields of a FEN (board, player, castle rights and en
+# passant square) followed by operations: an opcode and its operands, terminated by a semicolon, e.g.
+#   r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - bm Bb5; id "Ruy Lopez";
+# Lines with a complete FEN (including the counters), optionally followed by operations, are read as well.
+
+# the opcodes whose operand is a string (written in quotes)
+STRING_OPCODES = ('id',) + tuple('c' + str(number) for number in range(10))
+
+
+def parse_operations(text: str) -> dict:
+    """
+    Parses the operations of an EPD line.
+    :param text: The operations, e.g. 'bm Nf3 Ng5; id "test 1";'.
+    :return: A dictionary from the opcode to its operands (as text without quotes, separated by spaces).
+    """
+    operations = {}
+    operation = ''
+    in_quotes = False
+    for character in text + ';':
+        if character == '"':
+            in_quotes = not in_quotes
+            operation += character
+        elif character == ';' and not in_quotes:
+            opcode, _, operands = operation.strip().partition(' ')
+            if opcode:
+                operands = operands.strip()
+                if len(operands) >= 2 and operands[0] == '"' and operands[-1] == '"':
+                    operands = operands[1:-1]
+                operations[opcode] = operands
+            operation = ''
+        else:
+            operation += character
+    return operations
+
+
+def parse_line(line: str) -> tuple:
+    """
+    Parses an EPD or FEN line. The counters of the FEN are taken from the hmvc and fmvn operations of an EPD line
+    (or 0 and 1 if they are missing).
+    :param line: The line.
+    :return: The complete FEN of the position and the dictionary of operations.
+    """
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError('invalid EPD line: ' + line)
+    rest = fields[4] if len(fields) == 5 else ''
+    counters = rest.split(None, 2)
+    if len(counters) >= 2 and counters[0].isdigit() and counters[1].isdigit():
+        # a complete FEN
+        draw_counter, move_number = counters[0], counters[1]
+        operations = parse_operations(counters[2] if len(counters) == 3 else '')
+    else:
+        operations = parse_operations(rest)
+        draw_counter = operations.get('hmvc', '0')
+        move_number = operations.get('fmvn', '1')
+    return ' '.join(fields[:4]) + ' ' + draw_counter + ' ' + move_number, operations
+
+
+def read_lines(source, use_mmap: bool = False):
+    """
+    Yields the lines of a file one at a time, without reading the whole file.
+    :param source: The path of the file or a binary file object.
+    :param use_mmap: If the file is memory-mapped instead of read with buffered reads.
+    """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, 'rb') as file:
+            yield from read_lines(file, use_mmap)
+        return
+    if use_mmap:
+        if os.fstat(source.fileno()).st_size == 0:
+            # empty files can not be mapped
+            return
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            yield from iter(mapped_file.readline, b'')
+    else:
+        yield from source
+
+
+def read_positions(source, compact: bool = False, create_from_fen=chessboard.create_from_fen,
+                   use_mmap: bool = False):
+    """
+    Reads the positions of an EPD or FEN file one at a time. Empty lines and lines starting with # are skipped.
+    :param source: The path of the file or a binary file object.
+    :param compact: If set, the positions are returned in the binary encoding (see position_encoding) instead of as
+        chessboards, which is much faster.
+    :param create_from_fen: The function that creates the chessboards (e.g. bitboard.create_from_fen).
+    :param use_mmap: If the file is memory-mapped instead of read with buffered reads.
+    :return: A generator of the positions (chessboards or bytes) together with their dictionaries of operations.
+    """
+    for line in read_lines(source, use_mmap):
+        line = line.decode().strip()
+        if not line or line[0] == '#':
+            continue
+        fen, operations = parse_line(line)
+        if compact:
+            yield encode_fen(fen), operations
+        else:
+            yield create_from_fen(fen), operations
+
+
+def to_epd(board: chessboard.Chessboard, operations: dict = None) -> str:
+    """
+    Creates the EPD line of a position.
+    :param board: The position.
+    :param operations: The dictionary from opcodes to operands. String operands (id and comments) are quoted.
+    :return: The EPD line (without line break).
+    """
+    fields = board.to_fen().split(' ')[:4]
+    for opcode, operands in (operations or {}).items():
+        operands = str(operands)
+        if opcode in STRING_OPCODES or ';' in operands:
+            operands = '"' + operands + '"'
+        fields.append((opcode + ' ' + operands).strip() + ';')
+    return ' '.join(fields)
+
+
+def write_positions(file, positions, epd: bool = True):
+    """
+    Writes positions to a text file, one line per position.
+    :param file: The file object opened for writing text.
+    :param positions: The positions, either chessboards or tuples of a chessboard and its operations.
+    :param epd: If EPD lines are written. Otherwise, the FEN of every position is written (without operations).
+    """
+    for position in positions:
+        board, operations = position if isinstance(position, tuple) else (position, None)
+        file.write((to_epd(board, operations) if epd else board.to_fen()) + '\n')
@@ -0,0 +1,239 @@
+import os
+from array import array
+
+from attack_tables import DIAGONAL_DIRECTIONS, RAYS, STRAIGHT_DIRECTIONS, to_mask
+
+# Magic bitboards: the attacks of a sliding piece only depend on the pieces on its relevant squares (the rays
+# without the last square at the edge of the board). Multiplying these occupied squares with a magic number and
+# keeping the highest bits gives an index into a table of precomputed attacks.
+
+ALL_SQUARES = 0xFFFFFFFFFFFFFFFF
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'magic_tables.bin')
+
+# the magic numbers were found with find_magic
+ROOK_MAGICS = [
+    0x2080001440022581, 0x1080200040001080, 0x4080100008200080, 0x0280080080100254,
+    0x4D8004000A180080, 0x0100080400020100, 0x1080010040800200, 0x0200004402002081,
+    0x0068800024884004, 0x1000804000802002, 0x000200208A001040, 0x3008801000800800,
+    0x2006001060440A00, 0x1000800200800400, 0x0004000441024810, 0xA001000082004100,
+    0x0040808000204014, 0x0000424002201000, 0x0010110041002000, 0x0000090021041000,
+    0x0204008004800800, 0x0000808004000200, 0x6006040021485042, 0x0000020002409924,
+    0x2000401980028020, 0x4000400100308100, 0x0000820200201041, 0xB100100080800800,
+    0x3004080080040080, 0x0802000200041009, 0x01A0580400021110, 0x00020042000408A1,
+    0x4218884000800023, 0x0480201000400045, 0x0010200080801000, 0x1200200901001000,
+    0x0000100801000500, 0x0080020080800400, 0x004A000100404080, 0x0480005402001081,
+    0x258000402000C000, 0xA010004820084002, 0x0480200010008080, 0x244100100021000C,
+    0x2040080005010010, 0x0012000810020004, 0x0011000200B9000C, 0x1121000080410002,
+    0x00082080410A0600, 0x4002008100402600, 0x0A0300E008544100, 0x7B00080010008080,
+    0x0300080100100500, 0x0002020080040080, 0x0042521810214400, 0x8A00004089140200,
+    0x00001280010A2041, 0x0400401102042086, 0x41902000100C4101, 0x0043020420900009,
+    0x00E2000410082002, 0x4402000108041002, 0x2100101A00814804, 0x0400010400218246,
+]
+
+BISHOP_MAGICS = [
+    0x0102040418220020, 0x0108024802002028, 0x8010044040400001, 0x0022209200044800,
+    0x4004504005040114, 0x0022010420A80800, 0x0008441008090002, 0x0000420801480200,
+    0x1100220244011C00, 0x00883004081AB020, 0x4400100152002000, 0x4019080841004000,
+    0x2861021210000000, 0x400EA10108400020, 0x4800208208A24000, 0x0020A500A0842085,
+    0x3410000802504400, 0x0010E0200C010060, 0x0014182042408200, 0x4094006840112109,
+    0x2014200202010000, 0x000100020080C400, 0x800400420D2C0200, 0x0002200182251000,
+    0x0010F10304C41000, 0x001024A008281084, 0x0088110002040100, 0x0820080001004008,
+    0x0104040020410050, 0x0110002027040500, 0x418C008009182100, 0x2C00A9040C80480B,
+    0x008110C8005020A4, 0x4004210802041000, 0x0004020108208100, 0x0000080800120A00,
+    0x430C008400820102, 0x1400808100020108, 0x005006020010A8A0, 0x000801868004A220,
+    0x00420105C00C2000, 0x1010921032019040, 0x0300222028103000, 0x0008004208001080,
+    0x5410202248811400, 0x0008010800800808, 0x3C02C20404000900, 0x0408022282040032,
+    0x0000941002100000, 0x0112209A10100804, 0x080C020111210000, 0x442002A442022008,
+    0x00084A181B040000, 0x00115021021C2080, 0x4010051000A20000, 0x0404688085060000,
+    0x0000220110011000, 0x140000220734200C, 0x0440010424020800, 0x2204828883460800,
+    0x0020000004050410, 0x4060004A20082080, 0x00489034B002C201, 0x0444049010410300,
+]
+
+
+def create_relevant_mask(square: int, directions: tuple) -> int:
+    """
+    Creates the mask of all squares that can block a sliding piece. The last square of each ray is excluded,
+    since a piece on it can not block any square.
+    :param square: The square of the sliding piece.
+    :param directions: The directions the piece moves in.
+    :return: The mask of relevant squares.
+    """
+    mask = 0
+    for direction in directions:
+        mask |= to_mask(RAYS[direction][square][:-1])
+    return mask
+
+
+def calculate_attacks(square: int, occupied: int, directions: tuple) -> int:
+    """
+    Calculates the attacks of a sliding piece by walking along the rays. The first blocker is included.
+    :param square: The square of the sliding piece.
+    :param occupied: The bitboard of all pieces.
+    :param directions: The directions the piece moves in.
+    :return: The bitboard of attacked squares.
+    """
+    attacks = 0
+    for direction in directions:
+        for target_square in RAYS[direction][square]:
+            attacks |= 1 << target_square
+            if occupied & (1 << target_square):
+                break
+    return attacks
+
+
+def subsets_of(mask: int):
+    """
+    Yields all subsets of the bits of a mask, starting with the empty set.
+    :param mask: The mask.
+    """
+    subset = 0
+    while True:
+        yield subset
+        subset = (subset - mask) & mask
+        if subset == 0:
+            return
+
+
+def find_magic(square: int, directions: tuple, rng) -> int:
+    """
+    Searches a magic number for the square by trying random numbers with few set bits.
+    This is slow and only needed if the magic numbers in this module are replaced.
+    :param square: The square of the sliding piece.
+    :param directions: The directions the piece moves in.
+    :param rng: The random number generator (e.g. random.Random).
+    :return: The magic number.
+    """
+    mask = create_relevant_mask(square, directions)
+    shift = 64 - bin(mask).count('1')
+    occupancies = list(subsets_of(mask))
+    attacks = [calculate_attacks(square, occupied, directions) for occupied in occupancies]
+    while True:
+        magic = rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+        if bin((mask * magic) & 0xFF00000000000000).count('1') < 6:
+            continue
+        used = {}
+        for occupied, attack in zip(occupancies, attacks):
+            index = ((occupied * magic) & ALL_SQUARES) >> shift
+            if used.setdefault(index, attack) != attack:
+                break
+        else:
+            return magic
+
+
+ROOK_MASKS = [create_relevant_mask(square, STRAIGHT_DIRECTIONS) for square in range(64)]
+BISHOP_MASKS = [create_relevant_mask(square, DIAGONAL_DIRECTIONS) for square in range(64)]
+ROOK_SHIFTS = [64 - bin(mask).count('1') for mask in ROOK_MASKS]
+BISHOP_SHIFTS = [64 - bin(mask).count('1') for mask in BISHOP_MASKS]
+
+
+def create_offsets(shifts: list) -> list:
+    """
+    Calculates where the table part of every square starts in the flat attack table.
+    :param shifts: The shifts of all squares.
+    :return: The offsets of all squares. The last element is the size of the table.
+    """
+    offsets = [0]
+    for shift in shifts:
+        offsets.append(offsets[-1] + (1 << (64 - shift)))
+    return offsets
+
+
+ROOK_OFFSETS = create_offsets(ROOK_SHIFTS)
+BISHOP_OFFSETS = create_offsets(BISHOP_SHIFTS)
+
+
+def create_attack_table(directions: tuple, masks: list, magics: list, shifts: list, offsets: list) -> array:
+    """
+    Creates the flat table of attacks for all squares and all relevant occupancies.
+    :param directions: The directions the piece moves in.
+    :param masks: The relevant masks of all squares.
+    :param magics: The magic numbers of all squares.
+    :param shifts: The shifts of all squares.
+    :param offsets: The offsets of all squares.
+    :return: The attack table.
+    """
+    table = array('Q', bytes(8 * offsets[-1]))
+    for square in range(64):
+        magic = magics[square]
+        shift = shifts[square]
+        offset = offsets[square]
+        for occupied in subsets_of(masks[square]):
+            index = offset + (((occupied * magic) & ALL_SQUARES) >> shift)
+            table[index] = calculate_attacks(square, occupied, directions)
+    return table
+
+
+def cache_key() -> array:
+    """
+    Returns the header of the cache file, so that a file written with other magic numbers is not used.
+    :return: The header.
+    """
+    key = 0
+    for magic in ROOK_MAGICS + BISHOP_MAGICS:
+        key = ((key * 31) ^ magic) & ALL_SQUARES
+    return array('Q', [key, ROOK_OFFSETS[-1], BISHOP_OFFSETS[-1]])
+
+
+def load_tables(cache_file: str = CACHE_FILE) -> tuple:
+    """
+    Loads the attack tables from the cache file. If the file does not exist or does not fit to the magic numbers,
+    the tables are created and written to the file (if possible).
+    :param cache_file: The path of the cache file or None to always create the tables.
+    :return: The rook table and the bishop table.
+    """
+    header = cache_key()
+    if cache_file is not None:
+        try:
+            with open(cache_file, 'rb') as file:
+                file_header = array('Q')
+                file_header.fromfile(file, len(header))
+                if file_header == header:
+                    rook_table = array('Q')
+                    rook_table.fromfile(file, ROOK_OFFSETS[-1])
+                    bishop_table = array('Q')
+                    bishop_table.fromfile(file, BISHOP_OFFSETS[-1])
+                    return rook_table, bishop_table
+        except (OSError, EOFError):
+            pass
+
+    rook_table = create_attack_table(STRAIGHT_DIRECTIONS, ROOK_MASKS, ROOK_MAGICS, ROOK_SHIFTS, ROOK_OFFSETS)
+    bishop_table = create_attack_table(DIAGONAL_DIRECTIONS, BISHOP_MASKS, BISHOP_MAGICS, BISHOP_SHIFTS,
+                                       BISHOP_OFFSETS)
+    if cache_file is not None:
+        try:
+            with open(cache_file, 'wb') as file:
+                header.tofile(file)
+                rook_table.tofile(file)
+                bishop_table.tofile(file)
+        except OSError:
+            pass
+    return rook_table, bishop_table
+
+
+ROOK_TABLE, BISHOP_TABLE = load_tables()
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    """
+    Looks up the squares attacked by a rook.
+    :param square: The square of the rook.
+    :param occupied: The bitboard of all pieces.
+    :return: The bitboard of attacked squares (including the first blocker in each direction).
+    """
+    return ROOK_TABLE[ROOK_OFFSETS[square] +
+                      ((((occupied & ROOK_MASKS[square]) * ROOK_MAGICS[square]) & ALL_SQUARES) >> ROOK_SHIFTS[square])]
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    """
+    Looks up the squares attacked by a bishop.
+    :param square: The square of the bishop.
+    :param occupied: The bitboard of all pieces.
+    :return: The bitboard of attacked squares (including the first blocker in each direction).
+    """
+    return BISHOP_TABLE[BISHOP_OFFSETS[square] + ((((occupied & BISHOP_MASKS[square]) * BISHOP_MAGICS[square])
+                                                   & ALL_SQUARES) >> BISHOP_SHIFTS[square])]
+
+
+def queen_attacks(square: int, occupied: int) -> int:
+    return rook_attacks(square, occupied) | bishop_attacks(square, occupied)
@@ -1,11 +1,17 @@
+import argparse
 import random
 
+import bitboard
 import chessboard
 import engine
 
 if __name__ == '__main__':
-    board = chessboard.create_starting_position()
-    engine = engine.Engine(board)
+    parser = argparse.ArgumentParser(description='Lets the engine play a game against itself.')
+    parser.add_argument('--bitboard', action='store_true', help='use the bitboard backend (experimental)')
+    args = parser.parse_args()
+
+    board = bitboard.create_starting_position() if args.bitboard else chessboard.create_starting_position()
+    engine = engine.Engine(board, random_tie_break=True)
 
     # board.print()
     # for i in range(10):
@@ -17,7 +23,7 @@ if __name__ == '__main__':
 
     while not (board.is_checkmate() or board.is_draw()):
         board.print()
-        engine.make_move(3)
+        engine.make_move(time_limit=1)
         print(board.moves)
     board.print()
 
@@ -0,0 +1,157 @@
+from board_constants import *
+
+# A move can be encoded in one integer with the following bits:
+#   0-5:   start square
+#   6-11:  target square
+#   12-14: flag (the type of special move)
+#   15-18: promotion (the negated promotion constant, e.g. 9 for PROMOTION_QUEEN)
+#   19-22: captured piece (the pawn for en passant)
+# All encoded moves fit into an unsigned 32-bit integer (array type 'I').
+
+FLAG_NONE = 0
+FLAG_CASTLE_SHORT = 1
+FLAG_CASTLE_LONG = 2
+FLAG_DOUBLE_PAWN_MOVE = 3
+FLAG_EN_PASSANT = 4
+FLAG_PROMOTION = 5
+
+FLAG_SHIFT = 12
+PROMOTION_SHIFT = 15
+CAPTURE_SHIFT = 19
+
+# the flags of the special move constants that are used in the tuple format
+SPECIAL_MOVE_FLAGS = {
+    CASTLE_SHORT: FLAG_CASTLE_SHORT,
+    CASTLE_LONG: FLAG_CASTLE_LONG,
+    DOUBLE_PAWN_MOVE: FLAG_DOUBLE_PAWN_MOVE,
+    EN_PASSANT: FLAG_EN_PASSANT,
+    PROMOTION_QUEEN: FLAG_PROMOTION,
+    PROMOTION_ROOK: FLAG_PROMOTION,
+    PROMOTION_BISHOP: FLAG_PROMOTION,
+    PROMOTION_KNIGHT: FLAG_PROMOTION,
+}
+FLAG_SPECIAL_MOVES = {
+    FLAG_CASTLE_SHORT: CASTLE_SHORT,
+    FLAG_CASTLE_LONG: CASTLE_LONG,
+    FLAG_DOUBLE_PAWN_MOVE: DOUBLE_PAWN_MOVE,
+    FLAG_EN_PASSANT: EN_PASSANT,
+}
+# the letters of the promoted pieces in coordinate notation
+PROMOTION_LETTERS = {
+    PROMOTION_QUEEN: 'q',
+    PROMOTION_ROOK: 'r',
+    PROMOTION_BISHOP: 'b',
+    PROMOTION_KNIGHT: 'n',
+}
+
+
+def encode_move(start_square: int, target_square: int, flag: int = FLAG_NONE, promotion: int = 0,
+                captured_piece: int = EMPTY) -> int:
+    """
+    Encodes a move into an integer.
+    :param start_square: The start square.
+    :param target_square: The target square.
+    :param flag: The type of special move (FLAG_* constant).
+    :param promotion: The promotion constant (PROMOTION_*) or 0 if the move is no promotion.
+    :param captured_piece: The captured piece or EMPTY.
+    :return: The encoded move.
+    """
+    return start_square | target_square << 6 | flag << FLAG_SHIFT | -promotion << PROMOTION_SHIFT \
+        | captured_piece << CAPTURE_SHIFT
+
+
+def decode_move(move: int) -> tuple:
+    """
+    Splits an encoded move into its parts.
+    :param move: The encoded move.
+    :return: The start square, target square, flag, promotion constant (or 0) and captured piece (or EMPTY).
+    """
+    return move & 63, move >> 6 & 63, move >> FLAG_SHIFT & 7, -(move >> PROMOTION_SHIFT & 15), \
+        move >> CAPTURE_SHIFT & 15
+
+
+def get_start_square(move: int) -> int:
+    return move & 63
+
+
+def get_target_square(move: int) -> int:
+    return move >> 6 & 63
+
+
+def get_flag(move: int) -> int:
+    return move >> FLAG_SHIFT & 7
+
+
+def get_promotion(move: int) -> int:
+    return -(move >> PROMOTION_SHIFT & 15)
+
+
+def get_captured_piece(move: int) -> int:
+    return move >> CAPTURE_SHIFT & 15
+
+
+def to_tuple(move: int) -> tuple:
+    """
+    Converts an encoded move into the tuple format of Chessboard.generate_moves.
+    :param move: The encoded move.
+    :return: The move tuple.
+    """
+    start_square = move & 63
+    target_square = move >> 6 & 63
+    flag = move >> FLAG_SHIFT & 7
+    captured_piece = move >> CAPTURE_SHIFT & 15
+    if flag == FLAG_NONE:
+        if captured_piece != EMPTY:
+            return start_square, target_square, captured_piece
+        return start_square, target_square
+    if flag == FLAG_PROMOTION:
+        promotion = -(move >> PROMOTION_SHIFT & 15)
+        if captured_piece != EMPTY:
+            return start_square, target_square, promotion, captured_piece
+        return start_square, target_square, promotion
+    return start_square, target_square, FLAG_SPECIAL_MOVES[flag]
+
+
+def from_tuple(move: tuple) -> int:
+    """
+    Converts a move tuple into an encoded move.
+    :param move: The move tuple with at least two elements.
+    :return: The encoded move.
+    """
+    if len(move) == 2:
+        return move[0] | move[1] << 6
+    additional_move_info = move[2]
+    if additional_move_info >= 0:
+        # takes
+        return encode_move(move[0], move[1], captured_piece=additional_move_info)
+    flag = SPECIAL_MOVE_FLAGS[additional_move_info]
+    if flag == FLAG_PROMOTION:
+        return encode_move(move[0], move[1], flag, additional_move_info, move[3] if len(move) == 4 else EMPTY)
+    if flag == FLAG_EN_PASSANT:
+        # the target square tells which pawn is taken
+        return encode_move(move[0], move[1], flag, captured_piece=PAWN_BLACK if move[1] >= 32 else PAWN_WHITE)
+    return encode_move(move[0], move[1], flag)
+
+
+def to_coordinate_notation(move: int) -> str:
+    """
+    Converts an encoded move into coordinate notation (start and target square and the promoted piece, e.g. e7e8q).
+    :param move: The encoded move.
+    :return: The move as text.
+    """
+    start_square = move & 63
+    target_square = move >> 6 & 63
+    text = chr(start_square % 8 + 97) + str(start_square // 8 + 1) + chr(target_square % 8 + 97) \
+        + str(target_square // 8 + 1)
+    if move >> FLAG_SHIFT & 7 == FLAG_PROMOTION:
+        text += PROMOTION_LETTERS[-(move >> PROMOTION_SHIFT & 15)]
+    return text
+
+
+def to_tuples(moves) -> list:
+    """
+    Converts a sequence of encoded moves into move tuples.
+    :param moves: The encoded moves (e.g. an array('I')).
+    :return: The list of move tuples.
+    """
+    return [to_tuple(move) for move in moves]
@@ -0,0 +1,367 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import bitboard
+import chessboard
+import position_encoding
+from bitboard import BitboardChessboard
+from chessboard import Chessboard
+from move_encoding import to_coordinate_notation
+from transposition import HashTable
+
+# positions with known perft results: (name, FEN, {depth: number of leaf nodes})
+# The edge cases are small positions that test single rules (en passant, castling, promotion and check) deeply.
+SUITE = (
+    ('start position', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+     {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ('Kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+     {1: 48, 2: 2039, 3: 97862, 4: 4085603}),
+    ('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+     {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624, 6: 11030083}),
+    ('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+     {1: 6, 2: 264, 3: 9467, 4: 422333, 5: 15833292}),
+    ('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+     {1: 44, 2: 1486, 3: 62379, 4: 2103487}),
+    ('position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+     {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+    ('illegal en passant 1', '3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1',
+     {1: 18, 2: 92, 3: 1670, 4: 10138, 5: 185429, 6: 1134888}),
+    ('illegal en passant 2', '8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1',
+     {1: 13, 2: 102, 3: 1266, 4: 10276, 5: 135655, 6: 1015133}),
+    ('en passant gives check', '8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1',
+     {1: 15, 2: 126, 3: 1928, 4: 13931, 5: 206379, 6: 1440467}),
+    ('short castle gives check', '5k2/8/8/8/8/8/8/4K2R w K - 0 1',
+     {1: 15, 2: 66, 3: 1198, 4: 6399, 5: 120330, 6: 661072}),
+    ('long castle gives check', '3k4/8/8/8/8/8/8/R3K3 w Q - 0 1',
+     {1: 16, 2: 71, 3: 1286, 4: 7418, 5: 141077, 6: 803711}),
+    ('castle rights', 'r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1',
+     {1: 26, 2: 1141, 3: 27826, 4: 1274206}),
+    ('castling prevented', 'r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1',
+     {1: 44, 2: 1494, 3: 50509, 4: 1720476}),
+    ('promote out of check', '2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1',
+     {1: 11, 2: 133, 3: 1442, 4: 19174, 5: 266199, 6: 3821001}),
+    ('discovered check', '8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1',
+     {1: 29, 2: 165, 3: 5160, 4: 31961, 5: 1004658}),
+    ('promote to give check', '4k3/1P6/8/8/8/8/K7/8 w - - 0 1',
+     {1: 9, 2: 40, 3: 472, 4: 2661, 5: 38983, 6: 217342}),
+    ('under promote to give check', '8/P1k5/K7/8/8/8/8/8 w - - 0 1',
+     {1: 6, 2: 27, 3: 273, 4: 1329, 5: 18135, 6: 92683}),
+    ('self stalemate', 'K1k5/8/P7/8/8/8/8/8 w - - 0 1',
+     {1: 2, 2: 6, 3: 13, 4: 63, 5: 382, 6: 2217}),
+    ('stalemate and checkmate', '8/k1P5/8/1K6/8/8/8/8 w - - 0 1',
+     {1: 10, 2: 25, 3: 268, 4: 926, 5: 10857, 6: 43261, 7: 567584}),
+    ('double check', '8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1',
+     {1: 37, 2: 183, 3: 6559, 4: 23527}),
+)
+
+
+class PerftTable(HashTable):
+    """
+    A transposition table for perft with a fixed size: it maps the hash of a position and a depth to the number of
+    leaf nodes. An entry holds the node count shifted by 8 bits or-ed with the depth. The first entry of a bucket
+    keeps the deepest result (which saved the most work), the second one is always replaced.
+    """
+
+    def get(self, position_hash: int, depth: int) -> int:
+        """
+        Looks up the number of leaf nodes of a position.
+        :param position_hash: The hash of the position.
+        :param depth: The depth of the perft.
+        :return: The number of leaf nodes or -1 if it is not stored.
+        """
+        self.probes += 1
+        index = position_hash & self.mask
+        for index in (index, index + 1):
+            if self.hashes[index] == position_hash and self.entries[index] & 255 == depth:
+                self.hits += 1
+                return self.entries[index] >> 8
+        return -1
+
+    def put(self, position_hash: int, depth: int, nodes: int):
+        """
+        Stores the number of leaf nodes of a position.
+        :param position_hash: The hash of the position.
+        :param depth: The depth of the perft.
+        :param nodes: The number of leaf nodes.
+        """
+        index = position_hash & self.mask
+        if depth < self.entries[index] & 255:
+            # the first entry holds a deeper result
+            index += 1
+        self.hashes[index] = position_hash
+        self.entries[index] = nodes << 8 | depth
+
+
+def hashed_perft(board: chessboard.Chessboard, depth: int, table: PerftTable) -> int:
+    """
+    Counts the leaf nodes like Chessboard.perft, but looks up and stores the results of transposed positions in the
+    table.
+    :param board: The position.
+    :param depth: The depth of the perft.
+    :param table: The table with the results of earlier positions.
+    :return: The number of leaf nodes.
+    """
+    if depth <= 1:
+        # counting the moves is cheaper than a lookup
+        return board.perft(depth)
+    nodes = table.get(board.hash, depth)
+    if nodes != -1:
+        return nodes
+    nodes = 0
+    for move in board.generate_moves(True):
+        board.move(move)
+        nodes += hashed_perft(board, depth - 1, table)
+        board.undo_last_move()
+    table.put(board.hash, depth, nodes)
+    return nodes
+
+
+def hashed_divide(board: chessboard.Chessboard, depth: int, table: PerftTable) -> dict:
+    """
+    Counts the leaf nodes for every move like Chessboard.divide, but uses the table like hashed_perft.
+    :param board: The position.
+    :param depth: The depth of the perft.
+    :param table: The table with the results of earlier positions.
+    :return: A dictionary from the encoded move to its number of leaf nodes.
+    """
+    nodes = {}
+    for move in board.generate_moves(True):
+        board.move(move)
+        nodes[move] = hashed_perft(board, depth - 1, table)
+        board.undo_last_move()
+    return nodes
+
+
+# the perft table of a worker process of the parallel perft, shared by all tasks of the worker (see init_worker)
+worker_table = None
+
+
+def init_worker(hash_size: float):
+    """
+    Creates the perft table of a worker process. It is kept for all tasks of the worker, so that transpositions
+    between the subtrees are found.
+    :param hash_size: The size of the perft table of the worker in MB or 0 for no table.
+    """
+    global worker_table
+    worker_table = PerftTable(hash_size) if hash_size > 0 else None
+
+
+def perft_of_position(position: bytes, depth: int, use_bitboard: bool) -> tuple:
+    """
+    Runs perft on an encoded position. This is the task of the worker processes of the parallel perft.
+    :param position: The position encoded with position_encoding.to_bytes.
+    :param depth: The depth of the perft.
+    :param use_bitboard: If the bitboard backend is used.
+    :return: The number of leaf nodes and the number of lookups and hits in the perft table of the worker.
+    """
+    board = position_encoding.from_bytes(position, board_class=BitboardChessboard if use_bitboard else Chessboard)
+    if worker_table is None:
+        return board.perft(depth), 0, 0
+    probes = worker_table.probes
+    hits = worker_table.hits
+    nodes = hashed_perft(board, depth, worker_table)
+    return nodes, worker_table.probes - probes, worker_table.hits - hits
+
+
+def collect_subtrees(board: chessboard.Chessboard, plies: int, root_move: int, subtrees: list):
+    """
+    Plays all move sequences with the given number of half moves and collects the reached positions.
+    :param board: The position.
+    :param plies: The number of half moves that are played.
+    :param root_move: The first move of the sequences.
+    :param subtrees: The list the root moves and the reached positions (encoded) are added to.
+    """
+    if plies == 0:
+        subtrees.append((root_move, position_encoding.to_bytes(board)))
+        return
+    for move in board.generate_moves(True):
+        board.move(move)
+        collect_subtrees(board, plies - 1, root_move, subtrees)
+        board.undo_last_move()
+
+
+def parallel_divide(board: chessboard.Chessboard, depth: int, workers: int = None, split_depth: int = 1,
+                    hash_size: float = 0) -> dict:
+    """
+    Counts the leaf nodes for every root move like Chessboard.divide, but distributes the work on several processes.
+    All move sequences with split_depth half moves are played and the positions are sent to the workers in the
+    compact binary encoding (see position_encoding).
+    The results of the subtrees are added up per root move.
+    :param board: The position.
+    :param depth: The depth of the perft.
+    :param workers: The number of worker processes (default: the number of processors).
+    :param split_depth: The number of half moves that are played before the positions are sent to the workers
+        (1 or 2, more if there are many workers and only few root moves).
+    :param hash_size: The size of the perft table of each worker in MB or 0 for no table.
+    :return: A dictionary from the encoded root move to its number of leaf nodes.
+    :raise ValueError: If the split depth is smaller than 1.
+    """
+    return parallel_divide_with_statistics(board, depth, workers, split_depth, hash_size)[0]
+
+
+def parallel_divide_with_statistics(board: chessboard.Chessboard, depth: int, workers: int = None,
+                                    split_depth: int = 1, hash_size: float = 0) -> tuple:
+    """
+    Runs parallel_divide and also counts the lookups and hits in the perft tables of all workers.
+    :param board: The position.
+    :param depth: The depth of the perft.
+    :param workers: The number of worker processes (default: the number of processors).
+    :param split_depth: The number of half moves that are played before the positions are sent to the workers.
+    :param hash_size: The size of the perft table of each worker in MB or 0 for no table.
+    :return: The dictionary from the encoded root move to its number of leaf nodes, the number of lookups and the
+        number of hits.
+    :raise ValueError: If the split depth is smaller than 1.
+    """
+    if split_depth < 1:
+        raise ValueError('the split depth must be at least 1')
+    if depth <= split_depth:
+        return board.divide(depth), 0, 0
+    nodes = {}
+    subtrees = []
+    for move in board.generate_moves(True):
+        # moves that end the game have no subtrees, but stay in the result
+        nodes[move] = 0
+        board.move(move)
+        collect_subtrees(board, split_depth - 1, move, subtrees)
+        board.undo_last_move()
+    use_bitboard = isinstance(board, BitboardChessboard)
+    probes = 0
+    hits = 0
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(hash_size,)) as executor:
+        results = executor.map(perft_of_position, [position for move, position in subtrees],
+                               repeat(depth - split_depth), repeat(use_bitboard))
+        for (move, position), (subtree_nodes, subtree_probes, subtree_hits) in zip(subtrees, results):
+            nodes[move] += subtree_nodes
+            probes += subtree_probes
+            hits += subtree_hits
+    return nodes, probes, hits
+
+
+def parallel_perft(board: chessboard.Chessboard, depth: int, workers: int = None, split_depth: int = 1,
+                   hash_size: float = 0) -> int:
+    """
+    Counts the leaf nodes like Chessboard.perft, but distributes the work on several processes (see parallel_divide).
+    :param board: The position.
+    :param depth: The depth of the perft.
+    :param workers: The number of worker processes (default: the number of processors).
+    :param split_depth: The number of half moves that are played before the positions are sent to the workers.
+    :param hash_size: The size of the perft table of each worker in MB or 0 for no table.
+    :return: The number of leaf nodes.
+    """
+    return sum(parallel_divide(board, depth, workers, split_depth, hash_size).values())
+
+
+def run_position(board: chessboard.Chessboard, depth: int, expected_nodes: int = None, workers: int = 0,
+                 split_depth: int = 1, hash_size: float = 0) -> bool:
+    """
+    Runs perft on a position and prints the number of nodes, the duration and the nodes per second.
+    :param board: The position.
+    :param depth: The depth of the perft.
+    :param expected_nodes: The known number of nodes or None.
+    :param workers: The number of worker processes or 0 for the serial perft.
+    :param split_depth: The number of half moves that are played before the work is distributed.
+    :param hash_size: The size of the perft table in MB (per worker) or 0 for no table.
+    :return: If the number of nodes is correct (True if it is not known).
+    """
+    start_time = time.perf_counter()
+    hit_rate = None
+    if workers > 0:
+        divide_nodes, probes, hits = parallel_divide_with_statistics(board, depth, workers, split_depth, hash_size)
+        nodes = sum(divide_nodes.values())
+        if hash_size > 0:
+            hit_rate = hits / probes if probes > 0 else 0.0
+    elif hash_size > 0:
+        table = PerftTable(hash_size)
+        nodes = hashed_perft(board, depth, table)
+        hit_rate = table.get_hit_rate()
+    else:
+        nodes = board.perft(depth)
+    duration = time.perf_counter() - start_time
+    nodes_per_second = nodes / duration if duration > 0 else 0
+    result = 'depth ' + str(depth) + ': ' + str(nodes) + ' nodes in ' + format(duration, '.2f') + ' s (' \
+        + format(nodes_per_second, ',.0f') + ' nodes/s)'
+    if expected_nodes is not None:
+        result += ' OK' if nodes == expected_nodes else ' FAILED, expected ' + str(expected_nodes)
+    if hit_rate is not None:
+        result += ', hash hit rate ' + format(hit_rate, '.1%')
+    print(result)
+    return expected_nodes is None or nodes == expected_nodes
+
+
+def run_suite(create_from_fen, max_nodes: int, workers: int = 0, split_depth: int = 1, hash_size: float = 0) -> bool:
+    """
+    Runs perft on all positions of the suite, each with the largest depth with at most max_nodes leaf nodes.
+    :param create_from_fen: The function that creates the board of the tested backend from a FEN.
+    :param max_nodes: The maximum number of leaf nodes per position.
+    :param workers: The number of worker processes or 0 for the serial perft.
+    :param split_depth: The number of half moves that are played before the work is distributed.
+    :param hash_size: The size of the perft table in MB (per position and worker) or 0 for no table.
+    :return: If all counts are correct.
+    """
+    correct = True
+    total_nodes = 0
+    start_time = time.perf_counter()
+    for name, fen, results in SUITE:
+        depth = max([depth for depth, nodes in results.items() if nodes <= max_nodes], default=1)
+        print(name + ',', end=' ')
+        correct = run_position(create_from_fen(fen), depth, results[depth], workers, split_depth, hash_size) \
+            and correct
+        total_nodes += results[depth]
+    duration = time.perf_counter() - start_time
+    print('total:', total_nodes, 'nodes in', format(duration, '.2f'), 's (' + format(total_nodes / duration, ',.0f'),
+          'nodes/s)')
+    print('all counts correct' if correct else 'WRONG COUNTS')
+    return correct
+
+
+def run_divide(board: chessboard.Chessboard, depth: int, workers: int = 0, split_depth: int = 1, hash_size: float = 0):
+    """
+    Prints the number of leaf nodes for every move of the position.
+    :param board: The position.
+    :param depth: The depth of the perft.
+    :param workers: The number of worker processes or 0 for the serial perft.
+    :param split_depth: The number of half moves that are played before the work is distributed.
+    :param hash_size: The size of the perft table in MB (per worker) or 0 for no table.
+    """
+    if workers > 0:
+        nodes = parallel_divide(board, depth, workers, split_depth, hash_size)
+    elif hash_size > 0:
+        nodes = hashed_divide(board, depth, PerftTable(hash_size))
+    else:
+        nodes = board.divide(depth)
+    for move in sorted(nodes, key=to_coordinate_notation):
+        print(to_coordinate_notation(move) + ':', nodes[move])
+    print('moves:', len(nodes), 'nodes:', sum(nodes.values()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Counts the leaf nodes of the move tree (perft). Without a FEN '
+                                                 'the suite of reference positions is run.')
+    parser.add_argument('--fen', help='the position (default: the reference suite)')
+    parser.add_argument('--depth', type=int, default=3, help='the depth for a single position')
+    parser.add_argument('--divide', action='store_true', help='print the node count of every root move')
+    parser.add_argument('--max-nodes', type=int, default=200000,
+                        help='the maximum number of leaf nodes per position of the suite')
+    parser.add_argument('--bitboard', action='store_true', help='use the bitboard backend')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='the number of worker processes (default: 0, the perft runs in this process)')
+    parser.add_argument('--split-depth', type=int, default=1,
+                        help='the number of half moves that are played before the work is distributed')
+    parser.add_argument('--hash', type=float, default=0,
+                        help='the size of the perft table in MB (per worker process, default: 0, no table)')
+    args = parser.parse_args()
+    if args.split_depth < 1:
+        parser.error('the split depth must be at least 1')
+
+    create = bitboard.create_from_fen if args.bitboard else chessboard.create_from_fen
+    if args.fen is None:
+        if not run_suite(create, args.max_nodes, args.workers, args.split_depth, args.hash):
+            sys.exit(1)
+    elif args.divide:
+        run_divide(create(args.fen), args.depth, args.workers, args.split_depth, args.hash)
+    else:
+        run_position(create(args.fen), args.depth, workers=args.workers, split_depth=args.split_depth,
+                     hash_size=args.hash)
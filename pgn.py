@@ -0,0 +1,121 @@
+import re
+
+import chessboard
+from epd import read_lines
+from san import parse_san
+
+# PGN (portable game notation) files contain games, each with tag pairs like [White "Name"] followed by the move text:
+#   1. e4 e5 2. Nf3 {a comment} Nc6 (2... d6 a variation) 3. Bb5 $1 a6 1-0
+# Comments, variations and numeric annotation glyphs are skipped, only the moves of the main line are read.
+
+TAG_PATTERN = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*]')
+# braces, parentheses and semicolons are separate tokens even if they are not separated by spaces
+TOKEN_PATTERN = re.compile(r'[{}();]|[^\s{}();]+')
+MOVE_NUMBER_PATTERN = re.compile(r'\d+\.+')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+STARTING_POSITION = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+class PgnGame:
+    """
+    A game of a PGN file: the tag pairs, the moves of the main line in SAN and the result.
+    """
+
+    def __init__(self, tags: dict, moves: list, result: str):
+        self.tags = tags
+        self.moves = moves
+        self.result = result
+
+    def create_start_position(self, create_from_fen=chessboard.create_from_fen) -> chessboard.Chessboard:
+        """
+        Creates the start position of the game (given by the FEN tag or the normal start position).
+        :param create_from_fen: The function that creates the chessboard (e.g. bitboard.create_from_fen).
+        :return: The new chessboard.
+        """
+        return create_from_fen(self.tags.get('FEN', STARTING_POSITION))
+
+    def replay(self, board: chessboard.Chessboard = None, trusted: bool = False):
+        """
+        Makes the moves of the game one at a time.
+        :param board: The start position of the game (created from the tags if it is missing). The moves are made on
+            this board.
+        :param trusted: If set, the moves are assumed to be legal and are not checked completely (see san.parse_san).
+        :return: A generator of the made moves (encoded). After each move, the board has the position after it.
+        :raise ValueError: If a move is invalid.
+        """
+        if board is None:
+            board = self.create_start_position()
+        for san in self.moves:
+            move = parse_san(board, san, trusted)
+            board.move(move)
+            yield move
+
+
+def read_games(source, use_mmap: bool = False):
+    """
+    Reads the games of a PGN file one at a time, without reading the whole file.
+    :param source: The path of the file or a binary file object.
+    :param use_mmap: If the file is memory-mapped instead of read with buffered reads.
+    :return: A generator of the games (PgnGame).
+    """
+    tags = {}
+    moves = []
+    in_comment = False
+    variation_depth = 0
+    for line in read_lines(source, use_mmap):
+        line = line.decode('utf-8', 'replace')
+        if not in_comment:
+            stripped_line = line.strip()
+            if stripped_line[:1] == '[' and variation_depth == 0:
+                if moves:
+                    # the tags of the next game, but the last game had no result
+                    yield PgnGame(tags, moves, '*')
+                    tags, moves = {}, []
+                for name, value in TAG_PATTERN.findall(stripped_line):
+                    tags[name] = value.replace('\\"', '"').replace('\\\\', '\\')
+                continue
+            if stripped_line[:1] == '%':
+                # escaped line
+                continue
+        for token in TOKEN_PATTERN.findall(line):
+            if in_comment:
+                in_comment = token != '}'
+            elif token == '{':
+                in_comment = True
+            elif token == ';':
+                # the rest of the line is a comment
+                break
+            elif token == '(':
+                variation_depth += 1
+            elif token == ')':
+                variation_depth -= 1
+            elif variation_depth > 0 or token[0] == '$':
+                continue
+            elif token in RESULTS:
+                yield PgnGame(tags, moves, token)
+                tags, moves = {}, []
+            else:
+                # a move, possibly with its move number in front of it (e.g. 12.e4)
+                number = MOVE_NUMBER_PATTERN.match(token)
+                if number:
+                    token = token[number.end():]
+                if token:
+                    moves.append(token)
+    if moves or tags:
+        yield PgnGame(tags, moves, '*')
+
+
+def replay_games(source, trusted: bool = False, create_from_fen=chessboard.create_from_fen, use_mmap: bool = False):
+    """
+    Reads the games of a PGN file and makes their moves one at a time, e.g. to collect positions of a database.
+    :param source: The path of the file or a binary file object.
+    :param trusted: If set, the moves are assumed to be legal and are not checked completely (see san.parse_san).
+    :param create_from_fen: The function that creates the chessboards (e.g. bitboard.create_from_fen).
+    :param use_mmap: If the file is memory-mapped instead of read with buffered reads.
+    :return: A generator of tuples of the game, the chessboard and the made move (encoded). The same chessboard is
+        used for all moves of a game, so it has to be copied to keep a position.
+    """
+    for game in read_games(source, use_mmap):
+        board = game.create_start_position(create_from_fen)
+        for move in game.replay(board, trusted):
+            yield game, board, move
@@ -0,0 +1,105 @@
+import struct
+
+from board_constants import *
+from chessboard import Chessboard
+
+# A position can be encoded in POSITION_SIZE bytes:
+#   0-31:  the board, two squares per byte (the lower nibble is the even square, the upper nibble the odd square)
+#   32:    bit 0: black to move, bits 1-4: the castle rights (CASTLE_RIGHT_* constants)
+#   33:    the en passant square + 1 (0 if en passant is not possible)
+#   34-35: the counter of half moves for the 50 move rule (little endian)
+#   36-37: the move number (little endian)
+# All positions have the same size, so a file or buffer of positions can be indexed directly.
+
+BOARD_SIZE = 32
+STATE_FORMAT = struct.Struct('<BBHH')
+POSITION_SIZE = BOARD_SIZE + STATE_FORMAT.size
+
+# the lower nibble of every byte of the packed board
+NIBBLE_MASK = int.from_bytes(b'\x0f' * BOARD_SIZE, 'little')
+
+
+def to_bytes(board: Chessboard) -> bytes:
+    """
+    Encodes a position into POSITION_SIZE bytes. The made moves are not encoded.
+    :param board: The chessboard.
+    :return: The encoded position.
+    """
+    squares = board.board
+    # every square fits into a nibble, so shifting the odd squares as one big number never carries into the next byte
+    packed_board = int.from_bytes(squares[0::2], 'little') | int.from_bytes(squares[1::2], 'little') << 4
+    flags = (1 if board.turn == 'black' else 0) | board.castle_rights << 1
+    return packed_board.to_bytes(BOARD_SIZE, 'little') + STATE_FORMAT.pack(
+        flags, board.en_passant_square + 1, min(board.half_move_count_for_draw, 0xFFFF), board.move_number)
+
+
+def encode_fen(fen: str) -> bytes:
+    """
+    Encodes a position given in FEN-Format directly, without creating a chessboard.
+    :param fen: The position in FEN-Format (the counters may be missing, as in EPD).
+    :return: The encoded position.
+    """
+    fields = fen.split()
+    squares = bytearray()
+    for row in reversed(fields[0].split('/')):
+        for field in row:
+            if field.isdigit():
+                squares += bytes(int(field))
+            else:
+                squares.append(translation_from_fen[field])
+    if len(squares) != 64:
+        raise ValueError('invalid FEN board: ' + fields[0])
+    flags = 1 if fields[1] == 'b' else 0
+    for right, letter in ((CASTLE_RIGHT_WHITE_SHORT, 'K'), (CASTLE_RIGHT_WHITE_LONG, 'Q'),
+                          (CASTLE_RIGHT_BLACK_SHORT, 'k'), (CASTLE_RIGHT_BLACK_LONG, 'q')):
+        if letter in fields[2]:
+            flags |= right << 1
+    en_passant_square = 0 if fields[3] == '-' else ord(fields[3][0]) - 96 + 8 * (int(fields[3][1]) - 1)
+    draw_counter = int(fields[4]) if len(fields) > 4 else 0
+    move_number = int(fields[5]) if len(fields) > 5 else 1
+    packed_board = int.from_bytes(squares[0::2], 'little') | int.from_bytes(squares[1::2], 'little') << 4
+    return packed_board.to_bytes(BOARD_SIZE, 'little') + STATE_FORMAT.pack(flags, en_passant_square, draw_counter,
+                                                                            move_number)
+
+
+def from_bytes(data, offset: int = 0, board_class=Chessboard) -> Chessboard:
+    """
+    Decodes a position. The data is read in place, so a memoryview of a large buffer (e.g. a memory-mapped file of
+    positions) can be decoded without copying it.
+    :param data: The bytes-like object with the encoded position.
+    :param offset: The index of the first byte of the position in data.
+    :param board_class: The class of the created chessboard (Chessboard or a subclass with the same constructor).
+    :return: The new chessboard.
+    """
+    if len(data) < offset + POSITION_SIZE:
+        raise ValueError('the data is too short for an encoded position')
+    data = memoryview(data)
+    packed_board = int.from_bytes(data[offset:offset + BOARD_SIZE], 'little')
+    squares = bytearray(64)
+    squares[0::2] = (packed_board & NIBBLE_MASK).to_bytes(BOARD_SIZE, 'little')
+    squares[1::2] = (packed_board >> 4 & NIBBLE_MASK).to_bytes(BOARD_SIZE, 'little')
+    flags, en_passant_square, draw_counter, move_number = STATE_FORMAT.unpack_from(data, offset + BOARD_SIZE)
+    castle_rights = flags >> 1
+    castle = {
+        'white': {
+            'short': bool(castle_rights & CASTLE_RIGHT_WHITE_SHORT),
+            'long': bool(castle_rights & CASTLE_RIGHT_WHITE_LONG),
+        },
+        'black': {
+            'short': bool(castle_rights & CASTLE_RIGHT_BLACK_SHORT),
+            'long': bool(castle_rights & CASTLE_RIGHT_BLACK_LONG),
+        }
+    }
+    return board_class(squares, 'black' if flags & 1 else 'white', castle, en_passant_square != 0,
+                       en_passant_square - 1, move_number, draw_counter)
+
+
+def iterate_positions(data, board_class=Chessboard):
+    """
+    Yields all positions of a buffer with consecutive encoded positions, one at a time.
+    :param data: The bytes-like object (e.g. a memory-mapped file).
+    :param board_class: The class of the created chessboards.
+    """
+    data = memoryview(data)
+    for offset in range(0, len(data) - POSITION_SIZE + 1, POSITION_SIZE):
+        yield from_bytes(data, offset, board_class)
@@ -0,0 +1,187 @@
+from board_constants import *
+from chessboard import Chessboard, translate_field_into_index, translate_index_into_field
+from move_encoding import CAPTURE_SHIFT, FLAG_CASTLE_LONG, FLAG_CASTLE_SHORT, FLAG_EN_PASSANT, FLAG_PROMOTION, \
+    FLAG_SHIFT, PROMOTION_SHIFT, encode_move
+
+# Standard algebraic notation (SAN) names a move by the moving piece and the target square, e.g. Nf3, exd5, O-O,
+# e8=Q+ or Rad1. The start square is only given (file, rank or both) if several pieces of the same kind can reach
+# the target square.
+
+PIECE_LETTERS = {
+    KING_WHITE: 'K', QUEEN_WHITE: 'Q', BISHOP_WHITE: 'B', KNIGHT_WHITE: 'N', ROOK_WHITE: 'R', PAWN_WHITE: '',
+    KING_BLACK: 'K', QUEEN_BLACK: 'Q', BISHOP_BLACK: 'B', KNIGHT_BLACK: 'N', ROOK_BLACK: 'R', PAWN_BLACK: '',
+}
+PROMOTION_LETTERS = {PROMOTION_QUEEN: 'Q', PROMOTION_ROOK: 'R', PROMOTION_BISHOP: 'B', PROMOTION_KNIGHT: 'N'}
+PROMOTIONS = {letter: promotion for promotion, letter in PROMOTION_LETTERS.items()}
+# the pieces of both players by letter (the pawn has no letter)
+PIECES = {
+    'white': {'K': KING_WHITE, 'Q': QUEEN_WHITE, 'B': BISHOP_WHITE, 'N': KNIGHT_WHITE, 'R': ROOK_WHITE,
+              '': PAWN_WHITE},
+    'black': {'K': KING_BLACK, 'Q': QUEEN_BLACK, 'B': BISHOP_BLACK, 'N': KNIGHT_BLACK, 'R': ROOK_BLACK,
+              '': PAWN_BLACK},
+}
+
+
+def to_san(board: Chessboard, move: int, legal_moves=None) -> str:
+    """
+    Creates the SAN of a legal move in the current position, including the check or checkmate suffix.
+    :param board: The position before the move.
+    :param move: The encoded move.
+    :param legal_moves: The legal moves of the position if they are already generated (used for disambiguation).
+    :return: The move in SAN.
+    """
+    start_square = move & 63
+    target_square = move >> 6 & 63
+    flag = move >> FLAG_SHIFT & 7
+    piece = board.board[start_square]
+    if flag == FLAG_CASTLE_SHORT:
+        san = 'O-O'
+    elif flag == FLAG_CASTLE_LONG:
+        san = 'O-O-O'
+    else:
+        is_capture = move >> CAPTURE_SHIFT & 15 != EMPTY
+        letter = PIECE_LETTERS[piece]
+        if letter == '':
+            # pawn captures are named by the file of the pawn
+            san = translate_index_into_field(start_square)[0] + 'x' if is_capture else ''
+        else:
+            san = letter + get_disambiguation(board, move, legal_moves) + ('x' if is_capture else '')
+        san += translate_index_into_field(target_square)
+        if flag == FLAG_PROMOTION:
+            san += '=' + PROMOTION_LETTERS[-(move >> PROMOTION_SHIFT & 15)]
+    board.move(move)
+    number_of_moves, in_check = board.get_status()
+    board.undo_last_move()
+    if in_check:
+        san += '#' if number_of_moves == 0 else '+'
+    return san
+
+
+def get_disambiguation(board: Chessboard, move: int, legal_moves=None) -> str:
+    """
+    Returns the part of the start square that distinguishes a piece move from the moves of other pieces of the same
+    kind to the same target square: nothing, the file, the rank or the whole square.
+    :param board: The position before the move.
+    :param move: The encoded move.
+    :param legal_moves: The legal moves of the position if they are already generated.
+    :return: The text that is inserted after the piece letter.
+    """
+    start_square = move & 63
+    target_square = move >> 6 & 63
+    piece = board.board[start_square]
+    if legal_moves is None:
+        legal_moves = board.generate_moves(True)
+    other_squares = [other_move & 63 for other_move in legal_moves
+                     if other_move >> 6 & 63 == target_square and other_move & 63 != start_square
+                     and board.board[other_move & 63] == piece]
+    if not other_squares:
+        return ''
+    field = translate_index_into_field(start_square)
+    if all(square % 8 != start_square % 8 for square in other_squares):
+        return field[0]
+    if all(square // 8 != start_square // 8 for square in other_squares):
+        return field[1]
+    return field
+
+
+def parse_san(board: Chessboard, san: str, trusted: bool = False) -> int:
+    """
+    Finds the move of the current position that is described by a SAN text. Check and annotation suffixes (+, #, !
+    and ?) are ignored, castling may be written with zeros.
+    :param board: The position.
+    :param san: The move in SAN.
+    :param trusted: If set, the text is assumed to describe a legal move (e.g. from a game database), so only the
+        pieces that can reach the target square are examined and castling is not checked at all. Legality is only
+        checked if several pieces match.
+    :return: The encoded move.
+    :raise ValueError: If the text describes no legal move or more than one.
+    """
+    text = san.rstrip('+#!?')
+    if text in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        flag = FLAG_CASTLE_SHORT if len(text) == 3 else FLAG_CASTLE_LONG
+        if trusted:
+            king_square = board.king_squares[board.turn]
+            return encode_move(king_square, king_square + (2 if flag == FLAG_CASTLE_SHORT else -2), flag)
+        candidates = [move for move in board.generate_moves(True) if move >> FLAG_SHIFT & 7 == flag]
+        return select_move(board, san, candidates, trusted)
+
+    # promotion, e.g. e8=Q (also written without = as e8Q)
+    promotion = 0
+    if text[-1:] in PROMOTIONS:
+        promotion = PROMOTIONS[text[-1]]
+        text = text[:-2] if text[-2:-1] == '=' else text[:-1]
+    # piece letter and target square
+    letter = text[0] if text[:1] in ('K', 'Q', 'B', 'N', 'R') else ''
+    target = text[-2:]
+    if len(target) != 2 or not 'a' <= target[0] <= 'h' or not '1' <= target[1] <= '8':
+        raise ValueError('invalid SAN: ' + san)
+    target_square = translate_field_into_index(target)
+    # the disambiguation: file and/or rank of the start square
+    hint = text[len(letter):-2].replace('x', '')
+    piece = PIECES[board.turn][letter]
+
+    if trusted:
+        candidates = get_candidates(board, piece, target_square)
+    else:
+        candidates = [move for move in board.generate_moves(True)
+                      if move >> 6 & 63 == target_square and board.board[move & 63] == piece]
+    candidates = [move for move in candidates
+                  if matches_hint(move & 63, hint) and -(move >> PROMOTION_SHIFT & 15) == promotion
+                  and move >> FLAG_SHIFT & 7 not in (FLAG_CASTLE_SHORT, FLAG_CASTLE_LONG)]
+    return select_move(board, san, candidates, trusted)
+
+
+def matches_hint(square: int, hint: str) -> bool:
+    """
+    Checks if a start square matches the disambiguation of a SAN text.
+    :param square: The start square.
+    :param hint: The file, the rank, both or nothing.
+    :return: If the square matches.
+    """
+    field = translate_index_into_field(square)
+    for character in hint:
+        if character not in field:
+            return False
+    return True
+
+
+def get_candidates(board: Chessboard, piece: int, target_square: int) -> list:
+    """
+    Returns the pseudo legal moves of all pieces of a kind to the target square, without generating any other move.
+    :param board: The position.
+    :param piece: The moving piece.
+    :param target_square: The target square.
+    :return: The list of encoded moves.
+    """
+    if piece == KING_WHITE or piece == KING_BLACK:
+        king_square = board.king_squares[board.turn]
+        return [move for move in board.get_piece_moves(king_square) if move >> 6 & 63 == target_square]
+    candidates = [move for move in board.get_moves_to_square(target_square) if board.board[move & 63] == piece]
+    if (piece == PAWN_WHITE or piece == PAWN_BLACK) and board.en_passant and target_square == board.en_passant_square:
+        captured_pawn = PAWN_BLACK if piece == PAWN_WHITE else PAWN_WHITE
+        forward = 8 if piece == PAWN_WHITE else -8
+        for start_square in (target_square - forward - 1, target_square - forward + 1):
+            if abs(start_square % 8 - target_square % 8) == 1 and board.board[start_square] == piece:
+                candidates.append(encode_move(start_square, target_square, FLAG_EN_PASSANT,
+                                              captured_piece=captured_pawn))
+    return candidates
+
+
+def select_move(board: Chessboard, san: str, candidates: list, trusted: bool) -> int:
+    """
+    Returns the only move of the candidates, removing illegal moves if there are several in trusted mode.
+    :param board: The position.
+    :param san: The SAN text (for the error message).
+    :param candidates: The encoded moves that match the text.
+    :param trusted: If the candidates are only pseudo legal.
+    :return: The encoded move.
+    :raise ValueError: If there is not exactly one move.
+    """
+    if trusted and len(candidates) > 1:
+        # e.g. one of two knights is pinned
+        candidates = board.filter_legal_moves(candidates)
+    if len(candidates) == 0:
+        raise ValueError('no legal move matches ' + san)
+    if len(candidates) > 1:
+        raise ValueError('ambiguous move ' + san)
+    return candidates[0]
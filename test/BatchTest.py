@@ -0,0 +1,67 @@
+import unittest
+
+import chessboard
+import engine
+import position_encoding
+from bitboard import BitboardChessboard
+from perft import SUITE
+
+try:
+    import batch
+except ImportError:
+    # numpy is not installed
+    batch = None
+
+FENS = [fen for name, fen, nodes in SUITE]
+
+
+@unittest.skipIf(batch is None, 'numpy is not installed')
+class BatchTest(unittest.TestCase):
+    def test_boards(self):
+        boards = [chessboard.create_from_fen(fen) for fen in FENS]
+        positions = batch.from_boards(boards)
+        self.assertEqual(len(FENS), len(positions))
+        self.assertEqual((len(FENS), 64), positions.squares.shape)
+        for fen, board in zip(FENS, positions.to_boards()):
+            self.assertEqual(fen, board.to_fen())
+        self.assertIsInstance(positions.to_board(0, BitboardChessboard), BitboardChessboard)
+
+    def test_from_bytes(self):
+        data = b''.join(position_encoding.encode_fen(fen) for fen in FENS)
+        positions = batch.from_bytes(data)
+        self.assertEqual(FENS, [board.to_fen() for board in positions.to_boards()])
+        with self.assertRaises(ValueError):
+            batch.from_bytes(data[:-1])
+
+    def test_evaluate_material(self):
+        fens = FENS + ['4k3/8/8/8/8/8/8/QQQQKQQQ w - - 0 1']
+        boards = [chessboard.create_from_fen(fen) for fen in fens]
+        # no position is checkmate or a draw, so the engine only counts the material
+        expected = [engine.evaluate(board) for board in boards]
+        self.assertEqual(expected, batch.evaluate_material(batch.from_boards(boards)).tolist())
+
+    def test_evaluate(self):
+        # the starting position is symmetric
+        evaluations = batch.evaluate(batch.from_boards([chessboard.create_starting_position()]))
+        self.assertAlmostEqual(0, evaluations[0], places=5)
+        # a knight in the centre is better than on the rim
+        centre, rim = batch.evaluate(batch.from_boards([
+            chessboard.create_from_fen('4k3/8/8/8/3N4/8/8/4K3 w - - 0 1'),
+            chessboard.create_from_fen('4k3/8/8/8/N7/8/8/4K3 w - - 0 1')]))
+        self.assertGreater(centre, rim)
+        self.assertAlmostEqual(3.2, centre, places=5)
+        # mirrored positions have opposite evaluations
+        white, black = batch.evaluate(batch.from_boards([
+            chessboard.create_from_fen('4k3/8/8/8/8/5N2/1P6/4K3 w - - 0 1'),
+            chessboard.create_from_fen('4k3/1p6/5n2/8/8/8/8/4K3 w - - 0 1')]))
+        self.assertAlmostEqual(white, -black, places=5)
+
+    def test_material_table(self):
+        # without bonuses, the table only contains the material
+        table = batch.create_piece_square_table()
+        positions = batch.from_boards(chessboard.create_from_fen(fen) for fen in FENS)
+        self.assertEqual(batch.evaluate_material(positions).tolist(), batch.evaluate(positions, table).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import random
+import unittest
+from unittest import mock
+
+import bitboard
+import chessboard
+import ChessboardTest
+from bitboard import BitboardChessboard
+
+
+class BitboardBackend(unittest.TestCase):
+    """
+    Runs the tests of the list based chessboard against the bitboard chessboard.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.object(chessboard, 'create_from_fen', bitboard.create_from_fen)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class BitboardCreatePositionTest(BitboardBackend, ChessboardTest.CreatePositionTest):
+    pass
+
+
+class BitboardMoveUndoMoveTest(BitboardBackend, ChessboardTest.MoveUndoMoveTest):
+    pass
+
+
+class BitboardMoveGenerationTest(BitboardBackend, ChessboardTest.MoveGenerationTest):
+    pass
+
+
+class BitboardCheckmateTest(BitboardBackend, ChessboardTest.CheckmateTest):
+    pass
+
+
+class BitboardHashTest(BitboardBackend, ChessboardTest.HashTest):
+    pass
+
+
+class BitboardDrawTest(BitboardBackend, ChessboardTest.DrawTest):
+    pass
+
+
+class BitboardStagedMoveGenerationTest(BitboardBackend, ChessboardTest.StagedMoveGenerationTest):
+    pass
+
+
+class BitboardCapturesAndEvasionsTest(BitboardBackend, ChessboardTest.CapturesAndEvasionsTest):
+    pass
+
+
+class BitboardStatusCacheTest(BitboardBackend, ChessboardTest.StatusCacheTest):
+    pass
+
+
+class BitboardCopyTest(BitboardBackend, ChessboardTest.CopyTest):
+    pass
+
+
+class BitboardConsistencyTest(unittest.TestCase):
+    def assert_bitboards(self, board: BitboardChessboard):
+        """
+        Compares the bitboards to the list of squares.
+        :param board: The bitboard chessboard.
+        """
+        for square in range(64):
+            piece = board.board[square]
+            for bitboard_piece in range(1, 13):
+                self.assertEqual(piece == bitboard_piece, bool(board.pieces[bitboard_piece] & (1 << square)))
+            self.assertEqual(piece != chessboard.EMPTY, bool(board.occupied & (1 << square)))
+
+    def test_random_games(self):
+        """
+        Plays random games and compares the moves with the list based chessboard after every move.
+        """
+        rng = random.Random(12345)
+        for fen in ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                    'r3k2r/2bp2P1/1pp1p1n1/pP2Pp1P/n2qP3/1B3N2/P1QP1PP1/R3K2R w KQkq a6 3 24'):
+            board = chessboard.create_from_fen(fen)
+            bitboard_board = bitboard.create_from_fen(fen)
+            for i in range(60):
+                moves = board.generate_moves()
+                self.assertEqual(sorted(moves), sorted(bitboard_board.generate_moves()))
+                if len(moves) == 0:
+                    break
+                move = rng.choice(moves)
+                board.move(move)
+                bitboard_board.move(move)
+                self.assertEqual(board.board, bitboard_board.board)
+                self.assert_bitboards(bitboard_board)
+            copy = bitboard_board.copy()
+            while bitboard_board.moves:
+                bitboard_board.undo_last_move()
+                self.assert_bitboards(bitboard_board)
+            self.assert_bitboards(copy)
+            self.assertEqual(chessboard.create_from_fen(fen).board, bitboard_board.board)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ import unittest
 import chessboard
 from chessboard import Chessboard
 from board_constants import *
+from move_encoding import CAPTURE_SHIFT, FLAG_PROMOTION, FLAG_SHIFT, encode_move
 
 
 class CreatePositionTest(unittest.TestCase):
@@ -179,6 +180,18 @@ class CreatePositionTest(unittest.TestCase):
         self.assertTrue(board.en_passant)
         self.assertEqual(SQUARES['a6'], board.get_en_passant_square())
 
+    def test_to_fen(self):
+        for fen in ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                    'r3k2r/2bp2P1/1pp1p1n1/pP2Pp1P/n2qP3/1B3N2/P1QP1PP1/R3K2R w KQkq a6 3 24',
+                    '8/8/8/8/8/8/8/K6k b - - 99 120'):
+            self.assertEqual(fen, chessboard.create_from_fen(fen).to_fen())
+        board = chessboard.create_starting_position()
+        board.move((SQUARES['e2'], SQUARES['e4'], DOUBLE_PAWN_MOVE))
+        self.assertEqual('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1', board.to_fen())
+        board.move((SQUARES['g8'], SQUARES['f6']))
+        board.move((SQUARES['e1'], SQUARES['e2']))
+        self.assertEqual('rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPPKPPP/RNBQ1BNR b kq - 2 2', board.to_fen())
+
 
 class MoveUndoMoveTest(unittest.TestCase):
     def test_switch_turn(self):
@@ -462,7 +475,8 @@ class MoveUndoMoveTest(unittest.TestCase):
         board.move(move)
         self.assertEqual(EMPTY, board.get_by_name(start_square))
         self.assertEqual(KNIGHT_WHITE, board.get_by_name(target_square))
-        self.assert_position(board, 24, 0, False)
+        # taking the rook on h8 removes the short castle right of black
+        self.assert_position(board, 24, 0, False, castle_black_short=False)
         board.undo_last_move()
         self.assertEqual(PAWN_WHITE, board.get_by_name(start_square))
         self.assertEqual(ROOK_BLACK, board.get_by_name(target_square))
@@ -916,5 +930,272 @@ class CheckmateTest(unittest.TestCase):
         self.assertFalse(board.is_stalemate())
 
 
+class HashTest(unittest.TestCase):
+    def test_hash_of_fen(self):
+        board = chessboard.create_starting_position()
+        self.assertEqual(board.calculate_hash(), board.hash)
+        board.move((SQUARES['e2'], SQUARES['e4'], DOUBLE_PAWN_MOVE))
+        board.move((SQUARES['g8'], SQUARES['f6']))
+        # the hash of a board created from the FEN is calculated from scratch
+        fen_board = chessboard.create_from_fen('rnbqkb1r/pppppppp/5n2/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 1 2')
+        self.assertEqual(fen_board.hash, board.hash)
+
+    def test_hash_features(self):
+        board = chessboard.create_from_fen('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1')
+        # side to move
+        self.assertNotEqual(board.hash, chessboard.create_from_fen('r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1').hash)
+        # castle rights
+        self.assertNotEqual(board.hash, chessboard.create_from_fen('r3k2r/8/8/8/8/8/8/R3K2R w Kkq - 0 1').hash)
+        # en passant file
+        board = chessboard.create_from_fen('4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1')
+        self.assertNotEqual(board.hash, chessboard.create_from_fen('4k3/8/8/3pP3/8/8/8/4K3 w - - 0 1').hash)
+
+    def test_transposition(self):
+        board = chessboard.create_starting_position()
+        initial_hash = board.hash
+        for move in ((SQUARES['g1'], SQUARES['f3']), (SQUARES['g8'], SQUARES['f6']),
+                     (SQUARES['f3'], SQUARES['g1']), (SQUARES['f6'], SQUARES['g8'])):
+            board.move(move)
+        self.assertEqual(initial_hash, board.hash)
+
+    def test_random_games(self):
+        """
+        Plays random games in debug mode, so that the incremental hash is compared to a full recalculation after
+        every move and undo.
+        """
+        rng = random.Random(2024)
+        for fen in ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+                    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                    'r3k2r/2bp2P1/1pp1p1n1/pP2Pp1P/n2qP3/1B3N2/P1QP1PP1/R3K2R w KQkq a6 3 24'):
+            board = chessboard.create_from_fen(fen)
+            board.debug = True
+            initial_hash = board.hash
+            for i in range(80):
+                moves = board.generate_moves(True)
+                if len(moves) == 0:
+                    break
+                board.move(rng.choice(moves))
+            while board.moves:
+                board.undo_last_move()
+            self.assertEqual(initial_hash, board.hash)
+
+
+class DrawTest(unittest.TestCase):
+    def test_threefold_repetition(self):
+        board = chessboard.create_starting_position()
+        knight_moves = ((SQUARES['g1'], SQUARES['f3']), (SQUARES['g8'], SQUARES['f6']),
+                        (SQUARES['f3'], SQUARES['g1']), (SQUARES['f6'], SQUARES['g8']))
+        for move in knight_moves:
+            board.move(move)
+        self.assertEqual(1, board.count_repetitions())
+        self.assertFalse(board.is_draw_repetition())
+        for move in knight_moves:
+            board.move(move)
+        self.assertEqual(2, board.count_repetitions())
+        self.assertTrue(board.is_draw_repetition())
+        self.assertTrue(board.is_draw())
+        board.undo_last_move()
+        self.assertFalse(board.is_draw_repetition())
+
+    def test_repetition_after_irreversible_move(self):
+        board = chessboard.create_from_fen('4k3/8/8/8/8/8/4P3/R3K3 w Q - 0 1')
+        # the first rook move removes the castle right, so the position after Ra1 differs from the initial one
+        for move in ((SQUARES['a1'], SQUARES['a2']), (SQUARES['e8'], SQUARES['d8']),
+                     (SQUARES['a2'], SQUARES['a1']), (SQUARES['d8'], SQUARES['e8'])):
+            board.move(move)
+        self.assertEqual(0, board.count_repetitions())
+        # a pawn move resets the draw counter, only the positions after it are compared
+        board.move((SQUARES['e2'], SQUARES['e3']))
+        self.assertEqual(0, board.get_move_counter_for_draw())
+        self.assertEqual(0, board.count_repetitions())
+        for move in ((SQUARES['e8'], SQUARES['d8']), (SQUARES['a1'], SQUARES['a2']),
+                     (SQUARES['d8'], SQUARES['e8']), (SQUARES['a2'], SQUARES['a1'])):
+            board.move(move)
+        self.assertEqual(1, board.count_repetitions())
+
+    def test_insufficient_material(self):
+        for fen in ('4k3/8/8/8/8/8/8/4K3 w - - 0 1',
+                    '4k3/8/8/8/8/8/8/4KN2 w - - 0 1',
+                    '4kb2/8/8/8/8/8/8/4K3 b - - 0 1',
+                    '2b1k3/8/8/8/8/8/8/4KB2 w - - 0 1',
+                    '4k3/8/8/8/8/8/6b1/4KB2 w - - 0 1'):
+            self.assertTrue(chessboard.create_from_fen(fen).is_draw_insufficient_material(), fen)
+        for fen in ('4k3/8/8/8/8/8/8/4KQ2 w - - 0 1',
+                    '4k3/8/8/8/8/8/4P3/4K3 w - - 0 1',
+                    '4kb2/8/8/8/8/8/8/4KB2 w - - 0 1',
+                    '4k3/8/8/8/8/8/8/3NKN2 w - - 0 1',
+                    '4kn2/8/8/8/8/8/8/4KB2 w - - 0 1',
+                    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'):
+            self.assertFalse(chessboard.create_from_fen(fen).is_draw_insufficient_material(), fen)
+
+
+class StagedMoveGenerationTest(unittest.TestCase):
+    fens = ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+            'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+            'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+            'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+            '8/8/8/2k5/3Pp3/8/8/4K3 b - d3 0 1')
+
+    def test_same_moves(self):
+        for fen in self.fens:
+            board = chessboard.create_from_fen(fen)
+            moves = list(board.iterate_moves())
+            self.assertEqual(len(set(moves)), len(moves))
+            self.assertEqual(sorted(board.generate_moves(True)), sorted(moves))
+
+    def test_captures_first(self):
+        for fen in self.fens:
+            board = chessboard.create_from_fen(fen)
+            is_quiet = [move >> CAPTURE_SHIFT & 15 == EMPTY and move >> FLAG_SHIFT & 7 != FLAG_PROMOTION
+                        for move in board.iterate_moves()]
+            self.assertEqual(sorted(is_quiet), is_quiet)
+
+    def test_hash_move(self):
+        board = chessboard.create_from_fen(self.fens[1])
+        moves = list(board.iterate_moves())
+        for hash_move in (moves[0], moves[-1], moves[len(moves) // 2]):
+            staged_moves = list(board.iterate_moves(hash_move))
+            self.assertEqual(hash_move, staged_moves[0])
+            self.assertEqual(sorted(moves), sorted(staged_moves))
+        # invalid hash moves are skipped: a move of the opponent, a move onto an own piece and a move of a pinned piece
+        for hash_move in (encode_move(SQUARES['a8'], SQUARES['b8']), encode_move(SQUARES['e1'], SQUARES['e2'])):
+            self.assertEqual(sorted(moves), sorted(board.iterate_moves(hash_move)))
+        board = chessboard.create_from_fen('4k3/4r3/8/8/8/8/4N3/4K3 w - - 0 1')
+        self.assertEqual(sorted(board.generate_moves(True)),
+                         sorted(board.iterate_moves(encode_move(SQUARES['e2'], SQUARES['c3']))))
+
+    def test_lazy_stages(self):
+        """
+        The quiet moves are only generated when all captures were used.
+        """
+        board = chessboard.create_from_fen(self.fens[1])
+        generated_modes = []
+        generate = board.generate_pseudo_legal_moves
+
+        def generate_pseudo_legal_moves(mode=chessboard.GENERATE_ALL):
+            generated_modes.append(mode)
+            return generate(mode)
+
+        board.generate_pseudo_legal_moves = generate_pseudo_legal_moves
+        moves = board.iterate_moves()
+        next(moves)
+        self.assertEqual([chessboard.GENERATE_CAPTURES], generated_modes)
+        list(moves)
+        self.assertEqual([chessboard.GENERATE_CAPTURES, chessboard.GENERATE_QUIETS], generated_modes)
+
+
+class CapturesAndEvasionsTest(unittest.TestCase):
+    def is_capture(self, move: int) -> bool:
+        return move >> CAPTURE_SHIFT & 15 != EMPTY or move >> FLAG_SHIFT & 7 == FLAG_PROMOTION
+
+    def test_captures(self):
+        for fen in StagedMoveGenerationTest.fens:
+            board = chessboard.create_from_fen(fen)
+            captures = [move for move in board.generate_moves(True) if self.is_capture(move)]
+            self.assertEqual(sorted(captures), sorted(board.generate_captures()))
+
+    def test_evasions(self):
+        for fen, number_of_moves in (('4k3/8/8/8/8/8/3q4/4K3 w - - 0 1', 2),
+                                     # interpositions of knight and rook
+                                     ('4k3/8/8/8/1b6/R7/8/1N2K3 w - - 0 1', 7),
+                                     # double check
+                                     ('4k3/8/8/8/8/2b5/8/4K2r w - - 0 1', 2),
+                                     # en passant takes the checking pawn
+                                     ('8/8/8/2k5/3Pp3/8/8/4K3 b - d3 0 1', 9),
+                                     ('3r3k/8/8/8/8/8/1P6/3K4 w - - 0 1', 4)):
+            board = chessboard.create_from_fen(fen)
+            expected_moves = board.filter_legal_moves(board.generate_pseudo_legal_moves())
+            self.assertEqual(number_of_moves, len(expected_moves), fen)
+            self.assertEqual(sorted(expected_moves), sorted(board.generate_evasions()), fen)
+
+    def test_random_games(self):
+        """
+        Compares captures and evasions with the full move generation in random games.
+        """
+        rng = random.Random(99)
+        for fen in StagedMoveGenerationTest.fens:
+            board = chessboard.create_from_fen(fen)
+            for i in range(100):
+                moves = board.filter_legal_moves(board.generate_pseudo_legal_moves())
+                if len(moves) == 0:
+                    break
+                self.assertEqual(sorted(move for move in moves if self.is_capture(move)),
+                                 sorted(board.generate_captures()))
+                if board.get_checks_and_pins()[0] > 0:
+                    self.assertEqual(sorted(moves), sorted(board.generate_evasions()))
+                board.move(rng.choice(moves))
+
+
+class StatusCacheTest(unittest.TestCase):
+    def test_status(self):
+        board = chessboard.create_starting_position()
+        self.assertEqual((20, False), board.get_status())
+        for move in ((SQUARES['f2'], SQUARES['f3']), (SQUARES['e7'], SQUARES['e5'], DOUBLE_PAWN_MOVE),
+                     (SQUARES['g2'], SQUARES['g4'], DOUBLE_PAWN_MOVE)):
+            board.move(move)
+        self.assertFalse(board.is_checkmate())
+        board.move((SQUARES['d8'], SQUARES['h4']))
+        self.assertEqual((0, True), board.get_status())
+        self.assertTrue(board.is_checkmate())
+        self.assertFalse(board.is_stalemate())
+        board.undo_last_move()
+        self.assertEqual((len(board.generate_moves()), False), board.get_status())
+        self.assertFalse(board.is_checkmate())
+
+    def test_moves_generated_once(self):
+        board = chessboard.create_from_fen('4k3/8/8/8/8/8/3q4/4K3 w - - 0 1')
+        generate = board.generate_moves
+        calls = []
+
+        def generate_moves(encoded=False):
+            calls.append(encoded)
+            return generate(encoded)
+
+        board.generate_moves = generate_moves
+        board.is_checkmate()
+        board.is_stalemate()
+        board.is_draw()
+        self.assertEqual(1, len(calls))
+        board.move((SQUARES['e1'], SQUARES['d2'], QUEEN_BLACK))
+        # insufficient material is detected without generating moves
+        self.assertTrue(board.is_draw())
+        self.assertEqual(1, len(calls))
+        self.assertEqual((5, False), board.get_status())
+        self.assertEqual(2, len(calls))
+
+
+class CopyTest(unittest.TestCase):
+    def test_copy_is_independent(self):
+        board = chessboard.create_from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+        board.move((SQUARES['e1'], SQUARES['g1'], CASTLE_SHORT))
+        fen = board.to_fen()
+        moves = sorted(board.generate_moves(True))
+        copy = board.copy()
+        self.assertIsInstance(copy, board.__class__)
+        self.assertEqual(fen, copy.to_fen())
+        self.assertEqual(board.hash, copy.hash)
+        for move in copy.generate_moves(True)[:10]:
+            copy.move(move)
+            copy.generate_moves()
+        self.assertEqual(fen, board.to_fen())
+        self.assertEqual(moves, sorted(board.generate_moves(True)))
+        # the moves that were made before copying can be undone on the copy
+        while copy.moves:
+            copy.undo_last_move()
+        self.assertEqual('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', copy.to_fen())
+        self.assertEqual(fen, board.to_fen())
+
+    def test_copy_make(self):
+        board = chessboard.create_starting_position()
+        for move in board.generate_moves(True):
+            copy = board.copy_make(move)
+            board.move(move)
+            self.assertEqual(board.to_fen(), copy.to_fen())
+            self.assertEqual(board.hash, copy.hash)
+            self.assertEqual(sorted(board.generate_moves(True)), sorted(copy.generate_moves(True)))
+            board.undo_last_move()
+        self.assertEqual(chessboard.create_starting_position().to_fen(), board.to_fen())
+
+
 if __name__ == '__main__':
     unittest.main()
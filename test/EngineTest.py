@@ -0,0 +1,267 @@
+import contextlib
+import io
+import math
+import time
+import unittest
+from unittest import mock
+
+import bitboard
+import chessboard
+import engine
+from chessboard import create_from_fen
+from move_encoding import encode_move, to_coordinate_notation
+
+FENS = (
+    'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 2 3',
+    '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 b - - 0 1',
+)
+
+
+def minimax(position: chessboard.Chessboard, depth: int) -> int:
+    """
+    The evaluation of a plain minimax search (from white's view).
+    """
+    if depth == 0:
+        return engine.evaluate(position)
+    evaluations = []
+    for move in position.generate_moves(True):
+        position.move(move)
+        evaluations.append(minimax(position, depth - 1))
+        position.undo_last_move()
+    if not evaluations:
+        return engine.evaluate(position)
+    return max(evaluations) if position.turn == 'white' else min(evaluations)
+
+
+class SearchTest(unittest.TestCase):
+    def test_same_evaluation_as_minimax(self):
+        for fen in FENS:
+            # plain minimax is too slow for depth 3 in the middle game positions
+            for depth in ((1, 2, 3) if fen in (FENS[0], FENS[3]) else (1, 2)):
+                with self.subTest(fen=fen, depth=depth):
+                    position = create_from_fen(fen)
+                    move, evaluation = engine.Engine(position, quiescence=False).search(depth)
+                    self.assertEqual(minimax(create_from_fen(fen), depth), evaluation)
+                    # the best move reaches the evaluation
+                    position.move(move)
+                    self.assertEqual(evaluation, minimax(position, depth - 1))
+                    # the position is unchanged after the search
+                    position.undo_last_move()
+                    self.assertEqual(fen, position.to_fen())
+
+    def test_bitboard_backend(self):
+        # the engine runs on any Chessboard subclass and evaluates the same (the order of equal moves may differ)
+        for fen in FENS:
+            with self.subTest(fen=fen):
+                position = bitboard.create_from_fen(fen)
+                move, evaluation = engine.Engine(position).search(3)
+                self.assertEqual(engine.Engine(create_from_fen(fen)).search(3)[1], evaluation)
+                self.assertIn(move, position.generate_moves(True))
+                self.assertEqual(fen, position.to_fen())
+
+    def test_fewer_nodes(self):
+        position = create_from_fen(FENS[1])
+        search_engine = engine.Engine(position)
+        search_engine.search(3)
+        self.assertLess(search_engine.nodes * 3, 1 + 48 + 2039 + 97862)
+
+    def test_checkmate(self):
+        # scholar's mate
+        move, evaluation = engine.Engine(create_from_fen(FENS[2])).search(3)
+        self.assertEqual(('f3f7', 100), (to_coordinate_notation(move), evaluation))
+        # black is checkmated, so there is no move
+        position = create_from_fen('r1bqkb1r/pppp1Qpp/2n2n2/4p3/2B1P3/8/PPPP1PPP/RNB1K1NR b KQkq - 0 4')
+        self.assertEqual(((), 100), engine.Engine(position).search(2))
+
+    def test_make_move_without_move(self):
+        # checkmate, stalemate and depth 0: nothing is moved
+        for fen, depth in (('r1bqkb1r/pppp1Qpp/2n2n2/4p3/2B1P3/8/PPPP1PPP/RNB1K1NR b KQkq - 0 4', 3),
+                           ('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1', 3), (FENS[0], 0)):
+            position = create_from_fen(fen)
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                engine.Engine(position).make_move(depth)
+            self.assertIn('Computer moves:  ()', output.getvalue())
+            self.assertEqual(fen, position.to_fen())
+
+    def test_make_move(self):
+        position = create_from_fen(FENS[2])
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.Engine(position).make_move(2)
+        self.assertEqual('r1bqkbnr/pppp1Qpp/2n5/4p3/2B1P3/8/PPPP1PPP/RNB1K1NR b KQkq - 0 3', position.to_fen())
+
+    def test_random_tie_break(self):
+        # all king moves keep the material balance
+        fen = '4k3/8/8/8/8/8/8/4K3 w - - 0 1'
+        position = create_from_fen(fen)
+        # without random tie break, the first move is chosen
+        self.assertEqual(next(position.iterate_moves()), engine.Engine(position).search(2)[0])
+        moves = set()
+        for i in range(50):
+            move, evaluation = engine.Engine(create_from_fen(fen), random_tie_break=True).search(2)
+            self.assertEqual(0, evaluation)
+            moves.add(to_coordinate_notation(move))
+        self.assertGreater(len(moves), 1)
+        self.assertLessEqual(moves, {'e1d1', 'e1f1', 'e1d2', 'e1e2', 'e1f2'})
+
+
+class IterativeDeepeningTest(unittest.TestCase):
+    def test_same_evaluation_as_fixed_depth(self):
+        for fen in FENS:
+            with self.subTest(fen=fen):
+                search_engine = engine.Engine(create_from_fen(fen))
+                move, evaluation = search_engine.search_iterative(3)
+                self.assertEqual(3, search_engine.completed_depth)
+                self.assertEqual(engine.Engine(create_from_fen(fen)).search(3)[1], evaluation)
+
+    def test_node_limit(self):
+        search_engine = engine.Engine(create_from_fen(FENS[1]))
+        search_engine.search_iterative(1)
+        first_iteration_nodes = search_engine.nodes
+        for node_limit in (10, 1000, 5000):
+            position = create_from_fen(FENS[1])
+            search_engine = engine.Engine(position)
+            move, evaluation = search_engine.search_iterative(10, node_limit=node_limit)
+            self.assertIn(move, position.generate_moves(True))
+            self.assertGreaterEqual(search_engine.completed_depth, 1)
+            # the first iteration is always finished
+            self.assertLessEqual(search_engine.nodes, max(node_limit, first_iteration_nodes))
+            self.assertEqual(FENS[1], position.to_fen())
+
+    def test_time_limit(self):
+        # the clock advances by 1 ms per searched position, so the limit is reached after 1500 positions: the third
+        # iteration (613 positions) is expected to finish in time, the fourth one is started and aborted
+        position = create_from_fen(FENS[0])
+        search_engine = engine.Engine(position)
+        with mock.patch.object(engine.time, 'monotonic', lambda: search_engine.nodes / 1000):
+            move, evaluation = search_engine.search_iterative(10, time_limit=1.5)
+        self.assertEqual(3, search_engine.completed_depth)
+        self.assertGreaterEqual(search_engine.nodes, 1500)
+        self.assertLessEqual(search_engine.nodes, 1500 + engine.CHECK_INTERVAL)
+        self.assertIn(move, position.generate_moves(True))
+        self.assertEqual(FENS[0], position.to_fen())
+
+    def test_budget_is_used(self):
+        # a generous budget is not given up after the first iterations: with 1 ms per position, the fourth iteration
+        # ends after 29240 positions, within the limit of 30000
+        search_engine = engine.Engine(create_from_fen(FENS[1]))
+        with mock.patch.object(engine.time, 'monotonic', lambda: search_engine.nodes / 1000):
+            search_engine.search_iterative(10, time_limit=30)
+        self.assertEqual(4, search_engine.completed_depth)
+        self.assertLessEqual(search_engine.nodes, 30000)
+
+    def test_deadline(self):
+        # the deadline has already passed, but the first iteration is finished anyway
+        position = create_from_fen(FENS[2])
+        search_engine = engine.Engine(position)
+        move, evaluation = search_engine.search_iterative(10, deadline=time.monotonic())
+        self.assertEqual(1, search_engine.completed_depth)
+        self.assertEqual(('f3f7', 100), (to_coordinate_notation(move), evaluation))
+
+    def test_aborted_search(self):
+        class AbortingEngine(engine.Engine):
+            def check_limits(self):
+                # abort the third iteration
+                if self.completed_depth == 2:
+                    raise engine.SearchAborted()
+                super().check_limits()
+
+        position = create_from_fen(FENS[1])
+        search_engine = AbortingEngine(position)
+        move, evaluation = search_engine.search_iterative(5)
+        self.assertEqual(2, search_engine.completed_depth)
+        self.assertEqual(engine.Engine(create_from_fen(FENS[1])).search(2)[1], evaluation)
+        # the moves of the aborted iteration are undone
+        self.assertEqual(0, position.ply)
+        self.assertEqual(FENS[1], position.to_fen())
+
+
+class MoveOrderingTest(unittest.TestCase):
+    def test_all_moves(self):
+        # every legal move is searched exactly once, also with hash and killer moves that are illegal
+        for fen in FENS + ('r3k2r/p1pp1pb1/bn2Qnp1/2qPN3/1p2P3/2N5/PPPBBPPP/R3K2R b KQkq - 3 2',):
+            position = create_from_fen(fen)
+            search_engine = engine.Engine(position)
+            moves = sorted(position.generate_moves(True))
+            self.assertEqual(moves, sorted(search_engine.order_moves(0, 0)))
+            search_engine.killers[1] = [moves[-1], encode_move(0, 63)]
+            self.assertEqual(moves, sorted(search_engine.order_moves(moves[0], 1)))
+
+    def test_order(self):
+        # the pawn on d4 can take the queen on e5 or the pawn on c5
+        position = create_from_fen('4k3/8/8/2p1q3/3P4/8/8/3Q3K w - - 0 1')
+        search_engine = engine.Engine(position)
+        killer = encode_move(3, 19)
+        search_engine.killers[0] = [killer, 0]
+        moves = [to_coordinate_notation(move) for move in search_engine.order_moves(encode_move(7, 6), 0)]
+        # the hash move, the captures (most valuable victim first), the killer move
+        self.assertEqual(['h1g1', 'd4e5', 'd4c5', 'd1d3'], moves[:4])
+        self.assertEqual(sorted(to_coordinate_notation(move) for move in position.generate_moves(True)), sorted(moves))
+
+    def test_history(self):
+        position = create_from_fen('4k3/8/8/8/8/8/8/4K3 w - - 0 1')
+        search_engine = engine.Engine(position)
+        search_engine.store_cutoff(encode_move(4, 13), 3, 5)
+        search_engine.store_cutoff(encode_move(4, 11), 2, 5)
+        moves = [to_coordinate_notation(move) for move in search_engine.order_moves(0, 0)]
+        self.assertEqual(['e1f2', 'e1d2'], moves[:2])
+        self.assertEqual(encode_move(4, 11), search_engine.killers[5][0])
+        # the history is halved when a new search starts
+        search_engine.start_search()
+        self.assertEqual(4, search_engine.history[encode_move(4, 13)])
+
+    def test_cutoff_rate(self):
+        search_engine = engine.Engine(create_from_fen(FENS[1]))
+        search_engine.search_iterative(3)
+        self.assertGreater(search_engine.cutoffs, 0)
+        self.assertGreater(search_engine.get_first_move_cutoff_rate(), 0.8)
+
+
+class QuiescenceTest(unittest.TestCase):
+    def test_defended_pawn(self):
+        # the pawn on d5 is defended, so taking it loses the queen
+        fen = '4k3/8/4p3/3p4/8/8/8/3QK3 w - - 0 1'
+        move, evaluation = engine.Engine(create_from_fen(fen), quiescence=False).search(1)
+        self.assertEqual(('d1d5', 8), (to_coordinate_notation(move), evaluation))
+        move, evaluation = engine.Engine(create_from_fen(fen)).search(1)
+        self.assertNotEqual('d1d5', to_coordinate_notation(move))
+        self.assertEqual(7, evaluation)
+
+    def test_exchange(self):
+        # white wins the knight and the pawn for the bishop: Bxd5 exd5 Rxd5
+        search_engine = engine.Engine(create_from_fen('4k3/8/4p3/3n4/8/8/6B1/3RK3 w - - 0 1'))
+        self.assertEqual(5, search_engine.quiescence_search(-math.inf, math.inf))
+        # black can take a pawn, but then loses the knight, so black keeps the static evaluation
+        search_engine = engine.Engine(create_from_fen('4k3/8/8/3n4/8/4P3/5P2/4K3 b - - 0 1'))
+        self.assertEqual(1, search_engine.quiescence_search(-math.inf, math.inf))
+
+    def test_checkmate(self):
+        # black is checkmated after the capture
+        self.assertEqual(100, engine.Engine(create_from_fen('r5k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1')).search(1)[1])
+        search_engine = engine.Engine(create_from_fen('R5k1/5ppp/8/8/8/8/5PPP/6K1 b - - 0 1'))
+        self.assertEqual(-100, search_engine.quiescence_search(-math.inf, math.inf))
+
+    def test_stalemate(self):
+        # black is stalemated, so the position is a draw although black is a pawn behind
+        search_engine = engine.Engine(create_from_fen('k7/P7/1K6/8/8/8/8/8 b - - 0 1'))
+        self.assertEqual(0, search_engine.quiescence_search(-math.inf, math.inf))
+        # also if standing pat would fail high
+        self.assertEqual(0, search_engine.quiescence_search(-5, -4))
+        # with a legal move, black keeps the static evaluation
+        search_engine = engine.Engine(create_from_fen('k7/P7/1K6/8/8/7p/8/7N b - - 0 1'))
+        self.assertEqual(-3, search_engine.quiescence_search(-math.inf, math.inf))
+        self.assertEqual(-3, search_engine.quiescence_search(-5, -4))
+
+    def test_delta_pruning(self):
+        # no capture can reach alpha, so only the position itself is visited
+        search_engine = engine.Engine(create_from_fen(FENS[1]))
+        self.assertEqual(0, search_engine.quiescence_search(50, 51))
+        self.assertEqual(1, search_engine.nodes)
+        search_engine.nodes = 0
+        search_engine.quiescence_search(-math.inf, math.inf)
+        self.assertGreater(search_engine.nodes, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
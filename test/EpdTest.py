@@ -0,0 +1,84 @@
+import io
+import os
+import tempfile
+import unittest
+
+import bitboard
+import chessboard
+import epd
+import perft
+import position_encoding
+from bitboard import BitboardChessboard
+
+EPD_FILE = b'''# test positions
+r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - bm Bb5; id "Ruy Lopez; main line";
+
+rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 hmvc 0; fmvn 1; c0 "after e4";
+rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1 ;D1 20 ;D2 400
+8/8/8/8/8/8/8/K6k w - - 12 80
+'''
+
+
+class EpdTest(unittest.TestCase):
+    def test_parse_operations(self):
+        self.assertEqual({'bm': 'Nf3 Ng5', 'id': 'test 1; a', 'D1': '20', 'noop': ''},
+                         epd.parse_operations('bm Nf3 Ng5; id "test 1; a"; D1 20 ;noop;'))
+
+    def test_parse_line(self):
+        self.assertEqual(('4k3/8/8/8/8/8/8/4K3 w - - 0 1', {'bm': 'Kd2'}),
+                         epd.parse_line('4k3/8/8/8/8/8/8/4K3 w - - bm Kd2;'))
+        self.assertEqual(('4k3/8/8/8/8/8/8/4K3 b - - 5 30', {'hmvc': '5', 'fmvn': '30'}),
+                         epd.parse_line('4k3/8/8/8/8/8/8/4K3 b - - hmvc 5; fmvn 30;'))
+        self.assertEqual(('4k3/8/8/8/8/8/8/4K3 w - - 3 4', {}), epd.parse_line('4k3/8/8/8/8/8/8/4K3 w - - 3 4'))
+        with self.assertRaises(ValueError):
+            epd.parse_line('4k3/8/8/8/8/8/8/4K3 w')
+
+    def assert_positions(self, positions: list):
+        self.assertEqual(4, len(positions))
+        board, operations = positions[0]
+        self.assertEqual('r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 1', board.to_fen())
+        self.assertEqual({'bm': 'Bb5', 'id': 'Ruy Lopez; main line'}, operations)
+        self.assertEqual('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1', positions[1][0].to_fen())
+        self.assertEqual('after e4', positions[1][1]['c0'])
+        self.assertEqual({'D1': '20', 'D2': '400'}, positions[2][1])
+        self.assertEqual(20, positions[2][0].perft(1))
+        self.assertEqual('8/8/8/8/8/8/8/K6k w - - 12 80', positions[3][0].to_fen())
+
+    def test_read_file_object(self):
+        self.assert_positions(list(epd.read_positions(io.BytesIO(EPD_FILE))))
+
+    def test_read_path(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.epd')
+            with open(path, 'wb') as file:
+                file.write(EPD_FILE)
+            self.assert_positions(list(epd.read_positions(path)))
+            self.assert_positions(list(epd.read_positions(path, use_mmap=True)))
+            positions = list(epd.read_positions(path, create_from_fen=bitboard.create_from_fen))
+            self.assertIsInstance(positions[0][0], BitboardChessboard)
+            # compact positions
+            positions = [(position_encoding.from_bytes(data), operations)
+                         for data, operations in epd.read_positions(path, compact=True, use_mmap=True)]
+            self.assert_positions(positions)
+            # empty files
+            open(path, 'wb').close()
+            self.assertEqual([], list(epd.read_positions(path, use_mmap=True)))
+
+    def test_write(self):
+        boards = [chessboard.create_from_fen(fen) for name, fen, results in perft.SUITE]
+        file = io.StringIO()
+        epd.write_positions(file, boards, epd=False)
+        self.assertEqual([fen for name, fen, results in perft.SUITE], file.getvalue().splitlines())
+        file = io.StringIO()
+        epd.write_positions(file, [(boards[0], {'bm': 'e4', 'id': 'start'}), (boards[1], {'id': 'Kiwipete; 2'})])
+        self.assertEqual('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - bm e4; id "start";\n'
+                         'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - id "Kiwipete; 2";\n',
+                         file.getvalue())
+        # the written positions can be read again
+        positions = list(epd.read_positions(io.BytesIO(file.getvalue().encode())))
+        self.assertEqual(boards[1].to_fen(), positions[1][0].to_fen())
+        self.assertEqual({'id': 'Kiwipete; 2'}, positions[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import random
+import tempfile
+import unittest
+
+import magic
+from attack_tables import DIAGONAL_DIRECTIONS, STRAIGHT_DIRECTIONS
+
+
+class MagicTest(unittest.TestCase):
+    def test_attacks(self):
+        """
+        Compares the looked up attacks with attacks calculated by walking along the rays for random occupancies.
+        """
+        rng = random.Random(42)
+        for square in range(64):
+            for i in range(50):
+                occupied = rng.getrandbits(64) & rng.getrandbits(64)
+                self.assertEqual(magic.calculate_attacks(square, occupied, STRAIGHT_DIRECTIONS),
+                                 magic.rook_attacks(square, occupied))
+                self.assertEqual(magic.calculate_attacks(square, occupied, DIAGONAL_DIRECTIONS),
+                                 magic.bishop_attacks(square, occupied))
+
+    def test_cache_file(self):
+        """
+        Tests that the tables written to the cache file are loaded again.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, 'magic_tables.bin')
+            rook_table, bishop_table = magic.load_tables(cache_file)
+            self.assertTrue(os.path.exists(cache_file))
+            self.assertEqual((rook_table, bishop_table), magic.load_tables(cache_file))
+            self.assertEqual(magic.ROOK_TABLE, rook_table)
+            self.assertEqual(magic.BISHOP_TABLE, bishop_table)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from array import array
+
+import chessboard
+import move_encoding
+from board_constants import *
+from move_encoding import FLAG_EN_PASSANT, FLAG_PROMOTION, encode_move
+
+
+class MoveEncodingTest(unittest.TestCase):
+    def test_encode_decode(self):
+        move = encode_move(SQUARES['g7'], SQUARES['h8'], FLAG_PROMOTION, PROMOTION_KNIGHT, ROOK_BLACK)
+        self.assertEqual((SQUARES['g7'], SQUARES['h8'], FLAG_PROMOTION, PROMOTION_KNIGHT, ROOK_BLACK),
+                         move_encoding.decode_move(move))
+        self.assertEqual(SQUARES['g7'], move_encoding.get_start_square(move))
+        self.assertEqual(SQUARES['h8'], move_encoding.get_target_square(move))
+        self.assertEqual(FLAG_PROMOTION, move_encoding.get_flag(move))
+        self.assertEqual(PROMOTION_KNIGHT, move_encoding.get_promotion(move))
+        self.assertEqual(ROOK_BLACK, move_encoding.get_captured_piece(move))
+        self.assertLess(move, 1 << 32)
+
+    def test_tuple_conversion(self):
+        """
+        Converts all moves of a position with every kind of special move into tuples and back.
+        """
+        board = chessboard.create_from_fen('r3k2r/2bp2P1/1pp1p1n1/pP2Pp1P/n2qP3/1B3N2/P1QP1PP1/R3K2R w KQkq a6 3 24')
+        encoded_moves = board.generate_moves(True)
+        self.assertIsInstance(encoded_moves, array)
+        self.assertEqual('I', encoded_moves.typecode)
+        self.assertEqual(board.generate_moves(), move_encoding.to_tuples(encoded_moves))
+        for move in encoded_moves:
+            self.assertEqual(move, move_encoding.from_tuple(move_encoding.to_tuple(move)))
+        en_passant = (SQUARES['b5'], SQUARES['a6'], EN_PASSANT)
+        self.assertEqual(FLAG_EN_PASSANT, move_encoding.get_flag(move_encoding.from_tuple(en_passant)))
+        self.assertEqual(PAWN_BLACK, move_encoding.get_captured_piece(move_encoding.from_tuple(en_passant)))
+
+    def test_move_undo_encoded(self):
+        """
+        Makes and undoes all moves in their encoded form.
+        """
+        fen = 'r3k2r/2bp2P1/1pp1p1n1/pP2Pp1P/n2qP3/1B3N2/P1QP1PP1/R3K2R w KQkq a6 3 24'
+        board = chessboard.create_from_fen(fen)
+        for move in board.generate_moves(True):
+            tuple_board = chessboard.create_from_fen(fen)
+            tuple_board.move(move_encoding.to_tuple(move))
+            board.move(move)
+            self.assertEqual(tuple_board.board, board.board)
+            self.assertEqual(tuple_board.half_move_count_for_draw, board.half_move_count_for_draw)
+            board.undo_last_move()
+            self.assertEqual(chessboard.create_from_fen(fen).board, board.board)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+import bitboard
+import chessboard
+import perft
+from move_encoding import to_coordinate_notation
+
+
+class PerftTest(unittest.TestCase):
+    create_from_fen = staticmethod(chessboard.create_from_fen)
+    max_nodes = 3000
+
+    def test_suite(self):
+        """
+        Runs all positions of the suite with small depths.
+        """
+        for name, fen, results in perft.SUITE:
+            board = self.create_from_fen(fen)
+            for depth, nodes in results.items():
+                if nodes <= self.max_nodes:
+                    self.assertEqual(nodes, board.perft(depth), name + ' depth ' + str(depth))
+            # perft leaves the position unchanged
+            self.assertEqual(self.create_from_fen(fen).board, board.board)
+            self.assertEqual(self.create_from_fen(fen).hash, board.hash)
+
+    def test_divide(self):
+        board = self.create_from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+        nodes = board.divide(2)
+        self.assertEqual(48, len(nodes))
+        self.assertEqual(2039, sum(nodes.values()))
+        nodes = {to_coordinate_notation(move): count for move, count in nodes.items()}
+        self.assertEqual(43, nodes['e1g1'])
+        self.assertEqual(46, nodes['d5e6'])
+
+    def test_parallel(self):
+        """
+        The parallel perft gives the same results as the serial perft.
+        """
+        board = self.create_from_fen('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+        nodes = board.divide(3)
+        self.assertEqual(nodes, perft.parallel_divide(board, 3, 2))
+        self.assertEqual(nodes, perft.parallel_divide(board, 3, 2, split_depth=2))
+        # a root move that checkmates has no subtrees
+        board = self.create_from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        self.assertEqual(board.divide(3), perft.parallel_divide(board, 3, 2, split_depth=2))
+        self.assertEqual(board.perft(3), perft.parallel_perft(board, 3, 2))
+        self.assertRaises(ValueError, perft.parallel_divide, board, 3, 2, 0)
+
+    def test_parallel_hashed(self):
+        """
+        The workers keep their perft tables for all their tasks, so transpositions between the subtrees are found.
+        """
+        board = self.create_from_fen('8/k1P5/8/1K6/8/8/8/8 w - - 0 1')
+        nodes, probes, hits = perft.parallel_divide_with_statistics(board, 5, 2, split_depth=1, hash_size=1)
+        self.assertEqual(board.divide(5), nodes)
+        self.assertGreater(probes, hits)
+        self.assertGreater(hits, 0)
+        nodes, probes, hits = perft.parallel_divide_with_statistics(board, 5, 2)
+        self.assertEqual((0, 0), (probes, hits))
+
+    def test_hashed(self):
+        table = perft.PerftTable(1)
+        for name, fen, results in perft.SUITE:
+            if results[3] <= self.max_nodes * 3:
+                self.assertEqual(results[3], perft.hashed_perft(self.create_from_fen(fen), 3, table), name)
+        board = self.create_from_fen('8/k1P5/8/1K6/8/8/8/8 w - - 0 1')
+        self.assertEqual(10857, perft.hashed_perft(board, 5, table))
+        self.assertGreater(table.get_hit_rate(), 0.1)
+        self.assertEqual(board.divide(5), perft.hashed_divide(board, 5, table))
+
+    def test_depth_0(self):
+        self.assertEqual(1, self.create_from_fen('8/8/8/8/8/8/8/K6k w - - 0 1').perft(0))
+
+
+class PerftTableTest(unittest.TestCase):
+    def test_size(self):
+        table = perft.PerftTable(1)
+        self.assertEqual(2 ** 16, len(table.hashes))
+        self.assertEqual(2 ** 16, len(table.entries))
+        self.assertEqual(2 ** 16 - 2, table.mask)
+
+    def test_replacement(self):
+        table = perft.PerftTable(0)
+        self.assertEqual(-1, table.get(5, 3))
+        table.put(5, 3, 100)
+        self.assertEqual(100, table.get(5, 3))
+        # the depth is part of the key
+        self.assertEqual(-1, table.get(5, 2))
+        # a shallower result does not replace the deeper one
+        table.put(7, 2, 10)
+        self.assertEqual(100, table.get(5, 3))
+        self.assertEqual(10, table.get(7, 2))
+        table.put(9, 2, 20)
+        self.assertEqual(100, table.get(5, 3))
+        self.assertEqual(-1, table.get(7, 2))
+        self.assertEqual(20, table.get(9, 2))
+        # a deeper result replaces the first entry
+        table.put(11, 4, 30)
+        self.assertEqual(-1, table.get(5, 3))
+        self.assertEqual(30, table.get(11, 4))
+        self.assertEqual(6 / 10, table.get_hit_rate())
+
+
+class BitboardPerftTest(PerftTest):
+    create_from_fen = staticmethod(bitboard.create_from_fen)
+
+
+if __name__ == '__main__':
+    unittest.main()
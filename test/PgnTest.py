@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+import unittest
+
+import bitboard
+import pgn
+from bitboard import BitboardChessboard
+
+PGN_FILE = b'''[Event "Test \\"1\\""]
+[Site "?"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 {a comment
+over two lines (with a variation) } Nc6 (2... d6 3. d4 (3. Bc4) exd4) 3. Bb5 $1 a6 ; the Ruy Lopez
+4.Ba4 Nf6 5. O-O Be7 1-0
+
+[Event "Scholar's mate"]
+[Result "1-0"]
+
+1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6?? 4. Qxf7# 1-0
+[Event "From a position"]
+[SetUp "1"]
+[FEN "4k3/1P6/8/8/8/8/8/4K3 w - - 0 1"]
+
+1. b8=Q+ Kd7 2. Qb5+ *
+% an escaped line
+1. d4 d5
+'''
+
+
+class PgnTest(unittest.TestCase):
+    def assert_games(self, games: list):
+        self.assertEqual(4, len(games))
+        self.assertEqual({'Event': 'Test "1"', 'Site': '?', 'Result': '1-0'}, games[0].tags)
+        self.assertEqual('e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7'.split(), games[0].moves)
+        self.assertEqual('1-0', games[0].result)
+        self.assertEqual('Qxf7#', games[1].moves[-1])
+        self.assertEqual(['b8=Q+', 'Kd7', 'Qb5+'], games[2].moves)
+        self.assertEqual('*', games[2].result)
+        # a game without tags and result at the end of the file
+        self.assertEqual(({}, ['d4', 'd5'], '*'), (games[3].tags, games[3].moves, games[3].result))
+
+    def test_read_games(self):
+        self.assert_games(list(pgn.read_games(io.BytesIO(PGN_FILE))))
+
+    def test_read_games_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games.pgn')
+            with open(path, 'wb') as file:
+                file.write(PGN_FILE)
+            for use_mmap in (False, True):
+                self.assert_games(list(pgn.read_games(path, use_mmap)))
+
+    def test_replay(self):
+        games = list(pgn.read_games(io.BytesIO(PGN_FILE)))
+        for trusted in (False, True):
+            board = games[0].create_start_position()
+            self.assertEqual(10, len(list(games[0].replay(board, trusted))))
+            self.assertEqual('r1bqk2r/1pppbppp/p1n2n2/4p3/B3P3/5N2/PPPP1PPP/RNBQ1RK1 w kq - 4 6', board.to_fen())
+            board = games[1].create_start_position()
+            list(games[1].replay(board, trusted))
+            self.assertTrue(board.is_checkmate())
+            board = games[2].create_start_position()
+            list(games[2].replay(board, trusted))
+            self.assertEqual('8/3k4/8/1Q6/8/8/8/4K3 b - - 2 2', board.to_fen())
+
+    def test_replay_invalid_move(self):
+        game = pgn.PgnGame({}, ['e4', 'e5', 'Ke3'], '*')
+        with self.assertRaises(ValueError):
+            list(game.replay())
+
+    def test_replay_games(self):
+        for trusted in (False, True):
+            replayed = list(pgn.replay_games(io.BytesIO(PGN_FILE), trusted, bitboard.create_from_fen))
+            self.assertEqual(10 + 7 + 3 + 2, len(replayed))
+            game, board, move = replayed[-1]
+            self.assertIsInstance(board, BitboardChessboard)
+            self.assertEqual(['d4', 'd5'], game.moves)
+
+
+if __name__ == '__main__':
+    unittest.main()
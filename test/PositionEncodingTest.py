@@ -0,0 +1,71 @@
+import unittest
+
+import bitboard
+import chessboard
+import perft
+import position_encoding
+from bitboard import BitboardChessboard
+from board_constants import *
+from position_encoding import POSITION_SIZE
+
+
+class PositionEncodingTest(unittest.TestCase):
+    def test_size(self):
+        self.assertEqual(38, POSITION_SIZE)
+        for name, fen, results in perft.SUITE:
+            self.assertEqual(POSITION_SIZE, len(position_encoding.to_bytes(chessboard.create_from_fen(fen))))
+
+    def test_round_trip(self):
+        fens = [fen for name, fen, results in perft.SUITE]
+        fens.append('r3k2r/2bp2P1/1pp1p1n1/pP2Pp1P/n2qP3/1B3N2/P1QP1PP1/R3K2R w KQkq a6 3 24')
+        fens.append('rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1')
+        for fen in fens:
+            board = chessboard.create_from_fen(fen)
+            decoded_board = position_encoding.from_bytes(position_encoding.to_bytes(board))
+            self.assertEqual(fen, decoded_board.to_fen())
+            self.assertEqual(board.hash, decoded_board.hash)
+            self.assertEqual(board.piece_squares, decoded_board.piece_squares)
+            self.assertEqual(board.king_squares, decoded_board.king_squares)
+
+    def test_bitboard(self):
+        fen = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+        data = position_encoding.to_bytes(bitboard.create_from_fen(fen))
+        board = position_encoding.from_bytes(data, board_class=BitboardChessboard)
+        self.assertIsInstance(board, BitboardChessboard)
+        self.assertEqual(fen, board.to_fen())
+        self.assertEqual(bitboard.create_from_fen(fen).pieces, board.pieces)
+
+    def test_buffer_of_positions(self):
+        """
+        Decodes positions in place from one buffer with many positions.
+        """
+        board = chessboard.create_starting_position()
+        fens = []
+        buffer = bytearray()
+        for move in board.generate_moves(True):
+            board.move(move)
+            fens.append(board.to_fen())
+            buffer += position_encoding.to_bytes(board)
+            board.undo_last_move()
+        view = memoryview(buffer)
+        self.assertEqual(fens[3], position_encoding.from_bytes(view, 3 * POSITION_SIZE).to_fen())
+        self.assertEqual(fens, [position.to_fen() for position in position_encoding.iterate_positions(view)])
+
+    def test_invalid_data(self):
+        with self.assertRaises(ValueError):
+            position_encoding.from_bytes(bytes(POSITION_SIZE - 1))
+        with self.assertRaises(ValueError):
+            position_encoding.from_bytes(bytes(2 * POSITION_SIZE), POSITION_SIZE + 1)
+
+    def test_encoding(self):
+        data = position_encoding.to_bytes(chessboard.create_from_fen('4k3/8/8/8/8/8/8/R3K3 b Q - 7 40'))
+        self.assertEqual(ROOK_WHITE, data[0])
+        self.assertEqual(KING_WHITE, data[2])
+        self.assertEqual(KING_BLACK, data[30])
+        self.assertEqual(1 | CASTLE_RIGHT_WHITE_LONG << 1, data[32])
+        self.assertEqual(0, data[33])
+        self.assertEqual(bytes((7, 0, 40, 0)), data[34:38])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from chessboard import create_from_fen, create_starting_position
+from san import parse_san, to_san
+
+
+class SanTest(unittest.TestCase):
+    def assert_san(self, fen: str, expected: list):
+        """
+        Checks that the SAN of every legal move of a position is expected, unique and parsed back into the move.
+        """
+        board = create_from_fen(fen)
+        moves = board.generate_moves(True)
+        sans = [to_san(board, move) for move in moves]
+        self.assertEqual(len(moves), len(set(sans)))
+        for san in expected:
+            self.assertIn(san, sans)
+        for move, san in zip(moves, sans):
+            self.assertEqual(move, parse_san(board, san))
+            self.assertEqual(move, parse_san(board, san, trusted=True))
+
+    def test_starting_position(self):
+        self.assert_san('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', ['e4', 'e3', 'Nf3', 'Na3'])
+
+    def test_disambiguation(self):
+        # rooks on a1 and h1 (file), on a1 and a5 (rank), queens on a1, a3 and c1 (both)
+        self.assert_san('4k3/8/8/R7/8/8/4K3/R6R w - - 0 1', ['Rad1', 'Rhd1', 'R1a3', 'R5a3', 'Rhh5', 'Rah5'])
+        self.assert_san('4k3/8/8/8/8/Q7/8/Q1Q1K3 w - - 0 1', ['Qa1b2', 'Qcb2', 'Q3b2', 'Qab1'])
+        # the knight on c3 is pinned, so the move of the other knight needs no disambiguation
+        self.assert_san('4k3/8/8/b7/8/2N5/8/4KN2 w - - 0 1', ['Ne3', 'Nd2'])
+
+    def test_special_moves(self):
+        self.assert_san('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', ['O-O', 'O-O-O', 'Rxa8+', 'Rxh8+'])
+        self.assert_san('4k3/1P6/8/3pP3/8/8/8/4K3 w - d6 0 1', ['b8=Q+', 'b8=N', 'exd6', 'e6'])
+        self.assert_san('6k1/5ppp/8/8/8/8/8/R3K3 w Q - 0 1', ['Ra8#', 'O-O-O'])
+
+    def test_parse_variants(self):
+        board = create_from_fen('r3k2r/1P6/8/8/8/8/8/R3K2R w KQkq - 0 1')
+        self.assertEqual(parse_san(board, 'O-O'), parse_san(board, '0-0'))
+        self.assertEqual(parse_san(board, 'bxa8=Q+'), parse_san(board, 'bxa8Q'))
+        self.assertEqual(parse_san(board, 'Rh1xh8'), parse_san(board, 'Rxh8!?'))
+        for san in ('Nf3', 'e9', 'Kd3', 'b8', 'xyz', 'Re1'):
+            with self.assertRaises(ValueError):
+                parse_san(board, san)
+
+    def test_parse_ambiguous(self):
+        board = create_from_fen('4k3/8/8/8/8/8/4K3/R6R w - - 0 1')
+        for trusted in (False, True):
+            with self.assertRaises(ValueError):
+                parse_san(board, 'Rd1', trusted)
+
+    def test_game(self):
+        board = create_starting_position()
+        game = 'e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6 c3 O-O h3 Nb8 d4 Nbd7'.split()
+        for san in game:
+            move = parse_san(board, san)
+            self.assertEqual(san, to_san(board, move))
+            board.move(move)
+        self.assertEqual('r1bq1rk1/2pnbppp/p2p1n2/1p2p3/3PP3/1BP2N1P/PP3PP1/RNBQR1K1 w - - 1 11', board.to_fen())
+
+
+if __name__ == '__main__':
+    unittest.main()
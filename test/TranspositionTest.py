@@ -0,0 +1,82 @@
+import unittest
+
+import engine
+from chessboard import create_from_fen
+from move_encoding import encode_move
+from transposition import BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, TranspositionTable
+
+KIWIPETE = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'
+
+
+class TranspositionTableTest(unittest.TestCase):
+    def test_size(self):
+        self.assertEqual(65536, len(TranspositionTable(1)))
+        self.assertEqual(2, len(TranspositionTable(0.00001)))
+
+    def test_put_and_get(self):
+        table = TranspositionTable(1)
+        move = encode_move(12, 28)
+        self.assertIsNone(table.get(1234))
+        table.put(1234, move, 5, BOUND_LOWER, -100)
+        table.put(2 ** 64 - 1, 0, 255, BOUND_UPPER, 32767)
+        self.assertEqual((move, 5, BOUND_LOWER, -100), table.get(1234))
+        self.assertEqual((0, 255, BOUND_UPPER, 32767), table.get(2 ** 64 - 1))
+        self.assertIsNone(table.get(1234 + 2 ** 40))
+        self.assertAlmostEqual(2 / 4, table.get_hit_rate())
+        table.clear()
+        self.assertIsNone(table.get(1234))
+
+    def test_keep_move(self):
+        # a result without best move keeps the best move of the position
+        table = TranspositionTable(1)
+        move = encode_move(12, 28)
+        table.put(1234, move, 2, BOUND_EXACT, 0)
+        table.put(1234, 0, 3, BOUND_UPPER, -1)
+        self.assertEqual((move, 3, BOUND_UPPER, -1), table.get(1234))
+
+    def test_replacement(self):
+        table = TranspositionTable(1)
+        # the hashes belong to the same bucket
+        first, second, third = 1000, 1000 + 2 ** 32, 1000 + 2 ** 33
+        table.put(first, 0, 6, BOUND_EXACT, 1)
+        # shallower results of this search go to the second entry, which is always replaced
+        table.put(second, 0, 2, BOUND_EXACT, 2)
+        table.put(third, 0, 3, BOUND_EXACT, 3)
+        self.assertEqual((0, 6, BOUND_EXACT, 1), table.get(first))
+        self.assertIsNone(table.get(second))
+        self.assertEqual((0, 3, BOUND_EXACT, 3), table.get(third))
+        # deeper results replace the first entry
+        table.put(second, 0, 7, BOUND_EXACT, 2)
+        self.assertIsNone(table.get(first))
+        self.assertEqual((0, 7, BOUND_EXACT, 2), table.get(second))
+
+    def test_aging(self):
+        table = TranspositionTable(1)
+        first, second = 1000, 1000 + 2 ** 32
+        table.put(first, 0, 6, BOUND_EXACT, 1)
+        table.new_search()
+        # the deep result of the earlier search is still found, but replaced by any result of the new search
+        self.assertEqual((0, 6, BOUND_EXACT, 1), table.get(first))
+        table.put(second, 0, 1, BOUND_EXACT, 2)
+        self.assertIsNone(table.get(first))
+        self.assertEqual((0, 1, BOUND_EXACT, 2), table.get(second))
+
+
+class EngineTableTest(unittest.TestCase):
+    def test_same_evaluation(self):
+        for depth in (1, 2, 3):
+            self.assertEqual(engine.Engine(create_from_fen(KIWIPETE), hash_size=0).search(depth)[1],
+                             engine.Engine(create_from_fen(KIWIPETE), hash_size=1).search(depth)[1])
+
+    def test_table_kept_between_searches(self):
+        search_engine = engine.Engine(create_from_fen(KIWIPETE), hash_size=1)
+        move, evaluation = search_engine.search(3)
+        nodes = search_engine.nodes
+        # the second search finds the results of the first one
+        self.assertEqual((move, evaluation), search_engine.search(3))
+        self.assertLess(search_engine.nodes * 10, nodes)
+        self.assertEqual(move, search_engine.table.get(search_engine.position.hash)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
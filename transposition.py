@@ -0,0 +1,125 @@
+from array import array
+
+# The transposition table of the search stores for every searched position (identified by its hash) the depth of the
+# search, the evaluation, whether the evaluation is exact or only a bound, and the best move. The entries are packed
+# into one 64-bit integer:
+#   bits 0-22:  the best move (encoded) or 0
+#   bits 23-30: the depth
+#   bits 31-32: the bound type (BOUND_* constants)
+#   bits 33-40: the generation (the number of the search that stored the entry, modulo 256)
+#   bits 41-56: the evaluation + SCORE_OFFSET
+
+BOUND_EXACT = 1
+# the evaluation is at least the stored evaluation (the search failed high)
+BOUND_LOWER = 2
+# the evaluation is at most the stored evaluation (the search failed low)
+BOUND_UPPER = 3
+
+DEPTH_SHIFT = 23
+BOUND_SHIFT = 31
+GENERATION_SHIFT = 33
+SCORE_SHIFT = 41
+SCORE_OFFSET = 1 << 15
+MOVE_MASK = (1 << DEPTH_SHIFT) - 1
+
+
+class HashTable:
+    """
+    The base of the tables with a fixed size that are indexed by the hash of a position. The hashes and the packed
+    entries are stored in two flat arrays, and every hash belongs to a bucket of two entries. The subclasses define
+    how the entries are packed and replaced.
+    """
+
+    def __init__(self, size_in_mb: float):
+        """
+        Creates an empty table.
+        :param size_in_mb: The memory limit of the table in MB. The number of entries is the largest power of two
+            that fits into the limit (16 bytes per entry).
+        """
+        entries = 2
+        while entries * 2 * 16 <= size_in_mb * 1024 * 1024:
+            entries *= 2
+        self.mask = entries - 2  # the index of the first entry of a bucket is even
+        self.hashes = array('Q', bytes(8 * entries))
+        self.entries = array('Q', bytes(8 * entries))
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        self.hashes = array('Q', bytes(8 * len(self.hashes)))
+        self.entries = array('Q', bytes(8 * len(self.entries)))
+        self.probes = 0
+        self.hits = 0
+
+    def get_hit_rate(self) -> float:
+        """
+        Returns the share of lookups that found a stored result.
+        :return: The hit rate between 0 and 1.
+        """
+        return self.hits / self.probes if self.probes > 0 else 0.0
+
+
+class TranspositionTable(HashTable):
+    """
+    The transposition table of the search (see above). The first entry of a bucket keeps the deepest result of the
+    current search (results of earlier searches are replaced), the second one is always replaced.
+    """
+
+    def __init__(self, size_in_mb: float):
+        """
+        Creates an empty table.
+        :param size_in_mb: The memory limit of the table in MB (see HashTable).
+        """
+        super().__init__(size_in_mb)
+        self.generation = 0
+
+    def new_search(self):
+        """
+        Starts a new search: the entries of earlier searches are kept, but replaced first.
+        """
+        self.generation = (self.generation + 1) & 255
+
+    def get(self, position_hash: int):
+        """
+        Looks up a position.
+        :param position_hash: The hash of the position.
+        :return: The best move (encoded or 0), the depth, the bound type and the evaluation, or None if the position
+            is not stored.
+        """
+        self.probes += 1
+        index = position_hash & self.mask
+        for index in (index, index + 1):
+            entry = self.entries[index]
+            if self.hashes[index] == position_hash and entry != 0:
+                self.hits += 1
+                return entry & MOVE_MASK, entry >> DEPTH_SHIFT & 255, entry >> BOUND_SHIFT & 3, \
+                    (entry >> SCORE_SHIFT & 0xFFFF) - SCORE_OFFSET
+        return None
+
+    def put(self, position_hash: int, move: int, depth: int, bound: int, evaluation: int):
+        """
+        Stores the result of the search of a position.
+        :param position_hash: The hash of the position.
+        :param move: The best move (encoded) or 0.
+        :param depth: The depth of the search.
+        :param bound: The bound type (BOUND_* constant).
+        :param evaluation: The evaluation (an integer that fits into 16 bits).
+        """
+        index = position_hash & self.mask
+        entry = self.entries[index]
+        if entry != 0 and entry >> GENERATION_SHIFT & 255 == self.generation and depth < entry >> DEPTH_SHIFT & 255 \
+                and self.hashes[index] != position_hash:
+            # the first entry holds a deeper result of this search
+            index += 1
+        elif move == 0 and self.hashes[index] == position_hash:
+            # keep the best move of an earlier search of the position
+            move = entry & MOVE_MASK
+        self.hashes[index] = position_hash
+        self.entries[index] = move | depth << DEPTH_SHIFT | bound << BOUND_SHIFT | \
+            self.generation << GENERATION_SHIFT | (evaluation + SCORE_OFFSET) << SCORE_SHIFT
@@ -0,0 +1,44 @@
+import random
+
+# Zobrist hashing: every feature of a position (a piece on a square, the player to move, the castle rights and the
+# file of the en passant square) gets a random 64-bit key. The hash of a position is the xor of the keys of all its
+# features, so a move only has to xor the keys of the features it changes.
+
+# a fixed seed keeps the hashes equal between runs and processes
+SEED = 0x5EED
+
+_rng = random.Random(SEED)
+
+# the keys of the pieces indexed by the piece constant and the square (EMPTY has no keys, so xor-ing it changes nothing)
+PIECE_KEYS = [[0] * 64] + [[_rng.getrandbits(64) for square in range(64)] for piece in range(1, 13)]
+# xor-ed into the hash if black has to move
+BLACK_TO_MOVE_KEY = _rng.getrandbits(64)
+# the keys of the four castle rights, combined into one key for every bitmask of CASTLE_RIGHT_* constants
+CASTLE_RIGHT_KEYS = [_rng.getrandbits(64) for right in range(4)]
+CASTLE_KEYS = [0] * 16
+for rights in range(16):
+    for bit in range(4):
+        if rights & (1 << bit):
+            CASTLE_KEYS[rights] ^= CASTLE_RIGHT_KEYS[bit]
+# the keys of the en passant square indexed by its file
+EN_PASSANT_KEYS = [_rng.getrandbits(64) for file in range(8)]
+
+
+def calculate_hash(board: list, turn: str, castle_rights: int, en_passant_square: int) -> int:
+    """
+    Calculates the hash of a position from scratch.
+    :param board: The list of squares.
+    :param turn: The player that has to move next.
+    :param castle_rights: The castle rights as bitmask of the CASTLE_RIGHT_* constants.
+    :param en_passant_square: The en passant square or -1.
+    :return: The 64-bit hash of the position.
+    """
+    position_hash = 0
+    for square in range(64):
+        position_hash ^= PIECE_KEYS[board[square]][square]
+    if turn == 'black':
+        position_hash ^= BLACK_TO_MOVE_KEY
+    position_hash ^= CASTLE_KEYS[castle_rights]
+    if en_passant_square != -1:
+        position_hash ^= EN_PASSANT_KEYS[en_passant_square % 8]
+    return position_hash